@@ -4,13 +4,16 @@ import logging
 from typing import Optional, Dict, Any
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.services.supabase_client import supabase_service
+from app.services.jwt_verifier import jwt_verifier
 
 logger = logging.getLogger(__name__)
 
 # Security scheme for FastAPI
 security = HTTPBearer()
 
+# Role in a user's app_metadata (set server-side, not editable by the user) that grants admin access
+ADMIN_ROLE = "admin"
+
 class AuthenticationError(Exception):
     """Custom authentication error."""
     pass
@@ -41,8 +44,8 @@ async def get_current_user(
         # Extract token from credentials
         token = credentials.credentials
         
-        # Authenticate with Supabase
-        user = await supabase_service.authenticate_user(token)
+        # Verify the Supabase access token (locally, or with Supabase Auth per AUTH_VERIFICATION)
+        user = await jwt_verifier.authenticate(token)
         
         if not user:
             raise HTTPException(
@@ -88,6 +91,28 @@ async def get_optional_user(
         logger.warning(f"Optional authentication failed: {e}")
         return None
 
+async def get_admin_user(
+    user: Dict[str, Any] = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """
+    Dependency to get the current user, who must have the admin role.
+    
+    Args:
+        user: Current authenticated user
+        
+    Returns:
+        User information dictionary
+        
+    Raises:
+        HTTPException: If the user is not an admin
+    """
+    if (user.get("app_metadata") or {}).get("role") != ADMIN_ROLE:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied: admin role required"
+        )
+    return user
+
 def require_user_access(user: Dict[str, Any], resource_user_id: str) -> None:
     """
     Ensure the authenticated user has access to a resource.
@@ -18,6 +18,20 @@ class Settings(BaseSettings):
     supabase_url: str = Field(default="https://your-project.supabase.co", env="SUPABASE_URL")
     supabase_anon_key: str = Field(default="", env="SUPABASE_ANON_KEY")
     supabase_service_role_key: str = Field(default="", env="SUPABASE_SERVICE_ROLE_KEY")
+    # Threads running blocking supabase-py calls; bounds concurrent database/storage requests per worker
+    supabase_max_workers: int = Field(default=32, env="SUPABASE_MAX_WORKERS")
+    
+    # Data Backend - "supabase" queries through PostgREST; "postgres" sends the hot queries
+    # (request lookups, status and preference updates) over a direct asyncpg pool
+    data_backend: str = Field(default="supabase", env="DATA_BACKEND")
+    database_url: str = Field(default="", env="DATABASE_URL")
+    database_pool_min_size: int = 2
+    database_pool_max_size: int = Field(default=10, env="DATABASE_POOL_MAX_SIZE")
+    database_statement_cache_size: int = 100  # Set to 0 behind a transaction-mode pooler (Supavisor port 6543)
+    
+    # Request Listing - GET /requests pages
+    requests_page_size: int = 50
+    requests_page_size_max: int = 200
     
     # Processing Configuration - Enable real processing when API keys are provided
     use_edge_functions: bool = Field(default=True)
@@ -26,6 +40,21 @@ class Settings(BaseSettings):
     # JWT Configuration - Load from environment variables
     jwt_secret: str = Field(default="change-this-in-production", env="JWT_SECRET")
     jwt_algorithm: str = "HS256"
+    # Supabase Auth access tokens - the project's JWT secret (Settings > API), not JWT_SECRET above
+    supabase_jwt_secret: str = Field(default="", env="SUPABASE_JWT_SECRET")
+    # Access token verification - "local" checks tokens here, "revalidate" also confirms each with
+    # Supabase Auth, "remote" only asks Supabase Auth. Empty uses "local" once SUPABASE_JWT_SECRET
+    # or JWT_JWKS_URL is set, else "remote"
+    auth_verification: str = Field(default="", env="AUTH_VERIFICATION")
+    jwt_audience: str = Field(default="authenticated", env="JWT_AUDIENCE")
+    jwt_issuer: str = Field(default="", env="JWT_ISSUER")  # e.g. https://<project>.supabase.co/auth/v1
+    jwt_jwks_url: str = Field(default="", env="JWT_JWKS_URL")  # Defaults to the project's auth JWKS endpoint
+    jwt_jwks_refresh_seconds: float = 600.0
+    jwt_allowed_algorithms: str = "HS256,RS256,ES256"
+    jwt_leeway_seconds: int = 30  # Clock skew tolerated on exp/nbf/iat
+    # Users validated by Supabase Auth (remote/revalidate modes), cached per token; 0 disables
+    auth_user_cache_size: int = 2048
+    auth_user_cache_ttl: float = Field(default=60.0, env="AUTH_USER_CACHE_TTL")  # Seconds, capped at token exp
     access_token_expire_minutes: int = 30
     
     # AI Service APIs - Load from environment variables
@@ -35,6 +64,53 @@ class Settings(BaseSettings):
     # Spotify API Configuration - Load from environment variables
     spotify_client_id: str = Field(default="", env="SPOTIFY_CLIENT_ID")
     spotify_client_secret: str = Field(default="", env="SPOTIFY_CLIENT_SECRET")
+    spotify_accounts_url: str = Field(default="https://accounts.spotify.com", env="SPOTIFY_ACCOUNTS_URL")
+    spotify_api_url: str = Field(default="https://api.spotify.com/v1", env="SPOTIFY_API_URL")
+    
+    # Spotify HTTP Client - Shared pooled connections with keep-alive
+    spotify_http2: bool = True
+    spotify_max_connections: int = 20
+    spotify_max_keepalive_connections: int = 10
+    spotify_keepalive_expiry: float = 30.0
+    spotify_connect_timeout: float = 3.0
+    spotify_read_timeout: float = 10.0
+    spotify_pool_timeout: float = 5.0
+    spotify_token_refresh_margin: float = 60.0  # Refresh this many seconds before expiry
+    spotify_market: str = Field(default="US", env="SPOTIFY_MARKET")
+    spotify_recommendation_budget_seconds: float = 2.0  # Latency budget for concurrent scene searches
+    
+    # Spotify Search Cache - Identical (query, limit, market) searches are served from memory
+    spotify_search_cache_size: int = Field(default=512, env="SPOTIFY_SEARCH_CACHE_SIZE")
+    spotify_search_cache_ttl: float = Field(default=3600.0, env="SPOTIFY_SEARCH_CACHE_TTL")
+    spotify_search_cache_stale_ttl: float = 86400.0  # Expired results kept as a throttling fallback
+    
+    # Spotify Rate Limiting - Token bucket shared across the process plus a circuit breaker
+    spotify_rate_limit_per_second: float = Field(default=10.0, env="SPOTIFY_RATE_LIMIT_PER_SECOND")
+    spotify_rate_limit_burst: int = Field(default=20, env="SPOTIFY_RATE_LIMIT_BURST")
+    spotify_max_wait_seconds: float = 5.0  # Longest rate-limit or Retry-After wait before failing fast
+    spotify_max_retries: int = 2
+    spotify_breaker_failure_threshold: int = 5
+    spotify_breaker_reset_seconds: float = 30.0
+    
+    # Recommendation Source - "auto" uses the local track catalog when one is configured, "spotify" always searches
+    recommendation_source: str = Field(default="auto", env="RECOMMENDATION_SOURCE")
+    track_catalog_path: str = Field(default="", env="TRACK_CATALOG_PATH")  # Catalog directory, .csv or .json
+    track_catalog_index_path: str = Field(default="", env="TRACK_CATALOG_INDEX_PATH")  # IVF index directory
+    catalog_index_min_tracks: int = 50000  # Catalogs this large warn when served without an IVF index
+    catalog_index_lists: int = 0  # 0 uses ~sqrt(catalog size) cells
+    catalog_index_probe: int = 8
+    rerank_candidate_multiplier: int = 4  # Candidates gathered per returned recommendation
+    rerank_diversity: float = 0.3  # MMR redundancy weight; 0 ranks by relevance only
+    recommendation_batch_max_scenes: int = 200
+    recommendation_batch_concurrency: int = 8
+    
+    # Recommendation Cache - "memory" (per process), "redis" (any Redis-compatible server, shared
+    # across API and worker processes) or "" to disable
+    recommendation_cache_backend: str = Field(default="memory", env="RECOMMENDATION_CACHE_BACKEND")
+    recommendation_cache_url: str = Field(default="redis://localhost:6379/0", env="RECOMMENDATION_CACHE_URL")
+    recommendation_cache_size: int = Field(default=4096, env="RECOMMENDATION_CACHE_SIZE")
+    recommendation_cache_ttl: float = Field(default=21600.0, env="RECOMMENDATION_CACHE_TTL")
+    recommendation_cache_top_elements: int = 5  # Visual elements / ambient tags that form the signature
     
     # Storage Configuration
     upload_max_size: int = Field(default=104857600)
@@ -44,6 +120,34 @@ class Settings(BaseSettings):
     max_frames_extract: int = 10
     frame_interval_seconds: float = 2.0
     audio_analysis_duration: int = 30
+
+    # Scratch space for analysis proxy transcodes
+    media_cache_dir: str = Field(default="", env="MEDIA_CACHE_DIR")  # Empty uses the system temp dir
+
+    # Upload Probe and Admission Control
+    probe_header_bytes: int = 2 * 1024 * 1024
+    probe_timeout_seconds: float = 10.0
+    max_video_duration_seconds: float = Field(default=3600.0, env="MAX_VIDEO_DURATION_SECONDS")
+    max_video_pixels: int = 3840 * 2160
+    max_estimated_cost_seconds: float = Field(default=0.0, env="MAX_ESTIMATED_COST_SECONDS")  # 0 disables
+    cost_base_seconds: float = 2.0
+    cost_per_frame_seconds: float = 0.5
+    cost_per_audio_second: float = 0.1
+    cost_read_bytes_per_second: float = 50 * 1024 * 1024
+
+    # Analysis Proxy - Low-resolution video and 16 kHz mono audio produced once per job
+    analysis_proxy_enabled: bool = Field(default=False, env="ANALYSIS_PROXY_ENABLED")
+    proxy_max_height: int = 360
+    proxy_frame_rate: float = 2.0
+    proxy_audio_sample_rate: int = 16000
+    raw_upload_retention_days: int = Field(default=7, env="RAW_UPLOAD_RETENTION_DAYS")
+
+    # Segmented Processing - Split long videos into time segments processed in parallel
+    segmented_processing_enabled: bool = Field(default=False, env="SEGMENTED_PROCESSING_ENABLED")
+    segmented_processing_min_video_seconds: float = 300.0
+    segment_duration_seconds: float = Field(default=120.0, env="SEGMENT_DURATION_SECONDS")
+    segment_max_workers: int = Field(default=4, env="SEGMENT_MAX_WORKERS")
+    segment_executor: str = "process"  # Pool for simulated segments, "process" or "thread"; edge segments use threads
     
     # Development URLs
     frontend_url: str = "http://localhost:5173"
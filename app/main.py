@@ -1,11 +1,31 @@
 """Main FastAPI application for video2music."""
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from app.config import settings
-from app.routes import requests
+from app.routes import metrics, recommendations, requests
+from app.services.jwt_verifier import jwt_verifier
+from app.services.segmented_processing import shutdown_segment_executor
+from app.services.spotify_service import spotify_service
+from app.services.supabase_client import supabase_service
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start up and shut down shared service resources."""
+    await spotify_service.startup()
+    await supabase_service.startup()
+    await jwt_verifier.startup()
+    yield
+    await jwt_verifier.shutdown()
+    await spotify_service.shutdown()
+    await supabase_service.shutdown()
+    shutdown_segment_executor()
+
 
 # Create FastAPI app
 app = FastAPI(
@@ -13,6 +33,7 @@ app = FastAPI(
     version=settings.app_version,
     description="AI-powered video analysis for mood-based music recommendations",
     debug=settings.debug,
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -22,10 +43,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include routers
 app.include_router(requests.router)
+app.include_router(metrics.router)
+app.include_router(recommendations.router)
 
 
 @app.get("/")
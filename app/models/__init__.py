@@ -6,6 +6,8 @@ from .requests import (
     ProcessingRequestResponse,
     ProcessingStatus,
     ProcessingResult,
+    StageMetrics,
+    VideoMetadata,
 )
 from .users import User, UserCreate, UserResponse
 
@@ -15,6 +17,8 @@ __all__ = [
     "ProcessingRequestResponse",
     "ProcessingStatus",
     "ProcessingResult",
+    "StageMetrics",
+    "VideoMetadata",
     "User",
     "UserCreate",
     "UserResponse",
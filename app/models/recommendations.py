@@ -0,0 +1,49 @@
+"""Music recommendation API models."""
+
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+from app.models.requests import MusicRecommendation
+
+
+class SceneDescriptor(BaseModel):
+    """Scene analysis to recommend music for."""
+
+    scene_mood: str = Field(min_length=1)
+    scene_description: Optional[str] = None
+    visual_elements: List[str] = []
+    ambient_tags: List[str] = []
+    music_year_start: Optional[int] = Field(default=None, ge=1950, le=2100)
+    music_year_end: Optional[int] = Field(default=None, ge=1950, le=2100)
+    limit: int = Field(default=3, ge=1, le=20)
+
+    @model_validator(mode="after")
+    def check_year_range(self) -> "SceneDescriptor":
+        if (
+            self.music_year_start is not None
+            and self.music_year_end is not None
+            and self.music_year_start > self.music_year_end
+        ):
+            raise ValueError("Start year cannot be greater than end year")
+        return self
+
+
+class BatchRecommendationRequest(BaseModel):
+    """Model for requesting recommendations for many scenes at once."""
+
+    scenes: List[SceneDescriptor] = Field(min_length=1)
+
+
+class SceneRecommendations(BaseModel):
+    """Recommendations for one scene of a batch."""
+
+    recommendations: List[MusicRecommendation] = []
+    error: Optional[str] = None
+
+
+class BatchRecommendationResponse(BaseModel):
+    """Model for batch recommendation API responses, in request order."""
+
+    results: List[SceneRecommendations]
+    unique_scenes: int
@@ -41,6 +41,19 @@ class ProcessingProgress(BaseModel):
     timestamp: datetime
 
 
+class StageMetrics(BaseModel):
+    """Resource usage recorded for a single pipeline stage."""
+
+    stage: str
+    wall_time: float = Field(ge=0.0)
+    cpu_time: Optional[float] = None
+    peak_rss_bytes: Optional[int] = None
+    bytes_in: int = 0
+    bytes_out: int = 0
+    started_at: Optional[datetime] = None
+    segment: Optional[int] = None
+
+
 class ProcessingResult(BaseModel):
     """Processing result model."""
 
@@ -55,6 +68,24 @@ class ProcessingResult(BaseModel):
     processing_duration: Optional[float] = None
     model_versions: Dict[str, str] = {}
     progress_updates: List[ProcessingProgress] = []
+    stage_metrics: List[StageMetrics] = []
+    segments: List[Dict[str, Any]] = []
+
+
+class VideoMetadata(BaseModel):
+    """Container metadata probed from the uploaded video's header."""
+
+    container: Optional[str] = None
+    duration_seconds: Optional[float] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    frame_rate: Optional[float] = None
+    video_codec: Optional[str] = None
+    audio_codec: Optional[str] = None
+    has_video: bool = False
+    has_audio: bool = False
+    size_bytes: Optional[int] = None
+    bit_rate: Optional[int] = None
 
 
 class ProcessingRequest(BaseModel):
@@ -68,6 +99,10 @@ class ProcessingRequest(BaseModel):
     description: Optional[str] = None
     music_year_start: Optional[int] = Field(default=1980, ge=1950, le=2024)
     music_year_end: Optional[int] = Field(default=2024, ge=1950, le=2024)
+    video_metadata: Optional[VideoMetadata] = None
+    estimated_cost: Optional[float] = None
+    proxy_video_url: Optional[str] = None
+    proxy_audio_url: Optional[str] = None
     result: Optional[ProcessingResult] = None
     error_message: Optional[str] = None
     created_at: datetime
@@ -85,6 +120,41 @@ class ProcessingRequestCreate(BaseModel):
     music_year_end: Optional[int] = Field(default=2024, ge=1950, le=2024)
 
 
+class RerankRequest(BaseModel):
+    """Model for re-selecting music for a completed request with new preferences.
+
+    Omitted or null fields keep the request's stored preferences.
+    """
+
+    description: Optional[str] = None
+    music_year_start: Optional[int] = Field(default=None, ge=1950)
+    music_year_end: Optional[int] = Field(default=None, ge=1950)
+    limit: Optional[int] = Field(default=None, ge=1, le=20)
+
+
+class ProcessingRequestSummary(BaseModel):
+    """Model for request listings: a processing request without its result."""
+
+    id: UUID
+    user_id: UUID
+    video_filename: str
+    video_url: Optional[str] = None
+    status: ProcessingStatus
+    description: Optional[str] = None
+    music_year_start: Optional[int] = None
+    music_year_end: Optional[int] = None
+    video_metadata: Optional[VideoMetadata] = None
+    estimated_cost: Optional[float] = None
+    proxy_video_url: Optional[str] = None
+    proxy_audio_url: Optional[str] = None
+    scene_mood: Optional[str] = None
+    recommendation_count: Optional[int] = None
+    error_message: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    completed_at: Optional[datetime] = None
+
+
 class ProcessingRequestResponse(BaseModel):
     """Model for processing request API responses."""
 
@@ -96,6 +166,10 @@ class ProcessingRequestResponse(BaseModel):
     description: Optional[str] = None
     music_year_start: Optional[int] = None
     music_year_end: Optional[int] = None
+    video_metadata: Optional[VideoMetadata] = None
+    estimated_cost: Optional[float] = None
+    proxy_video_url: Optional[str] = None
+    proxy_audio_url: Optional[str] = None
     result: Optional[ProcessingResult] = None
     error_message: Optional[str] = None
     created_at: datetime
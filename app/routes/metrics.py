@@ -0,0 +1,88 @@
+"""API routes for operational metrics."""
+
+import logging
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app.auth import get_admin_user, get_current_user
+from app.services.instrumentation import summarize_stage_metrics
+from app.services.jwt_verifier import jwt_verifier
+from app.services.spotify_service import spotify_service
+from app.services.supabase_client import supabase_service
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/stages")
+async def get_stage_metrics(
+    limit: int = Query(500, ge=1, le=5000),
+    current_user: Dict[str, Any] = Depends(get_admin_user)
+) -> Dict[str, Any]:
+    """
+    Get per-stage timing and resource percentiles over recent completed requests.
+
+    The percentiles cover every user's requests, so this needs the admin role.
+
+    Args:
+        limit: Number of most recent completed requests to aggregate
+        current_user: Current authenticated admin user
+
+    Returns:
+        Per-stage sample counts and p50/p90/p95/p99/max for wall time, CPU time,
+        peak RSS and bytes in/out
+    """
+    try:
+        stage_metrics = await supabase_service.get_recent_stage_metrics(limit=limit)
+        return {
+            "request_limit": limit,
+            "stages": summarize_stage_metrics(stage_metrics),
+        }
+
+    except Exception as e:
+        logger.error(f"Failed to get stage metrics: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve stage metrics"
+        )
+
+
+@router.get("/spotify")
+async def get_spotify_metrics(
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """
+    Get Spotify client metrics.
+
+    Args:
+        current_user: Current authenticated user
+
+    Returns:
+        Search and recommendation cache hit/miss counters and size, rate limiter
+        and circuit breaker state
+    """
+    cache = spotify_service.recommendation_cache
+    return {
+        "search_cache": spotify_service.search_cache_stats(),
+        "recommendation_cache": await cache.stats() if cache is not None else None,
+        **spotify_service.rate_limit_stats(),
+    }
+
+
+@router.get("/auth")
+async def get_auth_metrics(
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """
+    Get access token verification metrics.
+
+    Args:
+        current_user: Current authenticated user
+
+    Returns:
+        Verification mode, signing key refresh count and authenticated-user
+        cache hit/miss counters and size
+    """
+    return jwt_verifier.stats()
@@ -0,0 +1,63 @@
+"""API routes for music recommendations."""
+
+import logging
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from app.auth import get_current_user
+from app.config import settings
+from app.models.recommendations import (
+    BatchRecommendationRequest,
+    BatchRecommendationResponse,
+    SceneRecommendations,
+)
+from app.services.spotify_service import spotify_service
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/recommendations", tags=["recommendations"])
+
+
+@router.post("/batch", response_model=BatchRecommendationResponse)
+async def get_batch_recommendations(
+    batch: BatchRecommendationRequest,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> BatchRecommendationResponse:
+    """
+    Get music recommendations for many scenes, e.g. every clip of a timeline, in one call.
+
+    Identical scenes are resolved once and Spotify searches are shared across
+    the batch. A scene that fails gets an error entry instead of failing the batch.
+
+    Args:
+        batch: Scene descriptors to get recommendations for
+        current_user: Current authenticated user
+
+    Returns:
+        Recommendations per scene, in request order
+
+    Raises:
+        HTTPException: If the batch has more than ``recommendation_batch_max_scenes`` scenes
+    """
+    if len(batch.scenes) > settings.recommendation_batch_max_scenes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many scenes. Maximum per batch: {settings.recommendation_batch_max_scenes}"
+        )
+
+    logger.info(f"Batch recommendations for user {current_user['id']}: {len(batch.scenes)} scenes")
+    results, unique_scenes = await spotify_service.get_recommendations_batch([scene.model_dump() for scene in batch.scenes])
+
+    scene_results = []
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"Scene recommendation failed: {result}")
+            scene_results.append(SceneRecommendations(error="Failed to get recommendations for this scene"))
+        else:
+            scene_results.append(SceneRecommendations(recommendations=result))
+
+    return BatchRecommendationResponse(
+        results=scene_results,
+        unique_scenes=unique_scenes,
+    )
@@ -1,12 +1,27 @@
 """API routes for processing requests."""
 
+import base64
+import json
 import logging
-from typing import List, Dict, Any
-from uuid import uuid4
-from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File, Form
+import time
+from typing import List, Dict, Any, Optional, Tuple
+from uuid import UUID, uuid4
+from fastapi import APIRouter, BackgroundTasks, HTTPException, status, Depends, UploadFile, File, Form, Query, Response
 from app.auth import get_current_user, require_user_access
+from app.services.spotify_service import spotify_service
 from app.services.supabase_client import supabase_service
-from app.models.requests import ProcessingRequestResponse, ProcessingRequestCreate
+from app.services.video_probe import (
+    VideoRejectedError,
+    check_admission,
+    estimate_processing_cost,
+    probe_video,
+)
+from app.models.requests import (
+    ProcessingRequestCreate,
+    ProcessingRequestResponse,
+    ProcessingRequestSummary,
+    RerankRequest,
+)
 from app.config import settings
 from datetime import datetime
 
@@ -14,28 +29,9 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/requests", tags=["requests"])
 
-@router.post("/", response_model=ProcessingRequestResponse)
-async def create_processing_request(
-    video_file: UploadFile = File(...),
-    description: str = Form(None),
-    music_year_start: int = Form(1980),
-    music_year_end: int = Form(2024),
-    current_user: Dict[str, Any] = Depends(get_current_user)
-) -> ProcessingRequestResponse:
-    """
-    Create a new video processing request with music preferences.
-    
-    This endpoint:
-    1. Validates the uploaded video file
-    2. Uploads it to Supabase Storage  
-    3. Creates a processing request record
-    4. Enqueues the processing job
-    5. Returns the request details
-    """
-    logger.info(f"Creating processing request for user: {current_user['id']}")
-    logger.info(f"Music year preferences: {music_year_start}-{music_year_end}")
-    
-    # Validate year range
+
+def _validate_year_range(music_year_start: int, music_year_end: int) -> None:
+    """Reject music year preferences outside 1950 to the current year, or reversed."""
     current_year = datetime.now().year
     if music_year_start < 1950 or music_year_start > current_year:
         raise HTTPException(
@@ -55,6 +51,64 @@ async def create_processing_request(
             detail="Start year cannot be greater than end year"
         )
 
+def _encode_cursor(request: Dict[str, Any]) -> str:
+    """Opaque cursor for the page after ``request``."""
+    payload = json.dumps([request["created_at"], request["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, str]:
+    """The ``(created_at, id)`` position of a cursor from ``_encode_cursor``."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, request_id = json.loads(base64.urlsafe_b64decode(padded))
+        # Validate both parts before they reach the query
+        datetime.fromisoformat(created_at)
+        return created_at, str(UUID(request_id))
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+async def _run_processing_job(request_id: str, **job: Any) -> None:
+    """Run a request's processing job (proxy transcode and analysis) after the upload response is sent."""
+    job_enqueued = await supabase_service.enqueue_processing_job(request_id=request_id, **job)
+    
+    if not job_enqueued:
+        logger.warning(f"Failed to enqueue processing job for request {request_id}")
+        # Update status to failed
+        await supabase_service.update_request_status(
+            request_id=request_id,
+            status="failed",
+            error_message="Failed to start processing pipeline"
+        )
+
+@router.post("/", response_model=ProcessingRequestResponse)
+async def create_processing_request(
+    background_tasks: BackgroundTasks,
+    video_file: UploadFile = File(...),
+    description: str = Form(None),
+    music_year_start: int = Form(1980),
+    music_year_end: int = Form(2024),
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> ProcessingRequestResponse:
+    """
+    Create a new video processing request with music preferences.
+    
+    This endpoint:
+    1. Validates the uploaded video file
+    2. Probes its header for metadata and rejects pathological inputs
+    3. Uploads it to Supabase Storage  
+    4. Creates a processing request record with metadata and cost estimate
+    5. Schedules the processing job to run after the response is sent
+    6. Returns the request details
+    """
+    logger.info(f"Creating processing request for user: {current_user['id']}")
+    logger.info(f"Music year preferences: {music_year_start}-{music_year_end}")
+    
+    _validate_year_range(music_year_start, music_year_end)
+
     try:
         # Validate file
         if not video_file.filename:
@@ -79,6 +133,23 @@ async def create_processing_request(
                 detail=f"File too large. Maximum size: {settings.upload_max_size / 1024 / 1024}MB"
             )
         
+        # Probe container metadata from the header and apply admission control
+        video_metadata = await probe_video(file_content)
+        estimated_cost = None
+        if video_metadata:
+            estimated_cost = estimate_processing_cost(video_metadata)
+            try:
+                check_admission(video_metadata, estimated_cost)
+            except VideoRejectedError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=str(e)
+                )
+            logger.info(
+                f"Probed {video_file.filename}: {video_metadata.duration_seconds}s "
+                f"{video_metadata.width}x{video_metadata.height}, estimated cost {estimated_cost}s"
+            )
+        
         # Generate unique filename
         file_id = str(uuid4())
         file_path = f"videos/{current_user['id']}/{file_id}_{video_file.filename}"
@@ -104,7 +175,10 @@ async def create_processing_request(
             video_url=video_url,
             description=description,
             music_year_start=music_year_start,
-            music_year_end=music_year_end
+            music_year_end=music_year_end,
+            video_metadata=video_metadata.model_dump() if video_metadata else None,
+            estimated_cost=estimated_cost,
+            video_path=file_path
         )
         
         if not request_data:
@@ -113,24 +187,20 @@ async def create_processing_request(
                 detail="Failed to create processing request"
             )
         
-        # Enqueue processing job with enhanced context
-        job_enqueued = await supabase_service.enqueue_processing_job(
+        # The proxy transcode and analysis run after the response, so the upload returns at once
+        background_tasks.add_task(
+            _run_processing_job,
             request_id=request_data["id"],
             video_url=video_url,
             description=description,
             music_year_start=music_year_start,
-            music_year_end=music_year_end
+            music_year_end=music_year_end,
+            video_duration=video_metadata.duration_seconds if video_metadata else None,
+            video_path=file_path,
+            video_size=len(file_content),
+            has_audio=video_metadata.has_audio if video_metadata else True
         )
         
-        if not job_enqueued:
-            logger.warning(f"Failed to enqueue processing job for request {request_data['id']}")
-            # Update status to failed
-            await supabase_service.update_request_status(
-                request_id=request_data["id"],
-                status="failed",
-                error_message="Failed to start processing pipeline"
-            )
-        
         logger.info(f"Created processing request: {request_data['id']}")
         return ProcessingRequestResponse(**request_data)
         
@@ -143,22 +213,42 @@ async def create_processing_request(
             detail="Internal server error"
         )
 
-@router.get("/", response_model=List[ProcessingRequestResponse])
+@router.get("/", response_model=List[ProcessingRequestSummary])
 async def get_user_requests(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = Query(None),
     current_user: Dict[str, Any] = Depends(get_current_user)
-) -> List[ProcessingRequestResponse]:
+) -> List[ProcessingRequestSummary]:
     """
-    Get all processing requests for the current user.
+    Get a page of the current user's processing requests, newest first.
+    
+    Requests are summarized without their results; fetch
+    ``GET /requests/{id}`` for the full analysis. When more requests follow,
+    the ``X-Next-Cursor`` response header holds the cursor for the next page.
     
     Args:
+        response: Response, for the next-page cursor header
+        limit: Page size, capped at ``requests_page_size_max``
+        cursor: ``X-Next-Cursor`` value from the previous page
         current_user: Current authenticated user
         
     Returns:
-        List of user's processing requests
+        Page of request summaries
+        
+    Raises:
+        HTTPException: If the cursor is invalid
     """
+    page_size = min(limit or settings.requests_page_size, settings.requests_page_size_max)
+    before = _decode_cursor(cursor) if cursor else None
+    
     try:
-        requests = await supabase_service.get_user_requests(current_user["id"])
-        return [ProcessingRequestResponse(**request) for request in requests]
+        # One extra row tells whether another page follows
+        requests = await supabase_service.get_user_requests(current_user["id"], limit=page_size + 1, before=before)
+        if len(requests) > page_size:
+            requests = requests[:page_size]
+            response.headers["X-Next-Cursor"] = _encode_cursor(requests[-1])
+        return [ProcessingRequestSummary(**request) for request in requests]
         
     except Exception as e:
         logger.error(f"Failed to get user requests: {e}")
@@ -208,6 +298,96 @@ async def get_request(
             detail="Failed to retrieve request"
         )
 
+@router.post("/{request_id}/rerank", response_model=ProcessingRequestResponse)
+async def rerank_request(
+    request_id: str,
+    preferences: RerankRequest,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> ProcessingRequestResponse:
+    """
+    Re-select music for a completed request with new preferences.
+    
+    The stored scene analysis (mood, visual elements, ambient tags) is reused
+    and only recommendation selection runs again, so no video is reprocessed.
+    Preferences left out keep their stored values.
+    
+    Args:
+        request_id: Processing request ID
+        preferences: New description and/or music year range
+        current_user: Current authenticated user
+        
+    Returns:
+        The request with updated preferences and recommendations
+        
+    Raises:
+        HTTPException: If request not found, not completed, or preferences are invalid
+    """
+    try:
+        request_data = await supabase_service.get_request_by_id(
+            request_id=request_id,
+            user_id=current_user["id"]
+        )
+        
+        if not request_data:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Processing request not found"
+            )
+        
+        result = request_data.get("result") or {}
+        if request_data["status"] != "completed" or not result.get("scene_mood"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Only completed requests with a scene analysis can be re-ranked"
+            )
+        
+        fields = preferences.model_dump(exclude_unset=True, exclude_none=True)
+        description = fields.get("description", request_data.get("description"))
+        music_year_start = fields.get("music_year_start", request_data.get("music_year_start") or 1980)
+        music_year_end = fields.get("music_year_end", request_data.get("music_year_end") or datetime.now().year)
+        _validate_year_range(music_year_start, music_year_end)
+        
+        start = time.perf_counter()
+        recommendations = await spotify_service.get_recommendations_by_scene(
+            scene_description=result.get("scene_description") or "",
+            scene_mood=result["scene_mood"],
+            visual_elements=result.get("visual_elements") or [],
+            ambient_tags=result.get("ambient_tags") or [],
+            limit=preferences.limit or len(result.get("recommendations") or []) or 3,
+            music_year_start=music_year_start,
+            music_year_end=music_year_end,
+            user_description=description,
+        )
+        logger.info(
+            f"Re-ranked request {request_id} in {(time.perf_counter() - start) * 1000:.1f}ms: "
+            f"{len(recommendations)} recommendations for {music_year_start}-{music_year_end}"
+        )
+        
+        updated = await supabase_service.update_request_preferences(
+            request_id=request_id,
+            description=description,
+            music_year_start=music_year_start,
+            music_year_end=music_year_end,
+            result={**result, "recommendations": recommendations},
+        )
+        
+        if not updated:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to save re-ranked recommendations"
+            )
+        
+        return ProcessingRequestResponse(**updated)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to re-rank request {request_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to re-rank request"
+        )
+
 @router.delete("/{request_id}")
 async def delete_request(
     request_id: str,
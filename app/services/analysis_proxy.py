@@ -0,0 +1,164 @@
+"""Low-resolution analysis proxies so downstream stages avoid full-resolution decode."""
+
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AnalysisProxy:
+    """Proxy media produced once per job and stored next to the original upload."""
+
+    video_url: Optional[str] = None
+    audio_url: Optional[str] = None
+    video_path: Optional[str] = None
+    audio_path: Optional[str] = None
+    # Bytes of proxy media uploaded for this job; zero when a stored proxy was reused
+    bytes_written: int = 0
+
+
+def proxy_storage_paths(video_path: str) -> Tuple[str, str]:
+    """Storage paths for the video and audio proxies of an uploaded ``video_path``."""
+    stem, _ = os.path.splitext(video_path)
+    return f"{stem}.proxy.mp4", f"{stem}.{settings.proxy_audio_sample_rate // 1000}k.wav"
+
+
+def build_proxy_command(source: str, video_out: str, audio_out: Optional[str]) -> List[str]:
+    """
+    Build a single ffmpeg invocation that decodes the source once and writes both proxies.
+
+    The video proxy is capped at ``proxy_max_height`` and ``proxy_frame_rate`` with
+    a keyframe on every frame so samplers can seek anywhere cheaply; the audio
+    proxy is mono 16-bit PCM at ``proxy_audio_sample_rate``.
+    """
+    height = settings.proxy_max_height
+    command = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-i", source,
+        "-map", "0:v:0",
+        "-vf", f"fps={settings.proxy_frame_rate:g},scale=-2:'min({height},ih)'",
+        "-c:v", "libx264", "-preset", "veryfast", "-crf", "28", "-g", "1",
+        "-movflags", "+faststart",
+        "-an", video_out,
+    ]
+    if audio_out:
+        command += [
+            "-map", "0:a:0",
+            "-vn", "-ac", "1", "-ar", str(settings.proxy_audio_sample_rate),
+            "-c:a", "pcm_s16le",
+            audio_out,
+        ]
+    return command
+
+
+async def build_analysis_proxy(source: str, workdir: str, has_audio: bool = True) -> AnalysisProxy:
+    """
+    Transcode ``source`` (a local path or URL) into analysis proxies in ``workdir``.
+
+    Raises:
+        RuntimeError: If ffmpeg is unavailable or the transcode fails
+    """
+    if shutil.which("ffmpeg") is None:
+        raise RuntimeError("ffmpeg not found")
+
+    video_out = os.path.join(workdir, "proxy.mp4")
+    audio_out = os.path.join(workdir, "audio.wav") if has_audio else None
+
+    process = await asyncio.create_subprocess_exec(
+        *build_proxy_command(source, video_out, audio_out),
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        _, stderr = await asyncio.wait_for(process.communicate(), timeout=settings.max_processing_time)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise RuntimeError("Proxy transcode timed out")
+
+    if process.returncode != 0:
+        raise RuntimeError(f"Proxy transcode failed: {stderr.decode(errors='replace').strip()}")
+
+    return AnalysisProxy(video_path=video_out, audio_path=audio_out)
+
+
+async def ensure_analysis_proxy(
+    request_id: str,
+    source: str,
+    video_path: str,
+    has_audio: bool = True,
+) -> Optional[AnalysisProxy]:
+    """
+    Build, upload and record the analysis proxy for a request.
+
+    A proxy already recorded for the request (e.g. on a re-run) is reused
+    without transcoding or uploading again.
+
+    Args:
+        request_id: Processing request ID
+        source: Local path or URL of the original upload
+        video_path: Storage path of the original upload in the videos bucket
+        has_audio: Whether the upload has an audio stream
+
+    Returns:
+        Uploaded proxy URLs, or None if the proxy could not be produced
+    """
+    from app.services.supabase_client import supabase_service
+
+    stored = await supabase_service.get_request_proxy(request_id)
+    if stored and stored.get("proxy_video_url"):
+        logger.info(f"Reusing analysis proxy for request {request_id}")
+        return AnalysisProxy(video_url=stored["proxy_video_url"], audio_url=stored.get("proxy_audio_url"))
+
+    proxy_video_path, proxy_audio_path = proxy_storage_paths(video_path)
+
+    with tempfile.TemporaryDirectory(dir=settings.media_cache_dir or None) as workdir:
+        try:
+            proxy = await build_analysis_proxy(source, workdir, has_audio=has_audio)
+        except RuntimeError as e:
+            logger.warning(f"Analysis proxy skipped for request {request_id}: {e}")
+            return None
+
+        with open(proxy.video_path, "rb") as video_file:
+            video_content = video_file.read()
+        proxy.video_url = await supabase_service.upload_file(
+            bucket="videos", file_path=proxy_video_path, file_content=video_content,
+            content_type="video/mp4", upsert=True
+        )
+        proxy.bytes_written = len(video_content)
+        if proxy.audio_path:
+            with open(proxy.audio_path, "rb") as audio_file:
+                audio_content = audio_file.read()
+            proxy.audio_url = await supabase_service.upload_file(
+                bucket="videos", file_path=proxy_audio_path, file_content=audio_content,
+                content_type="audio/wav", upsert=True
+            )
+            proxy.bytes_written += len(audio_content)
+
+    if not proxy.video_url:
+        return None
+
+    await supabase_service.update_request_proxy(
+        request_id=request_id,
+        proxy_video_url=proxy.video_url,
+        proxy_audio_url=proxy.audio_url,
+    )
+    logger.info(f"Analysis proxy ready for request {request_id}")
+    return proxy
+
+
+if __name__ == "__main__":
+    # Run periodically (e.g. from cron) to delete raw uploads whose proxies are in place
+    from app.services.supabase_client import supabase_service
+
+    logging.basicConfig(level=logging.INFO)
+    expired = asyncio.run(supabase_service.expire_raw_uploads())
+    logger.info(f"Expired {expired} raw uploads")
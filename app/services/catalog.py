@@ -0,0 +1,338 @@
+"""Local track catalog with vectorized nearest-neighbor mood matching."""
+
+import asyncio
+import csv
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from app.config import settings
+from app.services.catalog_index import IVFIndex
+
+logger = logging.getLogger(__name__)
+
+# Audio features making up a track's position in mood space, in vector order
+FEATURES = ("energy", "valence", "danceability", "tempo")
+
+# Tempo (BPM) range mapped onto [0, 1] so it is comparable to the other features
+TEMPO_RANGE = (50.0, 200.0)
+
+CATALOG_FIELDS = ("title", "artist", "genre", "year", *FEATURES, "popularity", "spotify_id")
+
+_catalog: Optional["TrackCatalog"] = None
+_catalog_loaded = False
+_catalog_lock = threading.Lock()
+
+
+def normalize_tempo(tempo: Any) -> np.ndarray:
+    low, high = TEMPO_RANGE
+    return np.clip((np.asarray(tempo, dtype=np.float32) - low) / (high - low), 0.0, 1.0)
+
+
+def target_vector(mood_params: Dict[str, Any]) -> np.ndarray:
+    """Build a feature vector from ``SpotifyService._map_mood_to_spotify_params`` output.
+
+    Tempo may be a number or a ``"low-high"`` range string, whose midpoint is used.
+    """
+    tempo = mood_params.get("tempo", 110)
+    if isinstance(tempo, str):
+        low, _, high = tempo.partition("-")
+        tempo = (float(low) + float(high or low)) / 2
+    return np.array(
+        [
+            mood_params.get("energy", 0.5),
+            mood_params.get("valence", 0.5),
+            mood_params.get("danceability", 0.5),
+            normalize_tempo(tempo),
+        ],
+        dtype=np.float32,
+    )
+
+
+class TrackCatalog:
+    """Tracks stored as parallel column arrays with a normalized feature matrix.
+
+    Searches compute weighted squared distances from a target vector over the
+    whole (year-filtered) matrix in one NumPy expression, or go through an
+    attached :class:`IVFIndex` for large catalogs.
+    """
+
+    def __init__(
+        self,
+        title: Sequence[str],
+        artist: Sequence[str],
+        genre: Sequence[str],
+        year: Sequence[int],
+        energy: Sequence[float],
+        valence: Sequence[float],
+        danceability: Sequence[float],
+        tempo: Sequence[float],
+        popularity: Optional[Sequence[float]] = None,
+        spotify_id: Optional[Sequence[Optional[str]]] = None,
+    ):
+        self.title = np.asarray(title, dtype=object)
+        self.artist = np.asarray(artist, dtype=object)
+        self.genre = np.asarray(genre, dtype=object)
+        # 0 marks an unknown release year, as in the IVF index
+        self.year = np.asarray([0 if value is None else value for value in year], dtype=np.int16)
+        self.energy = np.asarray(energy, dtype=np.float32)
+        self.valence = np.asarray(valence, dtype=np.float32)
+        self.danceability = np.asarray(danceability, dtype=np.float32)
+        self.tempo = np.asarray(tempo, dtype=np.float32)
+        size = len(self.title)
+        self.popularity = (
+            np.asarray(popularity, dtype=np.float32) if popularity is not None else np.full(size, 50, np.float32)
+        )
+        self.spotify_id = (
+            np.asarray(spotify_id, dtype=object) if spotify_id is not None else np.full(size, None, dtype=object)
+        )
+        self.features = np.ascontiguousarray(
+            np.column_stack([self.energy, self.valence, self.danceability, normalize_tempo(self.tempo)]),
+            dtype=np.float32,
+        )
+        self.index: Optional[IVFIndex] = None
+        self._digest: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self.title)
+
+    def digest(self) -> str:
+        """SHA-256 over the feature matrix and years, the data an IVF index is built from."""
+        if self._digest is None:
+            sha = hashlib.sha256()
+            sha.update(np.ascontiguousarray(self.features, dtype=np.float32).data)
+            sha.update(np.ascontiguousarray(self.year, dtype=np.int16).data)
+            self._digest = sha.hexdigest()
+        return self._digest
+
+    def index_matches(self, index: IVFIndex) -> bool:
+        """Whether ``index`` was built from this catalog's current rows."""
+        return index.source == {"rows": len(self), "digest": self.digest()}
+
+    def build_index(self, n_lists: Optional[int] = None, n_probe: Optional[int] = None) -> IVFIndex:
+        """Train and attach an IVF index over the feature matrix; ``n_lists`` defaults to ~sqrt(size)."""
+        n_lists = n_lists or max(1, int(np.sqrt(len(self))))
+        index = IVFIndex(len(FEATURES), n_lists=n_lists, n_probe=n_probe or settings.catalog_index_probe)
+        index.train(self.features)
+        index.add(self.features, years=self.year, genres=self.genre)
+        index.source = {"rows": len(self), "digest": self.digest()}
+        self.index = index
+        return index
+
+    @classmethod
+    def from_columns(
+        cls, columns: Dict[str, Any], features: np.ndarray, digest: Optional[str] = None
+    ) -> "TrackCatalog":
+        """Wrap existing column arrays (e.g. memory-mapped) and feature matrix without copying."""
+        catalog = cls.__new__(cls)
+        for field in CATALOG_FIELDS:
+            setattr(catalog, field, columns[field])
+        catalog.features = features
+        catalog.index = None
+        catalog._digest = digest
+        return catalog
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "TrackCatalog":
+        """Build a catalog from track dictionaries keyed by ``CATALOG_FIELDS``."""
+        records = list(records)
+        columns: Dict[str, List[Any]] = {field: [] for field in CATALOG_FIELDS}
+        for record in records:
+            for field in CATALOG_FIELDS:
+                columns[field].append(record.get(field))
+        columns["popularity"] = [50 if value is None else value for value in columns["popularity"]]
+        return cls(**columns)
+
+    @classmethod
+    def load(cls, path: str) -> "TrackCatalog":
+        """Load a catalog from a ``.csv`` file with a header row or a ``.json`` list of tracks."""
+        if path.endswith(".json"):
+            with open(path, "r", encoding="utf-8") as f:
+                return cls.from_records(json.load(f))
+
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+        for row in rows:
+            row["year"] = int(row["year"]) if (row.get("year") or "").strip() else None
+            for field in (*FEATURES, "popularity"):
+                row[field] = float(row[field]) if row.get(field) not in (None, "") else None
+            row["spotify_id"] = row.get("spotify_id") or None
+        return cls.from_records(rows)
+
+    def search(
+        self,
+        target: np.ndarray,
+        k: int = 3,
+        year_start: Optional[int] = None,
+        year_end: Optional[int] = None,
+        weights: Optional[np.ndarray] = None,
+    ) -> List[tuple]:
+        """
+        Find the ``k`` tracks closest to ``target`` in feature space.
+
+        Args:
+            target: Target feature vector (see :func:`target_vector`)
+            k: Number of tracks to return
+            year_start: Earliest release year, inclusive
+            year_end: Latest release year, inclusive; with either bound set, tracks
+                of unknown year are excluded
+            weights: Per-feature distance weights; defaults to equal weights
+
+        Returns:
+            ``(row_index, distance)`` pairs ordered by distance, then popularity
+        """
+        if self.index is not None and weights is None:
+            ids, distances = self.index.search(target, k, year_start=year_start, year_end=year_end)
+            order = np.lexsort((-self.popularity[ids], distances))
+            return [(int(ids[i]), float(distances[i])) for i in order]
+
+        candidates = np.arange(len(self))
+        if year_start is not None or year_end is not None:
+            # Unknown years (0) match no year range, as in the IVF index
+            mask = self.year != 0
+            if year_start is not None:
+                mask &= self.year >= year_start
+            if year_end is not None:
+                mask &= self.year <= year_end
+            candidates = np.flatnonzero(mask)
+        if candidates.size == 0 or k <= 0:
+            return []
+
+        diff = self.features[candidates] - target
+        if weights is not None:
+            distances = np.einsum("ij,ij,j->i", diff, diff, weights)
+        else:
+            distances = np.einsum("ij,ij->i", diff, diff)
+
+        if candidates.size > k:
+            nearest = np.argpartition(distances, k - 1)[:k]
+        else:
+            nearest = np.arange(candidates.size)
+        # Order by distance, breaking ties by popularity
+        order = np.lexsort((-self.popularity[candidates[nearest]], distances[nearest]))
+        return [(int(candidates[nearest[i]]), float(distances[nearest[i]])) for i in order]
+
+    def track(self, index: int) -> Dict[str, Any]:
+        """Return one catalog row as a dictionary."""
+        return {
+            "title": self.title[index] or "",
+            "artist": self.artist[index] or "",
+            "genre": self.genre[index] or "",
+            "year": int(self.year[index]) or None,
+            "energy": float(self.energy[index]),
+            "valence": float(self.valence[index]),
+            "danceability": float(self.danceability[index]),
+            "tempo": float(self.tempo[index]),
+            "popularity": float(self.popularity[index]),
+            "spotify_id": self.spotify_id[index],
+        }
+
+
+def get_catalog() -> Optional[TrackCatalog]:
+    """Return the catalog at ``track_catalog_path``, loading it on first use; None if not configured.
+
+    Loading maps or parses files, so call it from a thread (see :func:`load_catalog`) inside async code.
+    """
+    global _catalog, _catalog_loaded
+    if _catalog_loaded:
+        return _catalog
+    with _catalog_lock:
+        if not _catalog_loaded:
+            _catalog = _load_configured_catalog()
+            _catalog_loaded = True
+    return _catalog
+
+
+async def load_catalog() -> Optional[TrackCatalog]:
+    """Async :func:`get_catalog` that performs the first load on a worker thread."""
+    if _catalog_loaded:
+        return _catalog
+    return await asyncio.to_thread(get_catalog)
+
+
+def _load_configured_catalog() -> Optional[TrackCatalog]:
+    catalog = None
+    path = settings.track_catalog_path
+    if path and os.path.isdir(path):
+        from app.services.catalog_store import open_catalog
+        catalog = open_catalog(path)
+    elif path and os.path.exists(path):
+        catalog = TrackCatalog.load(path)
+        logger.info(f"Loaded track catalog with {len(catalog)} tracks from {path}")
+    elif path:
+        logger.warning(f"Track catalog not found at {path}")
+    if catalog is None:
+        return None
+
+    index_path = settings.track_catalog_index_path
+    if not index_path and os.path.isdir(path):
+        index_path = os.path.join(path, "index")
+    if index_path and os.path.isdir(index_path):
+        index = IVFIndex.load(index_path)
+        if catalog.index_matches(index):
+            catalog.index = index
+        else:
+            logger.warning(
+                f"IVF index at {index_path} was built from a different catalog "
+                f"({index.source.get('rows')} rows); ignoring it and searching exactly"
+            )
+    if catalog.index is None and len(catalog) >= settings.catalog_index_min_tracks:
+        # Indexes are built offline (catalog_store build --index / index), never while serving
+        logger.warning(
+            f"Track catalog has {len(catalog)} tracks but no IVF index; searching exactly. "
+            f"Build one with `python -m app.services.catalog_store`"
+        )
+    return catalog
+
+
+def recommend_from_catalog(
+    catalog: TrackCatalog,
+    mood_params: Dict[str, Any],
+    scene_mood: str,
+    limit: int = 3,
+    year_start: Optional[int] = None,
+    year_end: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Recommend the catalog tracks nearest to a scene's target mood vector.
+
+    Args:
+        catalog: Track catalog to search
+        mood_params: Target audio features for the scene mood
+        scene_mood: Detected scene mood, reported on each recommendation
+        limit: Number of recommendations
+        year_start: Earliest release year, inclusive
+        year_end: Latest release year, inclusive
+
+    Returns:
+        Recommendations in the same format as Spotify search results
+    """
+    # Largest possible squared distance in the unit feature cube
+    max_distance = float(len(FEATURES))
+    recommendations = []
+    for index, distance in catalog.search(target_vector(mood_params), limit, year_start, year_end):
+        track = catalog.track(index)
+        spotify_id = track["spotify_id"]
+        recommendations.append({
+            "title": track["title"],
+            "artist": track["artist"],
+            "genre": track["genre"],
+            "mood": scene_mood,
+            "energy_level": track["energy"],
+            "valence": track["valence"],
+            "spotify_id": spotify_id,
+            "spotify_url": f"https://open.spotify.com/track/{spotify_id}" if spotify_id else None,
+            "confidence_score": round(1.0 - (distance / max_distance) ** 0.5, 3),
+            "audio_features": {
+                "danceability": track["danceability"],
+                "tempo": track["tempo"],
+                "popularity": track["popularity"],
+                "year": track["year"],
+            },
+        })
+    return recommendations
@@ -0,0 +1,264 @@
+"""Inverted-file (IVF) approximate nearest-neighbor index over track feature vectors."""
+
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Rows encoded per block when assigning vectors to centroids, bounding temporary memory
+ASSIGN_BLOCK_ROWS = 65536
+
+# Per-row arrays written by IVFIndex.save, one ``.npy`` file each
+INDEX_ARRAYS = ("vectors", "ids", "years", "genre", "assignments")
+INDEX_META_FILE = "index.json"
+
+
+def _squared_distances(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Pairwise squared L2 distances between rows of ``vectors`` and ``centroids``."""
+    return (
+        np.einsum("ij,ij->i", vectors, vectors)[:, None]
+        - 2.0 * vectors @ centroids.T
+        + np.einsum("ij,ij->i", centroids, centroids)[None, :]
+    )
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGN_BLOCK_ROWS):
+        block = vectors[start:start + ASSIGN_BLOCK_ROWS]
+        assignments[start:start + len(block)] = _squared_distances(block, centroids).argmin(axis=1)
+    return assignments
+
+
+def kmeans(vectors: np.ndarray, n_clusters: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Lloyd's k-means with random initialization; empty clusters are re-seeded from random points."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _assign(vectors, centroids)
+        counts = np.bincount(assignments, minlength=n_clusters)
+        sums = np.zeros_like(centroids, dtype=np.float64)
+        np.add.at(sums, assignments, vectors)
+        filled = counts > 0
+        centroids[filled] = (sums[filled] / counts[filled, None]).astype(centroids.dtype)
+        empty = np.flatnonzero(~filled)
+        if empty.size:
+            centroids[empty] = vectors[rng.choice(len(vectors), size=empty.size, replace=False)]
+    return centroids
+
+
+class IVFIndex:
+    """Vectors partitioned into ``n_lists`` k-means cells; queries scan only the ``n_probe`` nearest cells.
+
+    Each row carries an external id, a release year and a genre code so
+    searches can filter without touching the catalog. ``source`` describes
+    the data the index was built from (see ``TrackCatalog.build_index``) so a
+    loader can tell when it is stale. Rows can be added after
+    training and the whole index saved to a directory of ``.npy`` files that
+    :meth:`load` memory-maps read-only.
+    """
+
+    def __init__(self, dim: int, n_lists: int = 256, n_probe: int = 8):
+        self.dim = dim
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.centroids: Optional[np.ndarray] = None
+        self.source: Dict[str, Any] = {}
+        self.genres: List[str] = []
+        self._genre_codes = {}
+        self._size = 0
+        self._vectors = np.empty((0, dim), dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._years = np.empty(0, dtype=np.int16)
+        self._genre = np.empty(0, dtype=np.int32)
+        self._assignments = np.empty(0, dtype=np.int32)
+        self._lists: Optional[List[np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, vectors: np.ndarray, sample_size: int = 100_000, iterations: int = 10, seed: int = 0) -> None:
+        """Learn cell centroids from (a sample of) ``vectors``."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if len(vectors) > sample_size:
+            vectors = vectors[np.random.default_rng(seed).choice(len(vectors), sample_size, replace=False)]
+        self.n_lists = min(self.n_lists, len(vectors))
+        self.centroids = kmeans(vectors, self.n_lists, iterations=iterations, seed=seed)
+        if self._size:
+            self._assignments[:self._size] = _assign(self._vectors[:self._size], self.centroids)
+        self._lists = None
+
+    def genre_code(self, genre: Optional[str]) -> int:
+        if genre is None:
+            return -1
+        key = genre.lower()
+        if key not in self._genre_codes:
+            self._genre_codes[key] = len(self.genres)
+            self.genres.append(key)
+        return self._genre_codes[key]
+
+    def _reserve(self, extra: int) -> None:
+        needed = self._size + extra
+        if needed <= len(self._ids):
+            return
+        capacity = max(needed, 2 * len(self._ids), 1024)
+        for name in ("_vectors", "_ids", "_years", "_genre", "_assignments"):
+            current = getattr(self, name)
+            grown = np.empty((capacity, *current.shape[1:]), dtype=current.dtype)
+            grown[:self._size] = current[:self._size]
+            setattr(self, name, grown)
+
+    def add(
+        self,
+        vectors: np.ndarray,
+        ids: Optional[Sequence[int]] = None,
+        years: Optional[Sequence[int]] = None,
+        genres: Optional[Iterable[Optional[str]]] = None,
+    ) -> None:
+        """Insert vectors into their nearest cells; ids default to insertion order."""
+        if not self.is_trained:
+            raise RuntimeError("Index must be trained before adding vectors")
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        count = len(vectors)
+        self._reserve(count)
+
+        rows = slice(self._size, self._size + count)
+        self._vectors[rows] = vectors
+        self._ids[rows] = np.arange(self._size, self._size + count) if ids is None else ids
+        self._years[rows] = 0 if years is None else years
+        self._genre[rows] = -1 if genres is None else [self.genre_code(genre) for genre in genres]
+        self._assignments[rows] = _assign(vectors, self.centroids)
+        self._size += count
+        self._lists = None
+
+    def _cell_rows(self) -> List[np.ndarray]:
+        # Rebuilt lazily after inserts: row positions grouped by cell
+        if self._lists is None:
+            assignments = self._assignments[:self._size]
+            order = np.argsort(assignments, kind="stable")
+            bounds = np.searchsorted(assignments[order], np.arange(self.n_lists + 1))
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(self.n_lists)]
+        return self._lists
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int = 10,
+        n_probe: Optional[int] = None,
+        year_start: Optional[int] = None,
+        year_end: Optional[int] = None,
+        genres: Optional[Iterable[str]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find approximately the ``k`` nearest vectors to ``query`` that pass the filters.
+
+        If the probed cells hold fewer than ``k`` matching rows, more cells are
+        probed until ``k`` are found or every cell has been scanned.
+
+        Returns:
+            ``(ids, squared_distances)`` ordered by distance
+        """
+        if not self._size:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+        cells = self._cell_rows()
+        cell_order = np.argsort(((self.centroids - query) ** 2).sum(axis=1))
+        genre_codes = None
+        if genres is not None:
+            genre_codes = [self._genre_codes[g.lower()] for g in genres if g.lower() in self._genre_codes]
+
+        probe = min(n_probe or self.n_probe, self.n_lists)
+        scanned = 0
+        candidate_parts: List[np.ndarray] = []
+        found = 0
+        while True:
+            for cell in cell_order[scanned:probe]:
+                rows = cells[cell]
+                if year_start is not None or year_end is not None:
+                    # Unknown years (0) match no year range, whichever bounds are given
+                    rows = rows[self._years[rows] != 0]
+                if year_start is not None:
+                    rows = rows[self._years[rows] >= year_start]
+                if year_end is not None:
+                    rows = rows[self._years[rows] <= year_end]
+                if genre_codes is not None:
+                    rows = rows[np.isin(self._genre[rows], genre_codes)]
+                candidate_parts.append(rows)
+                found += len(rows)
+            scanned = probe
+            if found >= k or probe >= self.n_lists:
+                break
+            probe = min(probe * 2, self.n_lists)
+
+        candidates = np.concatenate(candidate_parts) if candidate_parts else np.empty(0, dtype=np.int64)
+        if not candidates.size:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        diff = self._vectors[candidates] - query
+        distances = np.einsum("ij,ij->i", diff, diff)
+        if candidates.size > k:
+            nearest = np.argpartition(distances, k - 1)[:k]
+        else:
+            nearest = np.arange(candidates.size)
+        nearest = nearest[np.argsort(distances[nearest], kind="stable")]
+        return self._ids[candidates[nearest]], distances[nearest]
+
+    def save(self, directory: str) -> None:
+        """Write the index to ``directory`` as one ``.npy`` file per array plus ``index.json``."""
+        if not self.is_trained:
+            raise RuntimeError("Cannot save an untrained index")
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "centroids.npy"), self.centroids)
+        for name in INDEX_ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, f"_{name}")[:self._size])
+        meta = {
+            "dim": self.dim,
+            "n_lists": self.n_lists,
+            "n_probe": self.n_probe,
+            "genres": self.genres,
+            "source": self.source,
+        }
+        with open(os.path.join(directory, INDEX_META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "IVFIndex":
+        """Read an index written by :meth:`save`, memory-mapping its arrays read-only unless ``mmap`` is False.
+
+        Adding rows to a mapped index copies its arrays into memory first.
+        """
+        with open(os.path.join(directory, INDEX_META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        mmap_mode = "r" if mmap else None
+        index = cls(meta["dim"], n_lists=meta["n_lists"], n_probe=meta["n_probe"])
+        index.centroids = np.load(os.path.join(directory, "centroids.npy"))
+        for name in INDEX_ARRAYS:
+            setattr(index, f"_{name}", np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode))
+        index.genres = list(meta["genres"])
+        index.source = meta.get("source", {})
+        index._genre_codes = {genre: code for code, genre in enumerate(index.genres)}
+        index._size = len(index._ids)
+        logger.info(f"Loaded IVF index with {index._size} vectors in {index.n_lists} cells from {directory}")
+        return index
+
+
+def brute_force_search(
+    vectors: np.ndarray,
+    query: np.ndarray,
+    k: int = 10,
+    mask: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact ``k`` nearest rows of ``vectors`` to ``query``, optionally restricted to ``mask``."""
+    rows = np.flatnonzero(mask) if mask is not None else np.arange(len(vectors))
+    diff = vectors[rows] - query
+    distances = np.einsum("ij,ij->i", diff, diff)
+    nearest = np.argpartition(distances, k - 1)[:k] if rows.size > k else np.arange(rows.size)
+    nearest = nearest[np.argsort(distances[nearest], kind="stable")]
+    return rows[nearest], distances[nearest]
@@ -0,0 +1,332 @@
+"""Batch ingestion of a local music library into the track catalog.
+
+Walks a directory of audio files, extracts tempo, energy, danceability and a
+valence proxy with librosa in a process pool, reads release years from the
+files' tags, and writes the result as a memory-mapped catalog. Per-file results are kept in a state file next to the
+catalog, so later runs only re-analyze files that are new or changed::
+
+    python -m app.services.catalog_ingest /srv/music /srv/catalog --workers 8
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.services.catalog import TrackCatalog
+from app.services.catalog_store import write_catalog
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = {".mp3", ".wav", ".flac", ".ogg", ".m4a", ".aif", ".aiff"}
+
+# Bumped when feature extraction changes so every file is re-analyzed
+FEATURE_VERSION = 1
+
+ANALYSIS_SAMPLE_RATE = 22050
+ANALYSIS_DURATION = 120.0  # Seconds analyzed per file, from ANALYSIS_OFFSET
+ANALYSIS_OFFSET = 15.0  # Skip intros
+
+# Krumhansl-Schmuckler key profiles used for the major/minor estimate
+MAJOR_PROFILE = np.array([6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88])
+MINOR_PROFILE = np.array([6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17])
+
+Analyzer = Callable[[str], Dict[str, Any]]
+
+
+def file_digest(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-1 of a file's contents."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _mode_score(chroma: np.ndarray) -> float:
+    """Return ~1 for major-sounding and ~0 for minor-sounding pitch class profiles."""
+    best_major = max(np.corrcoef(chroma, np.roll(MAJOR_PROFILE, key))[0, 1] for key in range(12))
+    best_minor = max(np.corrcoef(chroma, np.roll(MINOR_PROFILE, key))[0, 1] for key in range(12))
+    return float(np.clip(0.5 + (best_major - best_minor) * 2.5, 0.0, 1.0))
+
+
+def extract_features(path: str) -> Dict[str, Any]:
+    """
+    Extract catalog audio features from one file with librosa.
+
+    Energy is RMS loudness mapped from -40..-5 dBFS onto 0..1. Valence is a
+    proxy that combines major/minor mode, spectral brightness and tempo.
+    Danceability combines pulse clarity with how close the tempo is to the
+    usual dance range.
+    """
+    import librosa
+
+    duration = librosa.get_duration(path=path)
+    offset = ANALYSIS_OFFSET if duration > ANALYSIS_OFFSET + 30 else 0.0
+    y, sr = librosa.load(path, sr=ANALYSIS_SAMPLE_RATE, mono=True, offset=offset, duration=ANALYSIS_DURATION)
+    if not y.size:
+        raise ValueError("No audio decoded")
+
+    onset_envelope = librosa.onset.onset_strength(y=y, sr=sr)
+    tempo = float(np.atleast_1d(librosa.beat.beat_track(onset_envelope=onset_envelope, sr=sr)[0])[0])
+    pulse = librosa.beat.plp(onset_envelope=onset_envelope, sr=sr)
+    pulse_clarity = float(np.clip(pulse.mean() / (pulse.max() + 1e-9) * 2.0, 0.0, 1.0))
+
+    rms_db = float(librosa.amplitude_to_db(librosa.feature.rms(y=y)).mean())
+    energy = float(np.clip((rms_db + 40.0) / 35.0, 0.0, 1.0))
+
+    centroid = float(librosa.feature.spectral_centroid(y=y, sr=sr).mean())
+    brightness = float(np.clip(centroid / 4000.0, 0.0, 1.0))
+
+    mode = _mode_score(librosa.feature.chroma_stft(y=y, sr=sr).mean(axis=1))
+    tempo_score = float(np.clip((tempo - 60.0) / 100.0, 0.0, 1.0))
+    valence = float(np.clip(0.5 * mode + 0.25 * brightness + 0.25 * tempo_score, 0.0, 1.0))
+    dance_tempo = float(np.exp(-(((tempo - 120.0) / 30.0) ** 2)))
+    danceability = float(np.clip(0.6 * pulse_clarity + 0.4 * dance_tempo, 0.0, 1.0))
+
+    return {
+        "duration": round(duration, 3),
+        "tempo": round(tempo, 2),
+        "energy": round(energy, 4),
+        "valence": round(valence, 4),
+        "danceability": round(danceability, 4),
+    }
+
+
+def read_tags(path: str) -> Dict[str, str]:
+    """Text tags of an audio file, via mutagen when installed, else libsndfile (WAV, FLAC, OGG, AIFF)."""
+    try:
+        import mutagen
+    except ImportError:
+        mutagen = None
+
+    if mutagen is not None:
+        try:
+            audio = mutagen.File(path, easy=True)
+        except Exception as e:
+            logger.debug(f"Cannot read tags from {path}: {e}")
+            return {}
+        if audio is None or not audio.tags:
+            return {}
+        return {key: str(values[0]) for key, values in audio.tags.items() if values}
+
+    import soundfile
+
+    try:
+        with soundfile.SoundFile(path) as f:
+            return {key: str(value) for key, value in f.copy_metadata().items()}
+    except Exception as e:
+        logger.debug(f"Cannot read tags from {path}: {e}")
+        return {}
+
+
+def tag_year(tags: Dict[str, str]) -> Optional[int]:
+    """Release year from a ``date``/``year`` tag such as ``1987`` or ``1987-05-01``; None when unknown."""
+    for key in ("date", "year", "originaldate"):
+        match = re.match(r"\s*(\d{4})", tags.get(key, ""))
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def describe_file(root: str, path: str) -> Dict[str, Any]:
+    """Catalog metadata from the file's location (``Genre/Artist - Title.ext`` layouts) and its year tag."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    artist, _, title = stem.partition(" - ")
+    if not title:
+        artist, title = "", stem
+    parent = os.path.relpath(os.path.dirname(path), root)
+    genre = parent.split(os.sep)[0] if parent != "." else ""
+    return {
+        "title": title.strip().replace("_", " "),
+        "artist": artist.strip() or "Library",
+        "genre": genre or "Production",
+        "year": tag_year(read_tags(path)),
+    }
+
+
+def scan_library(root: str) -> List[str]:
+    """All audio files below ``root``, sorted for stable catalog order."""
+    paths = []
+    for directory, _, files in os.walk(root):
+        for name in files:
+            if os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS:
+                paths.append(os.path.join(directory, name))
+    return sorted(paths)
+
+
+def load_state(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {"feature_version": FEATURE_VERSION, "files": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    if state.get("feature_version") != FEATURE_VERSION:
+        logger.info("Feature extraction changed since the last run; re-analyzing all files")
+        return {"feature_version": FEATURE_VERSION, "files": {}}
+    return state
+
+
+def save_state(path: str, state: Dict[str, Any]) -> None:
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(temporary, path)
+
+
+def _analyze(analyzer: Analyzer, path: str) -> Dict[str, Any]:
+    return {"digest": file_digest(path), "features": analyzer(path)}
+
+
+def ingest_library(
+    root: str,
+    catalog_dir: str,
+    state_path: Optional[str] = None,
+    workers: Optional[int] = None,
+    analyzer: Analyzer = extract_features,
+    with_index: bool = False,
+    replace: bool = False,
+) -> Dict[str, Any]:
+    """
+    Analyze new and changed audio files under ``root`` and rewrite the catalog.
+
+    A file is re-analyzed when its size or mtime changed and its content
+    digest differs from the last run. Files that fail to decode are reported,
+    left out and not retried until they change. Removed files are dropped
+    from the catalog.
+
+    The catalog is rewritten from the library on every run, so an existing
+    ``catalog_dir`` that was not written by a previous ingestion (it has no
+    state file) is refused unless ``replace`` is set.
+
+    Args:
+        root: Music library directory
+        catalog_dir: Output catalog directory
+        state_path: Per-file ingestion state; defaults to ``<catalog_dir>.ingest.json``
+        workers: Worker processes; 0 analyzes in this process
+        analyzer: Picklable feature extractor, ``path -> features``
+        with_index: Also build an IVF index into the catalog
+        replace: Overwrite a catalog that was not built by ingestion
+
+    Returns:
+        Run statistics including files/sec for the analyzed files
+
+    Raises:
+        FileExistsError: If ``catalog_dir`` holds another catalog and ``replace`` is not set
+    """
+    state_path = state_path or f"{catalog_dir.rstrip(os.sep)}.ingest.json"
+    if os.path.exists(catalog_dir) and not os.path.exists(state_path) and not replace:
+        raise FileExistsError(
+            f"{catalog_dir} already holds a catalog that was not written by ingestion (no {state_path}); "
+            f"pass replace=True (--replace) to overwrite it"
+        )
+    state = load_state(state_path)
+    known: Dict[str, Any] = state["files"]
+    # Files that failed to decode are skipped until they change
+    previously_failed: Dict[str, Any] = state.setdefault("failed", {})
+    paths = scan_library(root)
+
+    start = time.perf_counter()
+    to_analyze = []
+    for path in paths:
+        stat = os.stat(path)
+        entry = known.get(path) or previously_failed.get(path)
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            continue
+        if path in known and entry["size"] == stat.st_size and entry["digest"] == file_digest(path):
+            entry["mtime"] = stat.st_mtime  # Touched but unchanged
+            continue
+        to_analyze.append(path)
+
+    failed: List[str] = []
+
+    def record(path: str, result: Dict[str, Any]) -> None:
+        stat = os.stat(path)
+        known[path] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "digest": result["digest"],
+            "track": {**describe_file(root, path), **result["features"]},
+        }
+
+    analyze_start = time.perf_counter()
+    if workers == 0:
+        for path in to_analyze:
+            try:
+                record(path, _analyze(analyzer, path))
+            except Exception as e:
+                logger.warning(f"Failed to analyze {path}: {e}")
+                failed.append(path)
+    elif to_analyze:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_analyze, analyzer, path): path for path in to_analyze}
+            for done, future in enumerate(as_completed(futures), 1):
+                path = futures[future]
+                try:
+                    record(path, future.result())
+                except Exception as e:
+                    logger.warning(f"Failed to analyze {path}: {e}")
+                    failed.append(path)
+                if done % 100 == 0:
+                    rate = done / (time.perf_counter() - analyze_start)
+                    logger.info(f"Analyzed {done}/{len(to_analyze)} files ({rate:.1f} files/sec)")
+    analyze_seconds = time.perf_counter() - analyze_start
+
+    present = set(paths)
+    removed = [path for path in known if path not in present]
+    for path in removed + failed:
+        known.pop(path, None)
+    for path in failed:
+        stat = os.stat(path)
+        previously_failed[path] = {"size": stat.st_size, "mtime": stat.st_mtime}
+    for path in list(previously_failed):
+        if path not in present or path in known:
+            del previously_failed[path]
+
+    tracks = [known[path]["track"] for path in paths if path in known]
+    write_catalog(TrackCatalog.from_records(tracks), catalog_dir, with_index=with_index)
+    save_state(state_path, state)
+
+    analyzed = len(to_analyze) - len(failed)
+    return {
+        "files": len(paths),
+        "analyzed": analyzed,
+        "unchanged": len(paths) - len(to_analyze),
+        "failed": len(failed),
+        "removed": len(removed),
+        "tracks": len(tracks),
+        "analyze_seconds": round(analyze_seconds, 3),
+        "files_per_second": round(analyzed / analyze_seconds, 2) if analyze_seconds and analyzed else 0.0,
+        "total_seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Ingest a local music library into the track catalog")
+    parser.add_argument("library", help="Directory of audio files")
+    parser.add_argument("catalog", help="Output catalog directory")
+    parser.add_argument("--state", help="Ingestion state file (default: <catalog>.ingest.json)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--index", action="store_true", help="Also build an IVF index into the catalog")
+    parser.add_argument("--replace", action="store_true", help="Overwrite a catalog not built by ingestion")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    stats = ingest_library(
+        args.library, args.catalog, args.state, args.workers, with_index=args.index, replace=args.replace
+    )
+    logger.info(
+        f"Ingested {stats['files']} files: {stats['analyzed']} analyzed, {stats['unchanged']} unchanged, "
+        f"{stats['failed']} failed, {stats['removed']} removed; "
+        f"{stats['files_per_second']} files/sec over {stats['analyze_seconds']}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
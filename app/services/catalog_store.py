@@ -0,0 +1,252 @@
+"""On-disk columnar track catalog that worker processes memory-map read-only.
+
+A catalog directory holds one ``.npy`` file per numeric column, the
+precomputed feature matrix, and for each string column a UTF-8 blob plus an
+offsets array. ``manifest.json`` records the format version, row count and
+the digest IVF indexes are checked against.
+Opening a catalog only maps the files, so startup time does not grow with
+catalog size and every process shares the same page cache.
+
+The catalog path is a symlink to a versioned sibling directory. Rebuilding
+writes a new version and repoints the link in one atomic rename, so readers
+always see either the old or the new catalog, never a missing one.
+
+Build a catalog from a CSV or JSON track list with::
+
+    python -m app.services.catalog_store build tracks.csv /srv/catalog --index
+
+``--index`` also trains an IVF index and stores it in the catalog's
+``index`` subdirectory, where the loader picks it up. The server never builds
+or saves an index itself; for a CSV or JSON catalog, build one into
+``TRACK_CATALOG_INDEX_PATH`` with::
+
+    python -m app.services.catalog_store index tracks.csv /srv/catalog-index
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from app.config import settings
+from app.services.catalog import FEATURES, TrackCatalog
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FORMAT = "video2music-track-catalog"
+CATALOG_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+INDEX_DIR = "index"
+
+NUMERIC_COLUMNS = {
+    "year": np.int16,
+    "energy": np.float32,
+    "valence": np.float32,
+    "danceability": np.float32,
+    "tempo": np.float32,
+    "popularity": np.float32,
+}
+STRING_COLUMNS = ("title", "artist", "genre", "spotify_id")
+# String columns whose empty values read back as None rather than ""
+NULLABLE_STRING_COLUMNS = ("spotify_id",)
+
+
+class CatalogFormatError(Exception):
+    """Raised when a catalog directory is missing, corrupt or from an incompatible version."""
+    pass
+
+
+class StringColumn:
+    """Read-only string column backed by a memory-mapped UTF-8 blob and offsets array.
+
+    Strings are decoded only when accessed; empty strings read back as None in
+    ``nullable`` columns and as ``""`` otherwise.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray, nullable: bool = False):
+        self._data = data
+        self._offsets = offsets
+        self._empty = None if nullable else ""
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> Optional[str]:
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return bytes(self._data[start:end]).decode("utf-8") or self._empty
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+def _write_strings(directory: str, name: str, values: Sequence[Optional[str]]) -> None:
+    encoded = [(value or "").encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    with open(os.path.join(directory, f"{name}.str"), "wb") as f:
+        f.write(b"".join(encoded))
+    np.save(os.path.join(directory, f"{name}.offsets.npy"), offsets)
+
+
+def write_catalog(catalog: TrackCatalog, directory: str, with_index: bool = False) -> Dict[str, Any]:
+    """
+    Write ``catalog`` to ``directory`` in the columnar format.
+
+    The catalog is written to a new versioned sibling directory and
+    ``directory`` is atomically repointed at it, so readers never see a
+    partly written or missing catalog. The previous version is kept for
+    readers still opening it and older ones are removed. With ``with_index``
+    an IVF index is trained and saved into the ``index`` subdirectory.
+
+    Returns:
+        The written manifest
+    """
+    directory = os.path.abspath(directory)
+    parent, name = os.path.split(directory)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=f".{name}.v{time.strftime('%Y%m%d%H%M%S', time.gmtime())}-", dir=parent)
+    try:
+        for name, dtype in NUMERIC_COLUMNS.items():
+            np.save(os.path.join(staging, f"{name}.npy"), np.asarray(getattr(catalog, name), dtype=dtype))
+        np.save(os.path.join(staging, "features.npy"), np.ascontiguousarray(catalog.features, dtype=np.float32))
+        for name in STRING_COLUMNS:
+            _write_strings(staging, name, list(getattr(catalog, name)))
+        if with_index:
+            (catalog.index or catalog.build_index()).save(os.path.join(staging, INDEX_DIR))
+
+        manifest = {
+            "format": CATALOG_FORMAT,
+            "version": CATALOG_FORMAT_VERSION,
+            "rows": len(catalog),
+            "digest": catalog.digest(),
+            "features": list(FEATURES),
+            "numeric_columns": {name: np.dtype(dtype).str for name, dtype in NUMERIC_COLUMNS.items()},
+            "string_columns": list(STRING_COLUMNS),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        with open(os.path.join(staging, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        _swap_link(directory, staging)
+        return manifest
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def _swap_link(directory: str, version: str) -> None:
+    """Point the ``directory`` symlink at ``version``, keeping only the version it replaces."""
+    parent, name = os.path.split(directory)
+    previous = os.path.realpath(directory) if os.path.islink(directory) else None
+    if os.path.isdir(directory) and previous is None:
+        # Catalog written before versioned directories: move it aside once
+        previous = tempfile.mkdtemp(prefix=f".{name}.vlegacy-", dir=parent)
+        os.rmdir(previous)
+        os.replace(directory, previous)
+
+    link = os.path.join(parent, f".{name}.link-{os.getpid()}")
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(os.path.basename(version), link)
+    os.replace(link, directory)
+
+    keep = {os.path.basename(version), os.path.basename(previous) if previous else None}
+    for entry in os.listdir(parent):
+        if entry.startswith(f".{name}.v") and entry not in keep:
+            shutil.rmtree(os.path.join(parent, entry), ignore_errors=True)
+
+
+def read_manifest(directory: str) -> Dict[str, Any]:
+    """
+    Read and validate a catalog manifest.
+
+    Raises:
+        CatalogFormatError: If the manifest is missing or from another format or version
+    """
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise CatalogFormatError(f"Cannot read catalog manifest in {directory}: {e}")
+
+    if manifest.get("format") != CATALOG_FORMAT:
+        raise CatalogFormatError(f"{directory} is not a track catalog")
+    if manifest.get("version") != CATALOG_FORMAT_VERSION:
+        raise CatalogFormatError(
+            f"Catalog format version {manifest.get('version')} is not supported "
+            f"(expected {CATALOG_FORMAT_VERSION}); rebuild it with this version"
+        )
+    if manifest.get("features") != list(FEATURES):
+        raise CatalogFormatError(f"Catalog features {manifest.get('features')} do not match {list(FEATURES)}")
+    return manifest
+
+
+def open_catalog(directory: str) -> TrackCatalog:
+    """
+    Memory-map a catalog directory read-only.
+
+    Raises:
+        CatalogFormatError: If the catalog is incompatible or its columns are inconsistent
+    """
+    manifest = read_manifest(directory)
+    rows = manifest["rows"]
+
+    columns: Dict[str, Any] = {}
+    try:
+        for name, dtype in manifest["numeric_columns"].items():
+            columns[name] = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+            if columns[name].dtype != np.dtype(dtype):
+                raise CatalogFormatError(f"Column {name} has dtype {columns[name].dtype}, expected {dtype}")
+        features = np.load(os.path.join(directory, "features.npy"), mmap_mode="r")
+        for name in manifest["string_columns"]:
+            offsets = np.load(os.path.join(directory, f"{name}.offsets.npy"), mmap_mode="r")
+            blob = os.path.join(directory, f"{name}.str")
+            # np.memmap cannot map an empty file
+            data = np.memmap(blob, dtype=np.uint8, mode="r") if os.path.getsize(blob) else np.empty(0, np.uint8)
+            columns[name] = StringColumn(data, offsets, nullable=name in NULLABLE_STRING_COLUMNS)
+    except OSError as e:
+        raise CatalogFormatError(f"Catalog {directory} is incomplete: {e}")
+
+    if any(len(column) != rows for column in columns.values()) or features.shape != (rows, len(FEATURES)):
+        raise CatalogFormatError(f"Catalog {directory} columns do not match its row count {rows}")
+
+    logger.info(f"Mapped track catalog with {rows} tracks from {directory}")
+    return TrackCatalog.from_columns(columns, features, digest=manifest.get("digest"))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build or inspect a memory-mapped track catalog")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Build a catalog directory from a CSV or JSON track list")
+    build.add_argument("source", help="Track list (.csv with a header row, or .json)")
+    build.add_argument("directory", help="Output catalog directory (replaced if it exists)")
+    build.add_argument("--index", action="store_true", help="Also build an IVF index into the catalog")
+    index = commands.add_parser("index", help="Build an IVF index for a catalog directory, .csv or .json")
+    index.add_argument("source", help="Catalog directory or track list")
+    index.add_argument("directory", help="Output index directory (TRACK_CATALOG_INDEX_PATH)")
+    info = commands.add_parser("info", help="Print a catalog's manifest")
+    info.add_argument("directory")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "build":
+        start = time.perf_counter()
+        manifest = write_catalog(TrackCatalog.load(args.source), args.directory, with_index=args.index)
+        logger.info(f"Wrote {manifest['rows']} tracks to {args.directory} in {time.perf_counter() - start:.2f}s")
+    elif args.command == "index":
+        start = time.perf_counter()
+        catalog = open_catalog(args.source) if os.path.isdir(args.source) else TrackCatalog.load(args.source)
+        catalog.build_index(settings.catalog_index_lists or None).save(args.directory)
+        logger.info(f"Indexed {len(catalog)} tracks into {args.directory} in {time.perf_counter() - start:.2f}s")
+    else:
+        print(json.dumps(read_manifest(args.directory), indent=2))
+
+
+if __name__ == "__main__":
+    main()
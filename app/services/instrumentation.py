@@ -0,0 +1,122 @@
+"""Per-stage timing and resource instrumentation for the processing pipeline."""
+
+import logging
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from app.models.requests import StageMetrics
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Percentiles reported by summarize_stage_metrics
+SUMMARY_PERCENTILES = (50, 90, 95, 99)
+
+SUMMARY_FIELDS = ("wall_time", "cpu_time", "peak_rss_bytes", "bytes_in", "bytes_out")
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Return the process's peak resident set size in bytes, if available."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class StageHandle:
+    """Mutable handle a running stage uses to report the bytes it moved."""
+
+    def __init__(self):
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+
+class StageRecorder:
+    """Collects :class:`StageMetrics` for every stage of one processing job.
+
+    CPU time is process-wide, so stages running concurrently in the same process
+    share each other's CPU time; peak RSS is the process high-water mark at the
+    end of the stage.
+    """
+
+    def __init__(self):
+        self.metrics: List[StageMetrics] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageHandle]:
+        """Time the enclosed block and record it as stage ``name``."""
+        handle = StageHandle()
+        started_at = datetime.now(timezone.utc)
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield handle
+        finally:
+            metrics = StageMetrics(
+                stage=name,
+                wall_time=round(time.perf_counter() - wall_start, 6),
+                cpu_time=round(time.process_time() - cpu_start, 6),
+                peak_rss_bytes=peak_rss_bytes(),
+                bytes_in=handle.bytes_in,
+                bytes_out=handle.bytes_out,
+                started_at=started_at,
+            )
+            self.metrics.append(metrics)
+            logger.debug(f"Stage {name} took {metrics.wall_time:.3f}s wall, {metrics.cpu_time:.3f}s CPU")
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Serialize recorded metrics for storage in the result JSON."""
+        return [metrics.model_dump(mode="json") for metrics in self.metrics]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Linearly interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        raise ValueError("percentile of empty list")
+    rank = (len(sorted_values) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+
+def summarize_stage_metrics(stage_metrics: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Aggregate raw stage metrics into per-stage percentiles.
+
+    Args:
+        stage_metrics: Stage metric dictionaries as stored in processing results
+
+    Returns:
+        Mapping of stage name to sample count and p50/p90/p95/p99/max per field
+    """
+    samples: Dict[str, Dict[str, List[float]]] = {}
+    for metrics in stage_metrics:
+        stage = metrics.get("stage")
+        if not stage:
+            continue
+        per_stage = samples.setdefault(stage, {field: [] for field in SUMMARY_FIELDS})
+        for field in SUMMARY_FIELDS:
+            value = metrics.get(field)
+            if value is not None:
+                per_stage[field].append(float(value))
+
+    summary = {}
+    for stage, fields in samples.items():
+        stage_summary: Dict[str, Any] = {"count": len(fields["wall_time"])}
+        for field, values in fields.items():
+            if not values:
+                continue
+            values.sort()
+            stage_summary[field] = {
+                **{f"p{pct}": round(percentile(values, pct), 6) for pct in SUMMARY_PERCENTILES},
+                "max": values[-1],
+            }
+        summary[stage] = stage_summary
+    return summary
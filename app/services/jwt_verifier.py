@@ -0,0 +1,353 @@
+"""Local verification of Supabase access tokens.
+
+Supabase access tokens are JWTs signed either with the project's shared JWT
+secret (HS256) or with an asymmetric signing key published at the project's
+JWKS endpoint (RS256/ES256). Verifying them here checks the signature,
+expiry and audience without a request to Supabase Auth per API call.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from jose import JWTError, jwt
+
+from app.config import settings
+from app.services.supabase_client import supabase_service
+
+logger = logging.getLogger(__name__)
+
+SYMMETRIC_ALGORITHMS = {"HS256", "HS384", "HS512"}
+ASYMMETRIC_ALGORITHMS = {"RS256", "RS384", "RS512", "ES256", "ES384", "ES512"}
+
+
+
+class TokenVerificationError(Exception):
+    """Raised when an access token is malformed, expired or not signed by a trusted key."""
+    pass
+
+
+class JWKSCache:
+    """Signing keys from a JWKS endpoint, refreshed periodically and on unknown key IDs.
+
+    An unknown ``kid`` triggers a refresh at most once per
+    ``min_refresh_interval`` seconds, so tokens with made-up key IDs cannot
+    make every request hit the endpoint. Concurrent refreshes share one fetch.
+    """
+
+    def __init__(self, url: str, refresh_interval: float = 600.0, min_refresh_interval: float = 30.0):
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self._keys: Dict[str, Dict[str, Any]] = {}
+        self._fetched_at = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+        self._refresh_loop: Optional[asyncio.Task] = None
+        self.refresh_count = 0
+
+    async def _fetch(self) -> Dict[str, Dict[str, Any]]:
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            response = await client.get(self.url)
+            response.raise_for_status()
+        return {key["kid"]: key for key in response.json().get("keys", []) if key.get("kid")}
+
+    async def _refresh_now(self) -> None:
+        try:
+            self._keys = await self._fetch()
+            self.refresh_count += 1
+            logger.info(f"Loaded {len(self._keys)} signing keys from {self.url}")
+        finally:
+            # Failed fetches also wait out the interval instead of retrying per request
+            self._fetched_at = time.monotonic()
+            self._refreshing = None
+
+    async def refresh(self) -> None:
+        """Fetch the key set, joining a fetch already in progress."""
+        if self._refreshing is None:
+            self._refreshing = asyncio.ensure_future(self._refresh_now())
+        await asyncio.shield(self._refreshing)
+
+    async def get_key(self, kid: Optional[str]) -> Optional[Dict[str, Any]]:
+        """The JWK for ``kid``, refreshing the key set when it is stale or lacks the key."""
+        age = time.monotonic() - self._fetched_at
+        stale = not self._fetched_at or age >= self.refresh_interval
+        if stale or (kid not in self._keys and age >= self.min_refresh_interval):
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Failed to refresh signing keys from {self.url}: {e}")
+        return self._keys.get(kid)
+
+    async def _run_refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Periodic signing key refresh failed: {e}")
+
+    def start(self) -> None:
+        """Refresh the key set in the background every ``refresh_interval`` seconds."""
+        if self._refresh_loop is None:
+            self._refresh_loop = asyncio.ensure_future(self._run_refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresh_loop is not None:
+            self._refresh_loop.cancel()
+            try:
+                await self._refresh_loop
+            except asyncio.CancelledError:
+                pass
+            self._refresh_loop = None
+
+
+class UserCache:
+    """Users returned by Supabase Auth, keyed by the SHA-256 digest of their access token.
+
+    Clients poll request status with the same token many times a minute;
+    this bounds remote validation to one call per token per ``ttl`` seconds.
+    Entries never outlive the token's ``exp``. Only successful validations
+    are cached, and concurrent validations of one token share a single
+    call. A revoked session is honoured within ``ttl`` seconds.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _expires_at(token: str, ttl: float) -> float:
+        """Monotonic deadline for a token's entry: ``ttl`` from now, capped at its ``exp``."""
+        try:
+            exp = float(jwt.get_unverified_claims(token)["exp"])
+            ttl = min(ttl, exp - time.time())
+        except (JWTError, KeyError, TypeError, ValueError):
+            pass
+        return time.monotonic() + ttl
+
+    async def get_or_validate(
+        self,
+        token: str,
+        validate: Callable[[str], Awaitable[Optional[Dict[str, Any]]]],
+    ) -> Optional[Dict[str, Any]]:
+        """The cached user for ``token``, validating it with ``validate`` on a miss."""
+        key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if time.monotonic() < entry[0]:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            del self._entries[key]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        task = asyncio.ensure_future(self._validate(key, token, validate))
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _validate(
+        self,
+        key: str,
+        token: str,
+        validate: Callable[[str], Awaitable[Optional[Dict[str, Any]]]],
+    ) -> Optional[Dict[str, Any]]:
+        try:
+            user = await validate(token)
+            expires_at = self._expires_at(token, self.ttl)
+            if user and expires_at > time.monotonic():
+                self._entries[key] = (expires_at, user)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+            return user
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and size."""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
+
+
+def user_from_claims(claims: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a user dictionary shaped like Supabase's ``User`` from access token claims."""
+    return {
+        "id": claims["sub"],
+        "aud": claims.get("aud"),
+        "role": claims.get("role"),
+        "email": claims.get("email"),
+        "phone": claims.get("phone"),
+        "app_metadata": claims.get("app_metadata") or {},
+        "user_metadata": claims.get("user_metadata") or {},
+        "is_anonymous": claims.get("is_anonymous", False),
+        "session_id": claims.get("session_id"),
+    }
+
+
+class SupabaseJWTVerifier:
+    """Authenticate API requests from their Supabase access token.
+
+    ``auth_verification`` selects the mode:
+
+    - ``local``: verify the token here and build the user from its claims
+    - ``revalidate``: verify locally, then also confirm with Supabase Auth,
+      which catches sessions revoked before the token expires
+    - ``remote``: only ask Supabase Auth, as before local verification
+
+    Without an explicit mode, tokens are verified locally once
+    ``SUPABASE_JWT_SECRET`` or ``JWT_JWKS_URL`` is configured, and with
+    Supabase Auth until then.
+    """
+
+    def __init__(self):
+        self.mode = settings.auth_verification or (
+            "local" if settings.supabase_jwt_secret or settings.jwt_jwks_url else "remote"
+        )
+        self.audience = settings.jwt_audience or None
+        self.issuer = settings.jwt_issuer or None
+        self.jwks = JWKSCache(
+            settings.jwt_jwks_url or f"{settings.supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json",
+            refresh_interval=settings.jwt_jwks_refresh_seconds,
+        )
+        self.user_cache = (
+            UserCache(settings.auth_user_cache_size, settings.auth_user_cache_ttl)
+            if settings.auth_user_cache_ttl > 0 else None
+        )
+        self._warned_missing_secret = False
+
+    async def startup(self) -> None:
+        """Start periodic JWKS refresh when tokens are verified locally."""
+        if self.mode != "remote":
+            self.jwks.start()
+
+    async def shutdown(self) -> None:
+        await self.jwks.stop()
+
+    def _allowed_algorithms(self) -> List[str]:
+        return [algorithm.strip() for algorithm in settings.jwt_allowed_algorithms.split(",") if algorithm.strip()]
+
+    async def verify(self, token: str) -> Dict[str, Any]:
+        """
+        Verify a token's signature, expiry, audience and (if configured) issuer.
+
+        Returns:
+            The token's claims
+
+        Raises:
+            TokenVerificationError: If the token is not valid
+        """
+        try:
+            header = jwt.get_unverified_header(token)
+        except JWTError as e:
+            raise TokenVerificationError(f"Malformed token: {e}")
+
+        algorithm = header.get("alg")
+        if algorithm not in self._allowed_algorithms():
+            raise TokenVerificationError(f"Token algorithm {algorithm} is not allowed")
+
+        if algorithm in SYMMETRIC_ALGORITHMS:
+            key: Any = settings.supabase_jwt_secret
+        elif algorithm in ASYMMETRIC_ALGORITHMS:
+            key = await self.jwks.get_key(header.get("kid"))
+            if key is None:
+                raise TokenVerificationError(f"Unknown signing key {header.get('kid')}")
+        else:
+            raise TokenVerificationError(f"Unsupported token algorithm {algorithm}")
+
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=[algorithm],
+                audience=self.audience,
+                issuer=self.issuer,
+                options={"verify_aud": self.audience is not None, "leeway": settings.jwt_leeway_seconds},
+            )
+        except JWTError as e:
+            raise TokenVerificationError(str(e))
+
+        if not claims.get("sub"):
+            raise TokenVerificationError("Token has no subject")
+        return claims
+
+    def _can_verify_locally(self, token: str) -> bool:
+        """False for HS256 tokens while SUPABASE_JWT_SECRET is unset, which could not verify them."""
+        if settings.supabase_jwt_secret:
+            return True
+        try:
+            symmetric = jwt.get_unverified_header(token).get("alg") in SYMMETRIC_ALGORITHMS
+        except JWTError:
+            return True
+        if symmetric and not self._warned_missing_secret:
+            self._warned_missing_secret = True
+            logger.warning("SUPABASE_JWT_SECRET is not configured; verifying HS256 tokens with Supabase Auth instead")
+        return not symmetric
+
+    async def _authenticate_remote(self, token: str) -> Optional[Dict[str, Any]]:
+        """Validate a token with Supabase Auth, through the user cache when enabled."""
+        if self.user_cache is None:
+            return await supabase_service.authenticate_user(token)
+        return await self.user_cache.get_or_validate(token, supabase_service.authenticate_user)
+
+    def stats(self) -> Dict[str, Any]:
+        """Verification mode, signing key refreshes and user cache counters."""
+        return {
+            "mode": self.mode,
+            "jwks_refreshes": self.jwks.refresh_count,
+            "user_cache": self.user_cache.stats() if self.user_cache is not None else None,
+        }
+
+    async def authenticate(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Authenticate a bearer token.
+
+        Returns:
+            User information dictionary, or None if the token is not valid
+        """
+        if self.mode == "remote" or not self._can_verify_locally(token):
+            return await self._authenticate_remote(token)
+
+        try:
+            claims = await self.verify(token)
+        except TokenVerificationError as e:
+            logger.info(f"Rejected access token: {e}")
+            return None
+
+        if self.mode == "revalidate":
+            user = await self._authenticate_remote(token)
+            if not user or user.get("id") != claims["sub"]:
+                logger.info(f"Access token for {claims['sub']} was rejected by Supabase Auth")
+                return None
+            return user
+
+        return user_from_claims(claims)
+
+
+# Global instance
+jwt_verifier = SupabaseJWTVerifier()
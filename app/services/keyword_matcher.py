@@ -0,0 +1,79 @@
+"""Precompiled keyword matching for track titles and descriptions."""
+
+import logging
+import re
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Sequence, Set
+
+logger = logging.getLogger(__name__)
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    """Regex alternation of ``keywords`` nested by common prefix, preferring longer matches."""
+    trie: Dict[str, Any] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        # A keyword ends here: the longer continuations are optional and tried first
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Find every vocabulary category whose keywords occur in a text, in one pass.
+
+    All keywords are compiled into one regular expression, ``(?=(<trie>))``,
+    where the keywords are nested by common prefix so a failed position is
+    rejected after a single character test however large the vocabulary. The
+    lookahead tries every position of the text, so overlapping keywords are
+    all found, and the trie reports the longest keyword starting at each
+    position. Every keyword is mapped to its own categories plus those of
+    any shorter keyword that is a prefix of it, so shorter keywords starting
+    at the same position are not lost. Matching is case-insensitive substring
+    matching, like ``keyword in text.lower()``.
+    """
+
+    def __init__(self, vocabulary: Mapping[str, Iterable[str]]):
+        self.order: List[str] = list(vocabulary)
+        keyword_categories: Dict[str, Set[str]] = {}
+        for category, keywords in vocabulary.items():
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword:
+                    keyword_categories.setdefault(keyword, set()).add(category)
+
+        self._categories: Dict[str, FrozenSet[str]] = {
+            keyword: frozenset().union(*(keyword_categories[k] for k in keyword_categories if keyword.startswith(k)))
+            for keyword in keyword_categories
+        }
+        self._pattern = re.compile(f"(?=({_trie_pattern(keyword_categories)}))") if keyword_categories else None
+
+    def categories(self, text: Optional[str]) -> Set[str]:
+        """All categories with at least one keyword in ``text``."""
+        if not text or self._pattern is None:
+            return set()
+        return set().union(*map(self._categories.__getitem__, self._pattern.findall(text.lower())))
+
+    def first(self, text: Optional[str], default: Optional[str] = None) -> Optional[str]:
+        """The earliest category in vocabulary order found in ``text``, else ``default``."""
+        found = self.categories(text)
+        return next((category for category in self.order if category in found), default)
+
+    def count(self, text: Optional[str]) -> int:
+        """Number of distinct categories found in ``text``."""
+        return len(self.categories(text))
+
+
+@lru_cache(maxsize=256)
+def keyword_set_matcher(keywords: Sequence[str]) -> KeywordMatcher:
+    """Matcher treating each keyword as its own category, cached per keyword tuple."""
+    return KeywordMatcher({keyword.lower(): (keyword,) for keyword in keywords})
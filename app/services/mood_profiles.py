@@ -0,0 +1,160 @@
+"""Mood profiles: target audio features and search terms for every scene mood.
+
+Scene moods come from the video analysis models as free text, so besides the
+named profiles there is a resolver that maps any mood string to the closest
+profile by word overlap and remembers the answer. The profiles, synonyms and
+stemming rules live in a JSON table that the edge function loads as well, so
+both resolve moods the same way.
+"""
+
+import json
+import logging
+import math
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+import numpy as np
+
+from app.services.catalog import target_vector
+
+logger = logging.getLogger(__name__)
+
+# Mood table shared with the video-processor edge function, which imports the same file
+MOOD_TABLE_PATH = Path(__file__).resolve().parents[2] / "supabase" / "functions" / "_shared" / "mood_profiles.json"
+
+with open(MOOD_TABLE_PATH, "r", encoding="utf-8") as _f:
+    _MOOD_TABLE: Dict[str, Any] = json.load(_f)
+
+# Profile used when a mood shares no words with any named profile
+DEFAULT_MOOD: str = _MOOD_TABLE["default_mood"]
+
+RESOLVE_CACHE_SIZE = 4096
+
+STOP_WORDS = frozenset(_MOOD_TABLE["stop_words"])
+
+# Suffix rewrites applied before stems are cut to STEM_LENGTH characters
+SUFFIXES: Tuple[Tuple[str, str], ...] = tuple((suffix, replacement) for suffix, replacement in _MOOD_TABLE["suffixes"])
+STEM_LENGTH: int = _MOOD_TABLE["stem_length"]
+
+
+@dataclass(frozen=True)
+class MoodProfile:
+    """Target audio features and Spotify search hints for one scene mood."""
+
+    name: str
+    valence: float
+    energy: float
+    danceability: float
+    tempo: Tuple[int, int]  # BPM range
+    genres: Tuple[str, ...]
+    search_terms: Tuple[str, ...]
+    title_keywords: Tuple[str, ...] = ()
+    # Values reported for Spotify tracks where they differ from the search targets above
+    estimates: Tuple[Tuple[str, float], ...] = ()
+
+    @property
+    def tempo_midpoint(self) -> float:
+        return (self.tempo[0] + self.tempo[1]) / 2
+
+    def estimate(self, feature: str) -> float:
+        """Estimated ``energy``, ``valence``, ``danceability`` or ``tempo`` for a track found for this mood."""
+        default = self.tempo_midpoint if feature == "tempo" else getattr(self, feature)
+        return dict(self.estimates).get(feature, default)
+
+    def params(self) -> Dict[str, Any]:
+        """Audio feature targets in the ``_map_mood_to_spotify_params`` format."""
+        return {
+            "valence": self.valence,
+            "energy": self.energy,
+            "danceability": self.danceability,
+            "tempo": f"{self.tempo[0]}-{self.tempo[1]}",
+            "genres": list(self.genres),
+        }
+
+
+# Moods produced by the analysis models and the simulation/fallback paths. The
+# first five are the moods the Spotify integration was originally tuned for; their
+# estimates keep the per-track values it reported before the table existed.
+MOOD_PROFILES: Dict[str, MoodProfile] = {
+    entry["name"]: MoodProfile(
+        name=entry["name"],
+        valence=entry["valence"],
+        energy=entry["energy"],
+        danceability=entry["danceability"],
+        tempo=tuple(entry["tempo"]),
+        genres=tuple(entry["genres"]),
+        search_terms=tuple(entry["search_terms"]),
+        title_keywords=tuple(entry.get("title_keywords", ())),
+        estimates=tuple(entry.get("estimates", {}).items()),
+    )
+    for entry in _MOOD_TABLE["profiles"]
+}
+
+# Target feature vectors (see catalog.target_vector), precomputed per profile
+MOOD_VECTORS: Dict[str, np.ndarray] = {name: target_vector(profile.params()) for name, profile in MOOD_PROFILES.items()}
+for _vector in MOOD_VECTORS.values():
+    _vector.setflags(write=False)
+
+
+def _stem(word: str) -> str:
+    for suffix, replacement in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[: -len(suffix)] + replacement
+            break
+    return word[:STEM_LENGTH]
+
+
+def mood_stems(text: str) -> FrozenSet[str]:
+    """Word stems of a mood string, ignoring filler words."""
+    return frozenset(_stem(word) for word in re.findall(r"[a-z]+", text.lower()) if word not in STOP_WORDS)
+
+
+# Everyday words for each mood that appear in neither its name nor its search terms
+MOOD_SYNONYMS: Dict[str, Tuple[str, ...]] = {
+    entry["name"]: tuple(entry.get("synonyms", ())) for entry in _MOOD_TABLE["profiles"]
+}
+
+# Stems describing each profile: its name, search terms and synonyms
+PROFILE_STEMS: Dict[str, FrozenSet[str]] = {
+    name: mood_stems(" ".join((name, *profile.search_terms, *MOOD_SYNONYMS.get(name, ()))))
+    for name, profile in MOOD_PROFILES.items()
+}
+_PROFILES_BY_KEY: Dict[str, MoodProfile] = {name.lower(): profile for name, profile in MOOD_PROFILES.items()}
+
+
+@lru_cache(maxsize=RESOLVE_CACHE_SIZE)
+def resolve_mood(mood: Optional[str]) -> MoodProfile:
+    """
+    Map any mood string to the closest mood profile.
+
+    Known mood names resolve directly. Anything else is compared by cosine
+    similarity between its word stems and each profile's name, search
+    terms and :data:`MOOD_SYNONYMS`; ties go to the earlier profile. Moods sharing no words with any
+    profile get the neutral :data:`DEFAULT_MOOD` profile. Results are
+    memoized, so repeated moods cost one dictionary lookup.
+    """
+    if not mood:
+        return MOOD_PROFILES[DEFAULT_MOOD]
+    profile = _PROFILES_BY_KEY.get(mood.strip().lower())
+    if profile is not None:
+        return profile
+
+    stems = mood_stems(mood)
+    best, best_score = MOOD_PROFILES[DEFAULT_MOOD], 0.0
+    for name, profile_stems in PROFILE_STEMS.items():
+        overlap = len(stems & profile_stems)
+        if overlap:
+            score = overlap / math.sqrt(len(stems) * len(profile_stems))
+            if score > best_score:
+                best, best_score = MOOD_PROFILES[name], score
+
+    logger.debug(f"Resolved mood '{mood}' to '{best.name}' (similarity {best_score:.2f})")
+    return best
+
+
+def mood_vector(mood: Optional[str]) -> np.ndarray:
+    """Target feature vector for any mood string."""
+    return MOOD_VECTORS[resolve_mood(mood).name]
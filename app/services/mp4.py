@@ -0,0 +1,250 @@
+"""Minimal ISO-BMFF (MP4/MOV) parsing for upload-time metadata probing."""
+
+import struct
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Boxes whose payload is made only of child boxes
+CONTAINER_BOXES = {b"moov", b"trak", b"mdia", b"minf", b"stbl", b"edts", b"dinf"}
+
+# Top-level box types that identify an ISO-BMFF file
+TOP_LEVEL_BOXES = {b"ftyp", b"moov", b"mdat", b"free", b"skip", b"wide", b"uuid", b"moof", b"mfra", b"pdin", b"meta", b"styp", b"sidx"}
+
+# Reads ``length`` bytes at ``offset`` from some underlying source
+ReadAt = Callable[[int, int], bytes]
+
+
+class MP4ParseError(Exception):
+    """Raised when a file is not a parseable ISO-BMFF container."""
+    pass
+
+
+@dataclass
+class Box:
+    """A box header located in a file or buffer."""
+
+    type: bytes
+    offset: int
+    size: int
+    header_size: int
+
+    @property
+    def payload_offset(self) -> int:
+        return self.offset + self.header_size
+
+    @property
+    def end(self) -> int:
+        return self.offset + self.size
+
+
+@dataclass
+class TrackIndex:
+    """Header, sample description and sample count of a single track."""
+
+    track_id: int
+    handler: str
+    timescale: int
+    duration: int
+    codec: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    channels: Optional[int] = None
+    sample_rate: Optional[int] = None
+    sample_count: int = 0
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.duration / self.timescale if self.timescale else 0.0
+
+
+@dataclass
+class MovieIndex:
+    """Parsed ``moov`` box: movie header plus per-track headers."""
+
+    timescale: int
+    duration: int
+    tracks: List[TrackIndex] = field(default_factory=list)
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.duration / self.timescale if self.timescale else 0.0
+
+    def track(self, handler: str) -> Optional[TrackIndex]:
+        """Return the first track with the given handler (``vide`` or ``soun``)."""
+        for track in self.tracks:
+            if track.handler == handler:
+                return track
+        return None
+
+
+def read_box_header(read_at: ReadAt, offset: int, file_size: Optional[int] = None) -> Optional[Box]:
+    """Read the box header at ``offset``; returns None at end of data."""
+    header = read_at(offset, 16)
+    if len(header) < 8:
+        return None
+
+    size, box_type = struct.unpack_from(">I4s", header)
+    header_size = 8
+    if size == 1:
+        if len(header) < 16:
+            raise MP4ParseError(f"Truncated 64-bit box header at offset {offset}")
+        size = struct.unpack_from(">Q", header, 8)[0]
+        header_size = 16
+    elif size == 0:
+        if file_size is None:
+            raise MP4ParseError(f"Box at offset {offset} extends to end of file of unknown size")
+        size = file_size - offset
+
+    if size < header_size:
+        raise MP4ParseError(f"Invalid box size {size} at offset {offset}")
+
+    return Box(type=box_type, offset=offset, size=size, header_size=header_size)
+
+
+def iter_boxes(read_at: ReadAt, start: int, end: Optional[int], file_size: Optional[int] = None) -> Iterator[Box]:
+    """Iterate sibling box headers between ``start`` and ``end`` without reading payloads."""
+    offset = start
+    while end is None or offset + 8 <= end:
+        box = read_box_header(read_at, offset, file_size if end is None else end)
+        if box is None:
+            return
+        yield box
+        offset = box.end
+
+
+def looks_like_mp4(head: bytes) -> bool:
+    """Return True when ``head`` starts with a recognizable ISO-BMFF box."""
+    return len(head) >= 8 and head[4:8] in TOP_LEVEL_BOXES
+
+
+def find_top_level_box(read_at: ReadAt, box_type: bytes, file_size: Optional[int] = None) -> Optional[Box]:
+    """Walk top-level box headers (skipping over ``mdat``) to locate ``box_type``."""
+    for box in iter_boxes(read_at, 0, None, file_size):
+        if box.type == box_type:
+            return box
+        if file_size is not None and box.end >= file_size:
+            return None
+    return None
+
+
+def _children(data: bytes, start: int, end: int) -> Dict[bytes, Tuple[int, int]]:
+    """Map child box types to (payload_start, payload_end) within an in-memory box."""
+    children = {}
+    read_at = lambda offset, length: data[offset:offset + length]
+    for box in iter_boxes(read_at, start, end):
+        children.setdefault(box.type, (box.payload_offset, box.end))
+    return children
+
+
+def _iter_children(data: bytes, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    read_at = lambda offset, length: data[offset:offset + length]
+    for box in iter_boxes(read_at, start, end):
+        yield box.type, box.payload_offset, box.end
+
+
+def _full_box_version(data: bytes, start: int) -> int:
+    return data[start]
+
+
+def _parse_media_header(data: bytes, start: int) -> Tuple[int, int]:
+    """Parse ``mvhd``/``mdhd`` into (timescale, duration)."""
+    if _full_box_version(data, start) == 1:
+        return struct.unpack_from(">IQ", data, start + 20)
+    return struct.unpack_from(">II", data, start + 12)
+
+
+def _parse_track_header(data: bytes, start: int) -> Tuple[int, int, int]:
+    """Parse ``tkhd`` into (track_id, width, height)."""
+    if _full_box_version(data, start) == 1:
+        track_id = struct.unpack_from(">I", data, start + 20)[0]
+        dims_offset = start + 88
+    else:
+        track_id = struct.unpack_from(">I", data, start + 12)[0]
+        dims_offset = start + 76
+    width, height = struct.unpack_from(">II", data, dims_offset)
+    return track_id, width >> 16, height >> 16
+
+
+def _parse_sample_description(track: TrackIndex, data: bytes, start: int) -> None:
+    """Fill codec and format fields from the first ``stsd`` entry."""
+    entry_count = struct.unpack_from(">I", data, start + 4)[0]
+    if entry_count == 0:
+        return
+    entry = start + 8
+    track.codec = data[entry + 4:entry + 8].decode("latin-1").strip()
+    fields = entry + 8 + 8  # skip header, reserved and data_reference_index
+    if track.handler == "vide":
+        width, height = struct.unpack_from(">HH", data, fields + 16)
+        track.width = track.width or width
+        track.height = track.height or height
+    elif track.handler == "soun":
+        track.channels = struct.unpack_from(">H", data, fields + 8)[0]
+        track.sample_rate = struct.unpack_from(">I", data, fields + 16)[0] >> 16
+
+
+def _parse_sample_table(track: TrackIndex, data: bytes, start: int, end: int) -> None:
+    """Fill the codec, format fields and sample count from ``stbl``."""
+    children = _children(data, start, end)
+
+    if b"stsd" in children:
+        _parse_sample_description(track, data, children[b"stsd"][0])
+    if b"stsz" in children:
+        track.sample_count = struct.unpack_from(">I", data, children[b"stsz"][0] + 8)[0]
+
+
+def _parse_track(data: bytes, start: int, end: int) -> Optional[TrackIndex]:
+    children = _children(data, start, end)
+    if b"mdia" not in children:
+        return None
+
+    track_id, width, height = 0, 0, 0
+    if b"tkhd" in children:
+        track_id, width, height = _parse_track_header(data, children[b"tkhd"][0])
+
+    mdia = _children(data, *children[b"mdia"])
+    if b"mdhd" not in mdia or b"hdlr" not in mdia:
+        return None
+    timescale, duration = _parse_media_header(data, mdia[b"mdhd"][0])
+    handler = data[mdia[b"hdlr"][0] + 8:mdia[b"hdlr"][0] + 12].decode("latin-1")
+
+    track = TrackIndex(
+        track_id=track_id,
+        handler=handler,
+        timescale=timescale,
+        duration=duration,
+        width=width or None,
+        height=height or None,
+    )
+
+    if b"minf" in mdia:
+        minf = _children(data, *mdia[b"minf"])
+        if b"stbl" in minf:
+            _parse_sample_table(track, data, *minf[b"stbl"])
+
+    return track
+
+
+def parse_moov(data: bytes) -> MovieIndex:
+    """Parse a complete ``moov`` box (header included) into a :class:`MovieIndex`."""
+    if len(data) < 8 or data[4:8] != b"moov":
+        raise MP4ParseError("Buffer does not start with a moov box")
+
+    try:
+        movie = None
+        tracks = []
+        for box_type, start, end in _iter_children(data, 8, len(data)):
+            if box_type == b"mvhd":
+                timescale, duration = _parse_media_header(data, start)
+                movie = MovieIndex(timescale=timescale, duration=duration)
+            elif box_type == b"trak":
+                track = _parse_track(data, start, end)
+                if track:
+                    tracks.append(track)
+    except (struct.error, IndexError) as e:
+        raise MP4ParseError(f"Malformed moov box: {e}") from e
+
+    if movie is None:
+        raise MP4ParseError("moov box has no mvhd header")
+
+    movie.tracks = tracks
+    return movie
@@ -0,0 +1,189 @@
+"""Direct Postgres data access for the hot request queries.
+
+Every ``SupabaseService`` query is an HTTPS round trip through PostgREST.
+``PostgresRepository`` keeps the same interface but sends request lookups,
+status and preference updates over a pool of asyncpg
+connections to the project database. Storage, Edge Functions and auth still
+go through supabase-py.
+
+asyncpg prepares each distinct statement once per connection and reuses it
+from its statement cache, so the fixed SQL below is parsed and planned once
+per pooled connection rather than per call.
+"""
+
+import json
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from app.config import settings
+from app.services.supabase_client import SupabaseService
+
+logger = logging.getLogger(__name__)
+
+GET_REQUEST_BY_ID = """
+    SELECT * FROM processing_requests
+    WHERE id = $1::uuid AND user_id = $2::uuid
+"""
+
+# Keyset pages over idx_processing_requests_user_created, without the result JSON
+_USER_REQUEST_SUMMARIES = """
+    SELECT id, user_id, video_filename, video_url, status, description, music_year_start, music_year_end,
+           video_metadata, estimated_cost, proxy_video_url, proxy_audio_url, error_message,
+           created_at, updated_at, completed_at, recommendation_count, result->>'scene_mood' AS scene_mood
+    FROM processing_requests
+    WHERE user_id = $1::uuid {after}
+    ORDER BY created_at DESC, id DESC
+    LIMIT $2
+"""
+GET_USER_REQUESTS = _USER_REQUEST_SUMMARIES.format(after="")
+GET_USER_REQUESTS_BEFORE = _USER_REQUEST_SUMMARIES.format(after="AND (created_at, id) < ($3::timestamptz, $4::uuid)")
+
+UPDATE_REQUEST_STATUS = """
+    UPDATE processing_requests
+    SET status = $2::processing_status,
+        result = COALESCE($3::jsonb, result),
+        error_message = COALESCE($4::text, error_message),
+        completed_at = CASE WHEN $2::processing_status = 'completed' THEN NOW() ELSE completed_at END,
+        updated_at = NOW()
+    WHERE id = $1::uuid
+"""
+
+UPDATE_REQUEST_PREFERENCES = """
+    UPDATE processing_requests
+    SET description = $2, music_year_start = $3, music_year_end = $4, result = $5::jsonb, updated_at = NOW()
+    WHERE id = $1::uuid
+    RETURNING *
+"""
+
+
+def _json_value(value: Any) -> Any:
+    """Column value in the JSON form PostgREST returns (UUIDs and timestamps as strings)."""
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _row_to_dict(record: Any) -> Dict[str, Any]:
+    return {key: _json_value(value) for key, value in record.items()}
+
+
+async def _init_connection(connection: Any) -> None:
+    await connection.set_type_codec("jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+    await connection.set_type_codec("json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+
+class PostgresRepository(SupabaseService):
+    """``SupabaseService`` with its hot queries on a direct asyncpg connection pool.
+
+    Rows are returned as the same dictionaries PostgREST produces, so routes
+    and workers can switch backends through ``DATA_BACKEND`` alone.
+    """
+
+    def __init__(self, pool: Any = None):
+        if pool is None:
+            import asyncpg  # noqa: F401  # Fail at startup, not on the first query, when it is missing
+        super().__init__()
+        self._pool = pool
+
+    async def _get_pool(self) -> Any:
+        if self._pool is None:
+            import asyncpg
+
+            self._pool = await asyncpg.create_pool(
+                settings.database_url,
+                min_size=settings.database_pool_min_size,
+                max_size=settings.database_pool_max_size,
+                statement_cache_size=settings.database_statement_cache_size,
+                init=_init_connection,
+            )
+            logger.info(f"Opened Postgres pool ({settings.database_pool_max_size} connections)")
+        return self._pool
+
+    async def startup(self) -> None:
+        """Open the connection pool."""
+        await super().startup()
+        await self._get_pool()
+
+    async def shutdown(self) -> None:
+        """Close the connection pool and the worker threads."""
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+        await super().shutdown()
+
+    async def get_user_requests(
+        self,
+        user_id: str,
+        limit: int = 50,
+        before: Optional[Tuple[str, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Get a page of a user's processing requests, newest first, as summaries without results."""
+        try:
+            pool = await self._get_pool()
+            if before:
+                created_at, request_id = before
+                rows = await pool.fetch(
+                    GET_USER_REQUESTS_BEFORE, user_id, limit, datetime.fromisoformat(created_at), request_id
+                )
+            else:
+                rows = await pool.fetch(GET_USER_REQUESTS, user_id, limit)
+            return [_row_to_dict(row) for row in rows]
+
+        except Exception as e:
+            logger.error(f"Failed to get user requests: {e}")
+            return []
+
+    async def get_request_by_id(self, request_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get a specific processing request by ID."""
+        try:
+            pool = await self._get_pool()
+            row = await pool.fetchrow(GET_REQUEST_BY_ID, request_id, user_id)
+            return _row_to_dict(row) if row else None
+
+        except Exception as e:
+            logger.error(f"Failed to get request {request_id}: {e}")
+            return None
+
+    async def update_request_status(
+        self,
+        request_id: str,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        error_message: Optional[str] = None
+    ) -> bool:
+        """Update processing request status and results."""
+        try:
+            pool = await self._get_pool()
+            command = await pool.execute(
+                UPDATE_REQUEST_STATUS, request_id, status, result or None, error_message or None
+            )
+            # asyncpg returns the command tag, e.g. "UPDATE 1"
+            return command.split()[-1] != "0"
+
+        except Exception as e:
+            logger.error(f"Failed to update request {request_id}: {e}")
+            return False
+
+    async def update_request_preferences(
+        self,
+        request_id: str,
+        description: Optional[str],
+        music_year_start: int,
+        music_year_end: int,
+        result: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """Store new music preferences and the recommendations selected for them."""
+        try:
+            pool = await self._get_pool()
+            row = await pool.fetchrow(
+                UPDATE_REQUEST_PREFERENCES, request_id, description, music_year_start, music_year_end, result
+            )
+            return _row_to_dict(row) if row else None
+
+        except Exception as e:
+            logger.error(f"Failed to update preferences for request {request_id}: {e}")
+            return None
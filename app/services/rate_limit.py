@@ -0,0 +1,181 @@
+"""Client-side rate limiting and circuit breaking for upstream APIs."""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitedError(Exception):
+    """Raised when a request cannot be sent within the allowed wait because of throttling."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(RateLimitedError):
+    """Raised when the circuit breaker is open and requests fail fast."""
+    pass
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a ``Retry-After`` header given as delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """Async token bucket allowing ``rate`` requests per second with bursts up to ``capacity``.
+
+    Callers reserve a token up front, so concurrent waiters queue behind each
+    other instead of all waking at once. ``pause`` blocks the bucket entirely,
+    e.g. for an upstream ``Retry-After``.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self.acquired = 0
+        self.waited = 0
+        self.rejected = 0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self) -> float:
+        """Seconds until the next token is available."""
+        now = time.monotonic()
+        self._refill(now)
+        deficit = (1.0 - self._tokens) / self.rate if self._tokens < 1.0 else 0.0
+        return max(deficit, self._paused_until - now, 0.0)
+
+    async def acquire(self, max_wait: Optional[float] = None) -> None:
+        """
+        Take one token, waiting for it if needed.
+
+        Raises:
+            RateLimitedError: If the token would not be available within ``max_wait`` seconds
+        """
+        wait = self.delay()
+        if max_wait is not None and wait > max_wait:
+            self.rejected += 1
+            raise RateLimitedError(f"Rate limit wait of {wait:.2f}s exceeds {max_wait:.2f}s", retry_after=wait)
+
+        self._tokens -= 1.0
+        self.acquired += 1
+        if wait > 0:
+            self.waited += 1
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hold off all requests for ``seconds``."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        delay = self.delay()
+        return {
+            "rate": self.rate,
+            "capacity": self.capacity,
+            "available_tokens": round(max(self._tokens, 0.0), 3),
+            "paused_for": round(max(self._paused_until - time.monotonic(), 0.0), 3),
+            "next_token_in": round(delay, 3),
+            "acquired": self.acquired,
+            "waited": self.waited,
+            "rejected": self.rejected,
+        }
+
+
+class CircuitBreaker:
+    """Opens after repeated upstream failures so callers fail fast instead of piling on.
+
+    After ``reset_timeout`` seconds an open breaker goes half-open and lets a
+    single probe request through; its outcome closes or re-opens the breaker.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, name: str = "circuit"):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.name = name
+        self._state = self.CLOSED
+        self._failures = 0
+        self._open_until = 0.0
+        self._probe_started: Optional[float] = None
+        self.opened_count = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() >= self._open_until:
+            self._state = self.HALF_OPEN
+            self._probe_started = None
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Return True if a request may be sent now."""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN:
+            now = time.monotonic()
+            # Only one probe at a time; a probe that never reported back is abandoned after reset_timeout
+            if self._probe_started is None or now - self._probe_started >= self.reset_timeout:
+                self._probe_started = now
+                return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        if self._state != self.CLOSED:
+            logger.info(f"Circuit {self.name} closed")
+        self._state = self.CLOSED
+        self._failures = 0
+        self._probe_started = None
+
+    def record_failure(self, open_for: Optional[float] = None) -> None:
+        """Count a failure; ``open_for`` (e.g. a long ``Retry-After``) opens the breaker immediately."""
+        self._failures += 1
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold or open_for:
+            self._open(max(self.reset_timeout, open_for or 0.0))
+
+    def _open(self, seconds: float) -> None:
+        if self._state != self.OPEN:
+            self.opened_count += 1
+            logger.warning(f"Circuit {self.name} opened for {seconds:.1f}s after {self._failures} failures")
+        self._state = self.OPEN
+        self._open_until = max(self._open_until, time.monotonic() + seconds)
+        self._probe_started = None
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.state
+        return {
+            "name": self.name,
+            "state": state,
+            "consecutive_failures": self._failures,
+            "open_for": round(max(self._open_until - time.monotonic(), 0.0), 3) if state == self.OPEN else 0.0,
+            "opened_count": self.opened_count,
+            "rejected": self.rejected,
+        }
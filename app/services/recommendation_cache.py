@@ -0,0 +1,260 @@
+"""Cross-request cache of scene recommendations keyed by a normalized scene signature.
+
+Many videos resolve to the same mood, salient visual elements, ambient tags
+and year range, and so to the same recommendations. Results are cached under
+a signature of those inputs that does not depend on their order or case.
+
+Two backends are available: an in-process LRU, and a Redis-compatible server
+(Redis, Valkey, KeyDB, Dragonfly, ...) that shares entries across the API and
+worker processes.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bumped when the recommendation logic changes so older cached results are ignored
+SIGNATURE_VERSION = 1
+KEY_PREFIX = "v2m:rec:"
+
+
+def normalize_terms(terms: Optional[Iterable[str]], top: Optional[int] = None) -> Tuple[str, ...]:
+    """The first ``top`` (default all) distinct terms, lowercased, whitespace-collapsed and sorted."""
+    normalized: List[str] = []
+    for term in terms or ():
+        term = " ".join(str(term).lower().split())
+        if term and term not in normalized:
+            normalized.append(term)
+    return tuple(sorted(normalized[:top]))
+
+
+def scene_signature(
+    scene_mood: str,
+    visual_elements: Optional[Iterable[str]] = None,
+    ambient_tags: Optional[Iterable[str]] = None,
+    music_year_start: Optional[int] = None,
+    music_year_end: Optional[int] = None,
+    limit: int = 3,
+    description_terms: Optional[Iterable[str]] = None,
+    top: Optional[int] = None,
+) -> str:
+    """
+    Order-independent cache key for a scene's recommendation inputs.
+
+    Only the ``top`` most salient visual elements and ambient tags (the
+    analysis lists them first) take part, so minor trailing tags do not
+    split otherwise identical scenes.
+
+    Args:
+        scene_mood: Detected scene mood
+        visual_elements: Detected visual elements, most salient first
+        ambient_tags: Detected ambient tags, most salient first
+        music_year_start: Earliest release year
+        music_year_end: Latest release year
+        limit: Number of recommendations
+        description_terms: Search terms derived from the scene and user descriptions
+        top: Visual elements and ambient tags kept; defaults to ``recommendation_cache_top_elements``
+
+    Returns:
+        A short hex key
+    """
+    top = settings.recommendation_cache_top_elements if top is None else top
+    payload = json.dumps([
+        SIGNATURE_VERSION,
+        settings.recommendation_source,
+        " ".join(re.findall(r"[a-z]+", (scene_mood or "").lower())),
+        normalize_terms(visual_elements, top),
+        normalize_terms(ambient_tags, top),
+        music_year_start,
+        music_year_end,
+        limit,
+        sorted(set(description_terms or ())),
+    ])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryBackend:
+    """In-process LRU backend with per-entry expiry."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() >= entry[0]:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    async def set(self, key: str, value: str) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def size(self) -> int:
+        return len(self._entries)
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisBackend:
+    """Backend on a Redis-compatible server, shared by every process using the same URL.
+
+    Entries expire through the server's TTL. A sorted set of keys by last
+    access bounds the entry count to ``maxsize``, evicting least recently
+    used entries, so the bound holds even on servers without an LRU
+    ``maxmemory-policy``.
+    """
+
+    def __init__(self, url: str, maxsize: int, ttl: float, client: Any = None):
+        if client is None:
+            import redis.asyncio as redis
+
+            client = redis.from_url(url, decode_responses=True)
+        self.client = client
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.index_key = f"{KEY_PREFIX}index"
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self.client.get(KEY_PREFIX + key)
+        if value is not None:
+            await self.client.zadd(self.index_key, {key: time.time()})
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        await self.client.set(KEY_PREFIX + key, value, ex=int(self.ttl))
+        await self.client.zadd(self.index_key, {key: time.time()})
+        excess = await self.client.zcard(self.index_key) - self.maxsize
+        if excess > 0:
+            evicted = [member for member, _ in await self.client.zpopmin(self.index_key, excess)]
+            if evicted:
+                await self.client.delete(*(KEY_PREFIX + member for member in evicted))
+                self.evictions += len(evicted)
+
+    async def size(self) -> int:
+        return await self.client.zcard(self.index_key)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class RecommendationCache:
+    """Scene recommendation cache over a pluggable backend.
+
+    Concurrent lookups of the same signature in this process share one
+    computation. Backend failures are logged and treated as misses, so an
+    unreachable cache server never fails a recommendation. Empty results
+    are not cached.
+    """
+
+    def __init__(self, backend: Any):
+        self.backend = backend
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    async def get_or_compute(
+        self,
+        signature: str,
+        compute: Callable[[], Awaitable[List[Dict[str, Any]]]],
+    ) -> List[Dict[str, Any]]:
+        """Return cached recommendations for ``signature``, computing and storing them on a miss."""
+        try:
+            cached = await self.backend.get(signature)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Recommendation cache read failed: {e}")
+            cached = None
+        if cached is not None:
+            self.hits += 1
+            return json.loads(cached)
+
+        inflight = self._inflight.get(signature)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        task = asyncio.ensure_future(self._compute(signature, compute))
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._inflight[signature] = task
+        return await asyncio.shield(task)
+
+    async def _compute(
+        self,
+        signature: str,
+        compute: Callable[[], Awaitable[List[Dict[str, Any]]]],
+    ) -> List[Dict[str, Any]]:
+        try:
+            recommendations = await compute()
+            if recommendations:
+                try:
+                    await self.backend.set(signature, json.dumps(recommendations))
+                except Exception as e:
+                    self.errors += 1
+                    logger.warning(f"Recommendation cache write failed: {e}")
+            return recommendations
+        finally:
+            self._inflight.pop(signature, None)
+
+    async def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters, backend and size."""
+        try:
+            size = await self.backend.size()
+        except Exception:
+            size = None
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "backend": type(self.backend).__name__,
+            "size": size,
+            "maxsize": self.backend.maxsize,
+            "ttl": self.backend.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.backend.evictions,
+            "errors": self.errors,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+
+def create_recommendation_cache() -> Optional[RecommendationCache]:
+    """Build the cache configured by ``recommendation_cache_backend``; None when disabled."""
+    backend_name = settings.recommendation_cache_backend
+    size, ttl = settings.recommendation_cache_size, settings.recommendation_cache_ttl
+    if backend_name == "memory":
+        return RecommendationCache(MemoryBackend(size, ttl))
+    if backend_name == "redis":
+        try:
+            return RecommendationCache(RedisBackend(settings.recommendation_cache_url, size, ttl))
+        except ImportError:
+            logger.warning("The redis package is not installed; recommendation caching disabled")
+            return None
+    if backend_name:
+        logger.warning(f"Unknown recommendation cache backend '{backend_name}'; caching disabled")
+    return None
@@ -0,0 +1,167 @@
+"""Batch candidate scoring and maximal-marginal-relevance (MMR) re-ranking."""
+
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.services.catalog import FEATURES, normalize_tempo
+from app.services.keyword_matcher import keyword_set_matcher
+
+logger = logging.getLogger(__name__)
+
+# Relevance weights: feature similarity, popularity, description keyword match
+FEATURE_WEIGHT = 0.5
+POPULARITY_WEIGHT = 0.3
+KEYWORD_WEIGHT = 0.2
+
+# Share of the redundancy penalty from sharing an artist; the rest is feature similarity
+ARTIST_REDUNDANCY = 0.7
+
+
+def _candidate_matrix(candidates: Sequence[Dict[str, Any]], target: np.ndarray) -> np.ndarray:
+    """Feature rows in ``catalog.FEATURES`` order; missing values take the target's value."""
+    rows = np.tile(np.asarray(target, dtype=np.float32), (len(candidates), 1))
+    for i, candidate in enumerate(candidates):
+        audio = candidate.get("audio_features") or {}
+        values = (
+            candidate.get("energy_level"),
+            candidate.get("valence"),
+            audio.get("danceability"),
+            None if audio.get("tempo") is None else normalize_tempo(audio["tempo"]),
+        )
+        for j, value in enumerate(values):
+            if value is not None:
+                rows[i, j] = value
+    return rows
+
+
+def _has_measured_features(candidates: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """Mask of candidates whose audio features were measured rather than estimated from the scene mood."""
+    return np.array(
+        [not (candidate.get("audio_features") or {}).get("estimated") for candidate in candidates], dtype=bool
+    )
+
+
+def _sort_keys(candidates: Sequence[Dict[str, Any]]) -> List[str]:
+    return [
+        candidate.get("spotify_id") or f"{candidate.get('artist', '')}\x00{candidate.get('title', '')}"
+        for candidate in candidates
+    ]
+
+
+def score_candidates(
+    candidates: Sequence[Dict[str, Any]],
+    target: np.ndarray,
+    keywords: Sequence[str] = (),
+) -> np.ndarray:
+    """
+    Score every candidate's relevance to the scene in one vectorized pass.
+
+    Relevance mixes feature similarity to ``target``, Spotify popularity and the
+    share of ``keywords`` found in the track title or artist.
+
+    Feature similarity is only scored for candidates with measured audio
+    features, such as catalog tracks. Spotify search results carry features
+    estimated from the scene mood (marked ``audio_features["estimated"]``),
+    which are the same for every result and say nothing about the track. Those
+    are scored on popularity and keywords alone, reweighted to the same [0, 1]
+    scale.
+
+    Returns:
+        Relevance scores in [0, 1], one per candidate
+    """
+    if not candidates:
+        return np.empty(0, dtype=np.float32)
+
+    features = _candidate_matrix(candidates, target)
+    feature_similarity = 1.0 - np.sqrt(((features - target) ** 2).sum(axis=1) / len(FEATURES))
+
+    popularity = np.array(
+        [(candidate.get("audio_features") or {}).get("popularity", 50) for candidate in candidates],
+        dtype=np.float32,
+    ) / 100.0
+
+    keyword_match = np.zeros(len(candidates), dtype=np.float32)
+    if keywords:
+        matcher = keyword_set_matcher(tuple(keywords))
+        hits = np.array(
+            [matcher.count(f"{candidate.get('title', '')} {candidate.get('artist', '')}") for candidate in candidates],
+            dtype=np.float32,
+        )
+        # Two matching keywords already count as a full match
+        keyword_match = np.minimum(hits / 2.0, 1.0)
+
+    varying = POPULARITY_WEIGHT * popularity + KEYWORD_WEIGHT * keyword_match
+    relevance = np.where(
+        _has_measured_features(candidates),
+        FEATURE_WEIGHT * feature_similarity + varying,
+        varying / (POPULARITY_WEIGHT + KEYWORD_WEIGHT),
+    )
+    return np.clip(relevance, 0.0, 1.0).astype(np.float32)
+
+
+def rerank(
+    candidates: Sequence[Dict[str, Any]],
+    target: np.ndarray,
+    keywords: Sequence[str] = (),
+    limit: int = 3,
+    diversity: float = 0.3,
+    relevance: Optional[np.ndarray] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Pick ``limit`` candidates by maximal marginal relevance.
+
+    Each step takes the candidate maximizing
+    ``(1 - diversity) * relevance - diversity * redundancy``. Redundancy is the
+    candidate's highest similarity to anything already picked, where sharing
+    an artist counts most. Feature similarity only counts between candidates
+    whose audio features were both measured (see :func:`score_candidates`);
+    for estimated features redundancy is the shared artist alone. Ties are
+    broken by Spotify ID (or artist and title), so the same candidates always
+    produce the same ranking.
+
+    Args:
+        candidates: Formatted track recommendations
+        target: Scene target feature vector (see :func:`catalog.target_vector`)
+        keywords: Description keywords to match against titles and artists
+        limit: Number of tracks to return
+        diversity: Weight of the redundancy penalty, 0 for pure relevance
+        relevance: Precomputed relevance scores, if already available
+
+    Returns:
+        Selected candidates in rank order with ``confidence_score`` set to their relevance
+    """
+    if not candidates or limit <= 0:
+        return []
+
+    relevance = score_candidates(candidates, target, keywords) if relevance is None else relevance
+    # Canonical order: by relevance, then by a stable key, so input order never matters
+    keys = _sort_keys(candidates)
+    order = sorted(range(len(candidates)), key=lambda i: (-float(relevance[i]), keys[i]))
+    candidates = [candidates[i] for i in order]
+    relevance = np.asarray(relevance, dtype=np.float32)[order]
+
+    features = _candidate_matrix(candidates, target)
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    unit = features / np.maximum(norms, 1e-9)
+    measured = _has_measured_features(candidates)
+    feature_similarity = (unit @ unit.T) * (measured[:, None] & measured[None, :])
+    artists = np.array([(candidate.get("artist") or "").lower() for candidate in candidates])
+    same_artist = (artists[:, None] == artists[None, :]) & (artists[:, None] != "")
+    similarity = ARTIST_REDUNDANCY * same_artist + (1.0 - ARTIST_REDUNDANCY) * feature_similarity
+
+    selected: List[int] = []
+    redundancy = np.zeros(len(candidates), dtype=np.float32)
+    available = np.ones(len(candidates), dtype=bool)
+    for _ in range(min(limit, len(candidates))):
+        scores = np.where(available, (1.0 - diversity) * relevance - diversity * redundancy, -np.inf)
+        best = int(np.argmax(scores))  # First maximum, i.e. the canonical tie-break
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+
+    return [
+        {**candidates[i], "confidence_score": round(float(relevance[i]), 3)}
+        for i in selected
+    ]
@@ -0,0 +1,252 @@
+"""Time-segmented parallel processing for long videos.
+
+With real AI enabled, each segment is one invocation of the video-processor
+edge function, which reads only that window of the analysis proxies (a
+range-read slice of the WAV audio, and the video clipped by Gemini) and
+returns its result for merging here. In simulation mode the default
+processor passes each segment, as a ``url#t=start,end`` media fragment, to
+the simulation generator on a worker pool; those workers import only
+configuration, models and :mod:`app.services.simulation`, never the Supabase
+or Spotify services, whose clients are created at import time.
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.models.requests import MusicRecommendation, ProcessingResult, StageMetrics
+
+logger = logging.getLogger(__name__)
+
+# Processes one segment: (request_id, video_url, segment) -> result dictionary
+SegmentProcessor = Callable[[str, str, "VideoSegment"], Dict[str, Any]]
+
+_executor: Optional[Executor] = None
+
+
+@dataclass(frozen=True)
+class VideoSegment:
+    """A contiguous time window of a video."""
+
+    index: int
+    start: float
+    end: float
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    @property
+    def media_fragment(self) -> str:
+        """W3C media fragment selecting this segment, e.g. ``#t=120,240``."""
+        return f"#t={self.start:g},{self.end:g}"
+
+
+def should_segment(duration: Optional[float]) -> bool:
+    """Return True when a video of ``duration`` seconds should be processed in segments."""
+    return (
+        settings.segmented_processing_enabled
+        and duration is not None
+        and duration >= settings.segmented_processing_min_video_seconds
+    )
+
+
+def plan_segments(duration: float, segment_seconds: Optional[float] = None) -> List[VideoSegment]:
+    """Split ``duration`` seconds into fixed-size segments.
+
+    A trailing segment shorter than half the segment size is folded into the
+    previous one so no worker is spent on a few seconds of video.
+    """
+    segment_seconds = segment_seconds or settings.segment_duration_seconds
+    if duration <= 0:
+        return []
+
+    bounds: List[Tuple[float, float]] = []
+    start = 0.0
+    while start < duration:
+        end = min(start + segment_seconds, duration)
+        if bounds and end - start < segment_seconds / 2:
+            bounds[-1] = (bounds[-1][0], end)
+        else:
+            bounds.append((start, end))
+        start = end
+
+    return [VideoSegment(index=i, start=start, end=end) for i, (start, end) in enumerate(bounds)]
+
+
+def analyze_segment(request_id: str, video_url: str, segment: VideoSegment) -> Dict[str, Any]:
+    """Default (simulated) segment processor; module-level so it can run in a process pool."""
+    from app.services.instrumentation import StageRecorder
+    from app.services.simulation import generate_simulation_result
+
+    recorder = StageRecorder()
+    with recorder.stage("analysis"):
+        result = generate_simulation_result(f"{request_id}-{segment.index:04d}", video_url + segment.media_fragment)
+    result["stage_metrics"] = recorder.to_list()
+    return result
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if settings.segment_executor == "thread":
+            _executor = ThreadPoolExecutor(max_workers=settings.segment_max_workers)
+        else:
+            _executor = ProcessPoolExecutor(max_workers=settings.segment_max_workers)
+    return _executor
+
+
+def shutdown_segment_executor() -> None:
+    """Shut down the shared segment worker pool."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _rank_by_weight(values_per_segment: List[Tuple[List[str], float]], limit: int) -> List[str]:
+    """Order values by total segment duration they appear in, then first appearance."""
+    weights: Dict[str, float] = {}
+    for values, weight in values_per_segment:
+        for value in dict.fromkeys(values):
+            weights[value] = weights.get(value, 0.0) + weight
+    ranked = sorted(weights, key=lambda value: -weights[value])
+    return ranked[:limit]
+
+
+def _timestamp(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+def merge_segment_results(
+    segments: List[VideoSegment],
+    results: List[Dict[str, Any]],
+    processing_duration: Optional[float] = None,
+) -> ProcessingResult:
+    """Merge per-segment results into a single :class:`ProcessingResult`.
+
+    Moods are chosen by duration-weighted vote, visual elements and ambient tags
+    are ranked by the share of the video they appear in, transcripts are joined
+    in time order and recommendations are deduplicated by title and artist.
+    """
+    pairs = sorted(zip(segments, results), key=lambda pair: pair[0].start)
+
+    mood_weights: Counter = Counter()
+    for segment, result in pairs:
+        if result.get("scene_mood"):
+            mood_weights[result["scene_mood"]] += segment.duration
+    scene_mood = mood_weights.most_common(1)[0][0] if mood_weights else None
+
+    visual_limit = max((len(result.get("visual_elements") or []) for _, result in pairs), default=0)
+    tag_limit = max((len(result.get("ambient_tags") or []) for _, result in pairs), default=0)
+    visual_elements = _rank_by_weight(
+        [(result.get("visual_elements") or [], segment.duration) for segment, result in pairs], visual_limit
+    )
+    ambient_tags = _rank_by_weight(
+        [(result.get("ambient_tags") or [], segment.duration) for segment, result in pairs], tag_limit
+    )
+
+    transcription = "\n".join(
+        f"[{_timestamp(segment.start)}-{_timestamp(segment.end)}] {result['transcription']}"
+        for segment, result in pairs
+        if result.get("transcription")
+    ) or None
+    scene_description = "\n".join(
+        f"[{_timestamp(segment.start)}-{_timestamp(segment.end)}] {result['scene_description']}"
+        for segment, result in pairs
+        if result.get("scene_description")
+    ) or None
+
+    # Keep the best-scoring occurrence of each track, favouring segments in the dominant mood
+    best: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    recommendation_limit = 0
+    for segment, result in pairs:
+        recommendations = result.get("recommendations") or []
+        recommendation_limit = max(recommendation_limit, len(recommendations))
+        mood_bonus = 1.0 if result.get("scene_mood") == scene_mood else 0.9
+        for recommendation in recommendations:
+            key = (recommendation["title"].lower(), recommendation["artist"].lower())
+            score = recommendation.get("confidence_score", 0.0) * mood_bonus
+            if key not in best or score > best[key]["_score"]:
+                best[key] = {**recommendation, "_score": score}
+    ranked = sorted(best.values(), key=lambda recommendation: -recommendation["_score"])
+    recommendations = [
+        MusicRecommendation(**{k: v for k, v in recommendation.items() if k != "_score"})
+        for recommendation in ranked[:recommendation_limit]
+    ]
+
+    model_versions: Dict[str, str] = {}
+    stage_metrics: List[StageMetrics] = []
+    for segment, result in pairs:
+        for name, version in (result.get("model_versions") or {}).items():
+            model_versions.setdefault(name, version)
+        for metrics in result.get("stage_metrics") or []:
+            stage_metrics.append(StageMetrics(**{**metrics, "segment": segment.index}))
+
+    dominant = next((result for _, result in pairs if result.get("scene_mood") == scene_mood), {})
+    reasoning = f"Merged analysis of {len(pairs)} segments; the dominant mood is {scene_mood}."
+    if dominant.get("reasoning"):
+        reasoning += f" {dominant['reasoning']}"
+
+    return ProcessingResult(
+        scene_description=scene_description,
+        scene_mood=scene_mood,
+        visual_elements=visual_elements,
+        transcription=transcription,
+        ambient_tags=ambient_tags,
+        recommendations=recommendations,
+        reasoning=reasoning,
+        processing_duration=processing_duration,
+        model_versions=model_versions,
+        stage_metrics=stage_metrics,
+        segments=[
+            {
+                "index": segment.index,
+                "start": segment.start,
+                "end": segment.end,
+                "scene_mood": result.get("scene_mood"),
+            }
+            for segment, result in pairs
+        ],
+    )
+
+
+async def process_video_segmented(
+    request_id: str,
+    video_url: str,
+    duration: float,
+    processor: Optional[SegmentProcessor] = None,
+    executor: Optional[Executor] = None,
+) -> ProcessingResult:
+    """Process a long video as parallel time segments and merge the results.
+
+    Args:
+        request_id: Processing request ID
+        video_url: Public URL of the uploaded video
+        duration: Video duration in seconds
+        processor: Segment processor, picklable for a process pool; defaults to :func:`analyze_segment`
+        executor: Executor to run segments on; defaults to the shared worker pool
+
+    Returns:
+        Merged processing result for the whole video
+    """
+    processor = processor or analyze_segment
+    executor = executor or _get_executor()
+    segments = plan_segments(duration)
+
+    logger.info(f"Processing request {request_id} as {len(segments)} segments of {settings.segment_duration_seconds}s")
+
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    results = await asyncio.gather(*[
+        loop.run_in_executor(executor, processor, request_id, video_url, segment)
+        for segment in segments
+    ])
+
+    return merge_segment_results(segments, results, round(time.perf_counter() - start, 3))
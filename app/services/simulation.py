@@ -0,0 +1,168 @@
+"""Simulated video analysis results used when real AI processing is disabled.
+
+Kept free of service clients so process-pool workers can import it cheaply.
+"""
+
+import hashlib
+import time
+
+
+def generate_simulation_result(request_id: str, video_url: str) -> dict:
+    """Generate unique simulation results based on video characteristics."""
+    # Create hashes for uniqueness
+    video_hash = int(hashlib.md5(request_id[-8:].encode()).hexdigest()[:8], 16)
+    url_hash = sum(ord(c) for c in video_url)
+    combined_hash = video_hash + url_hash
+
+    # Generate unique frame count and names
+    frame_count = 4 + (combined_hash % 4)  # 4-7 frames
+    timestamp = int(time.time())
+    extracted_frames = [
+        f"{request_id}_frame_{str(i+1).zfill(3)}_{timestamp + i}.jpg" 
+        for i in range(frame_count)
+    ]
+
+    # Generate unique ambient tags
+    tag_categories = [
+        ["Music", "Instruments", "Melody", "Harmony"],
+        ["Nature", "Birds", "Wind", "Water", "Outdoor"],
+        ["Urban", "Traffic", "City", "Voices", "Street"],
+        ["Indoor", "Conversation", "Footsteps", "Ambient", "Room"],
+        ["Electronic", "Synthesizer", "Digital", "Technology"],
+        ["Celebration", "Laughter", "Applause", "Joy", "Party"],
+        ["Peaceful", "Calm", "Meditation", "Quiet", "Serene"],
+        ["Energetic", "Movement", "Activity", "Dynamic", "Vibrant"]
+    ]
+
+    category_index = combined_hash % len(tag_categories)
+    ambient_tags = tag_categories[category_index][:3 + (combined_hash % 2)]
+
+    # Generate unique visual elements
+    visual_base = [
+        "Lighting", "Color Dynamics", "Movement Patterns", "Composition", 
+        "Depth", "Texture", "Contrast", "Perspective", "Focus"
+    ]
+    visual_context = [
+        "Cinematic Flow", "Natural Beauty", "Rhythmic Motion", "Organic Shapes",
+        "Geometric Forms", "Atmospheric Depth", "Character Interaction", "Environmental Context"
+    ]
+
+    visual_elements = []
+    for i in range(4):
+        if i < 2:
+            idx = (combined_hash + i * 7) % len(visual_base)
+            visual_elements.append(visual_base[idx])
+        else:
+            idx = (combined_hash + i * 11) % len(visual_context)
+            visual_elements.append(visual_context[idx])
+
+    # Enhanced mood generation with more variety
+    mood_options = [
+        "Energetic and Vibrant", "Calm and Contemplative", "Dramatic and Intense",
+        "Playful and Lighthearted", "Mysterious and Intriguing", "Warm and Inviting",
+        "Cool and Professional", "Nostalgic and Reflective", "Adventurous and Bold",
+        "Romantic and Dreamy", "Suspenseful and Tense", "Uplifting and Inspiring",
+        "Melancholic and Thoughtful", "Chaotic and Energetic", "Serene and Peaceful",
+        "Dark and Moody", "Bright and Cheerful", "Sophisticated and Elegant",
+        "Raw and Authentic", "Futuristic and Modern", "Whimsical and Creative"
+    ]
+
+    # Use multiple factors for mood selection to ensure variety
+    mood_index = (combined_hash * 3 + video_hash + url_hash) % len(mood_options)
+    mood = mood_options[mood_index]
+
+    # Enhanced scene description templates for more variety
+    description_templates = [
+        f"Captivating {frame_count}-frame sequence with {mood.lower()} undertones. Audio features {', '.join(ambient_tags[:2]).lower()} elements while visuals emphasize {', '.join(visual_elements[:2]).lower()} throughout the composition.",
+        f"Rich visual narrative spanning {frame_count} distinct moments, characterized by {mood.lower()} energy. The footage highlights {', '.join(visual_elements[:2]).lower()} complemented by {', '.join(ambient_tags[:2]).lower()} soundscape.",
+        f"Compelling video analysis revealing {frame_count} key frames with {mood.lower()} atmosphere. Content showcases {', '.join(visual_elements[:2]).lower()} enhanced by {', '.join(ambient_tags[:2]).lower()} audio signature."
+    ]
+
+    description_index = (video_hash + combined_hash) % len(description_templates)
+    scene_description = description_templates[description_index]
+
+    # Generate unique transcription
+    transcription_variants = [
+        f"Audio analysis of video {request_id[-6:]} reveals {ambient_tags[0].lower()} elements with varied tonal qualities.",
+        f"Voice and environmental audio detected in sequence {request_id[-6:]} with {ambient_tags[0].lower()} characteristics.",
+        f"Complex audio landscape in video {request_id[-6:]} featuring {ambient_tags[0].lower()} components and ambient soundscape."
+    ]
+
+    transcription = transcription_variants[combined_hash % len(transcription_variants)]
+
+    # Enhanced unique music recommendations with larger database
+    music_database = [
+        {"title": "Dynamic Rhythm", "artist": "Pulse Collective", "genre": "Electronic", "mood": "Energetic", "energy": 0.85, "valence": 0.9},
+        {"title": "Serene Flow", "artist": "Ambient Waters", "genre": "Ambient", "mood": "Calm", "energy": 0.25, "valence": 0.7},
+        {"title": "Urban Beats", "artist": "City Pulse", "genre": "Hip-Hop", "mood": "Urban", "energy": 0.8, "valence": 0.75},
+        {"title": "Natural Harmony", "artist": "Organic Sound", "genre": "Folk", "mood": "Peaceful", "energy": 0.4, "valence": 0.8},
+        {"title": "Cinematic Journey", "artist": "Epic Sounds", "genre": "Orchestral", "mood": "Dramatic", "energy": 0.9, "valence": 0.6},
+        {"title": "Contemplative Space", "artist": "Mindful Tones", "genre": "Neo-Classical", "mood": "Reflective", "energy": 0.3, "valence": 0.65},
+        {"title": "Vibrant Energy", "artist": "Colorful Beats", "genre": "Dance", "mood": "Joyful", "energy": 0.95, "valence": 0.92},
+        {"title": "Mysterious Depths", "artist": "Shadow Music", "genre": "Dark Ambient", "mood": "Mysterious", "energy": 0.4, "valence": 0.35},
+        {"title": "Sunset Vibes", "artist": "Golden Hour", "genre": "Chill Pop", "mood": "Warm", "energy": 0.6, "valence": 0.8},
+        {"title": "Digital Dreams", "artist": "Synth Collective", "genre": "Synthwave", "mood": "Futuristic", "energy": 0.7, "valence": 0.7},
+        {"title": "Mountain Echo", "artist": "Valley Sounds", "genre": "Acoustic", "mood": "Nature", "energy": 0.5, "valence": 0.75},
+        {"title": "Night Drive", "artist": "Midnight Express", "genre": "Electronic Rock", "mood": "Adventurous", "energy": 0.85, "valence": 0.65},
+        {"title": "Coffee Shop Melody", "artist": "Café Musicians", "genre": "Jazz", "mood": "Cozy", "energy": 0.4, "valence": 0.8},
+        {"title": "Ocean Waves", "artist": "Seaside Harmony", "genre": "Ambient Nature", "mood": "Tranquil", "energy": 0.2, "valence": 0.9},
+        {"title": "City Lights", "artist": "Metro Vibes", "genre": "Lo-Fi Hip Hop", "mood": "Modern", "energy": 0.6, "valence": 0.6},
+        {"title": "Storm Brewing", "artist": "Thunder Collective", "genre": "Dark Rock", "mood": "Intense", "energy": 0.95, "valence": 0.3},
+        {"title": "Pixel Perfect", "artist": "Retro Gaming", "genre": "Chiptune", "mood": "Playful", "energy": 0.8, "valence": 0.9},
+        {"title": "Forest Path", "artist": "Woodland Ensemble", "genre": "Celtic", "mood": "Mystical", "energy": 0.5, "valence": 0.7}
+    ]
+
+    # Use a more sophisticated selection algorithm for maximum uniqueness
+    recommendations = []
+    used_indices = set()
+
+    # Create unique seed for this video
+    video_seed = hash(f"{request_id}_{video_url}") % 10000
+
+    for i in range(3):
+        # Use multiple factors to ensure uniqueness
+        selection_factor = (combined_hash * (i + 1) + video_seed + len(video_url) * i) % len(music_database)
+
+        # Ensure no duplicates
+        while selection_factor in used_indices:
+            selection_factor = (selection_factor + 7) % len(music_database)
+        used_indices.add(selection_factor)
+
+        track = music_database[selection_factor]
+
+        # Add slight variations to confidence scores
+        base_confidence = 0.78 + (combined_hash % 20) / 100  # 0.78-0.97
+        confidence_variation = (video_seed % 10) / 100  # 0.00-0.09
+        final_confidence = min(0.99, base_confidence + confidence_variation)
+
+        recommendations.append({
+            "title": track["title"],
+            "artist": track["artist"],
+            "genre": track["genre"],
+            "mood": track["mood"],
+            "energy_level": track["energy"],
+            "valence": track["valence"],
+            "confidence_score": round(final_confidence, 3)
+        })
+
+    reasoning = (
+        f"Based on the {mood.lower()} scene analysis featuring {visual_elements[0].lower()} "
+        f"and {visual_elements[1].lower()} with {ambient_tags[0].lower()} audio elements, "
+        f"these recommendations complement the unique characteristics of video {request_id[-6:]}."
+    )
+
+    return {
+        "scene_description": scene_description,
+        "scene_mood": mood,
+        "visual_elements": visual_elements,
+        "ambient_tags": ambient_tags,
+        "extracted_frames": extracted_frames,
+        "transcription": transcription,
+        "recommendations": recommendations,
+        "reasoning": reasoning,
+        "processing_duration": 4.5 + (combined_hash % 20) / 10,  # 4.5-6.4 seconds
+        "model_versions": {
+            "video_analysis": f"simulation-v{1 + (combined_hash % 3)}.{combined_hash % 10}",
+            "audio_analysis": f"content-aware-v{1 + (combined_hash % 2)}.{(combined_hash * 7) % 10}"
+        }
+    }
@@ -1,13 +1,52 @@
 """Spotify API service for music recommendations."""
 
+import asyncio
 import base64
+import importlib.util
 import logging
-from typing import List, Dict, Any, Optional
+import re
+import time
+from typing import Any, Awaitable, Dict, List, Optional, Sequence, Tuple
 import httpx
+import numpy as np
 from app.config import settings
+from app.services.cache import AsyncTTLCache
+from app.services.catalog import load_catalog, recommend_from_catalog
+from app.services.keyword_matcher import KeywordMatcher
+from app.services.mood_profiles import mood_vector, resolve_mood
+from app.services.rate_limit import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RateLimitedError,
+    TokenBucket,
+    parse_retry_after,
+)
+from app.services.recommendation_cache import create_recommendation_cache, normalize_terms, scene_signature
+from app.services.reranker import rerank, score_candidates
+from app.services.spotify_token import SpotifyTokenManager
 
 logger = logging.getLogger(__name__)
 
+# Mood searched alongside the scene mood in case the primary search comes back thin
+FALLBACK_MOOD = "Joyful and Energetic"
+
+# Track moods suggested by title words, in priority order
+TRACK_MOOD_MATCHER = KeywordMatcher({
+    "Upbeat and Joyful": ("happy", "joy", "fun", "party", "dance"),
+    "Romantic": ("love", "heart", "romantic"),
+    "Calm and Peaceful": ("calm", "peace", "chill", "relax"),
+    "Intense and Dramatic": ("intense", "power", "strong", "epic"),
+})
+
+# Setting words from scene descriptions that make useful track search terms
+DESCRIPTION_KEYWORDS = {
+    "beach", "ocean", "sea", "summer", "sunset", "sunrise", "night", "city", "street",
+    "rain", "storm", "snow", "winter", "forest", "mountain", "road", "car", "drive",
+    "party", "club", "wedding", "birthday", "dinner", "cafe", "coffee", "travel",
+    "adventure", "sports", "workout", "gym", "running", "family", "friends", "kids",
+    "nature", "garden", "concert", "festival", "holiday", "christmas", "morning",
+}
+
 
 class SpotifyService:
     """Service for Spotify Web API integration."""
@@ -15,14 +54,81 @@ class SpotifyService:
     def __init__(self):
         self.client_id = settings.spotify_client_id
         self.client_secret = settings.spotify_client_secret
-        self.access_token: Optional[str] = None
+        self.token_manager = SpotifyTokenManager(
+            self._fetch_access_token, refresh_margin=settings.spotify_token_refresh_margin
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        # Queries come from a small vocabulary, so identical searches repeat across users
+        self._search_cache = AsyncTTLCache(
+            maxsize=settings.spotify_search_cache_size,
+            ttl=settings.spotify_search_cache_ttl,
+            name="spotify_search",
+            stale_ttl=settings.spotify_search_cache_stale_ttl,
+        )
+        # Shared by every request this process makes to the Spotify Web API
+        self.rate_limiter = TokenBucket(
+            rate=settings.spotify_rate_limit_per_second, capacity=settings.spotify_rate_limit_burst
+        )
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=settings.spotify_breaker_failure_threshold,
+            reset_timeout=settings.spotify_breaker_reset_seconds,
+            name="spotify",
+        )
+        # Scene recommendations shared across requests (and processes, with a shared backend)
+        self.recommendation_cache = create_recommendation_cache()
         logger.info(f"Spotify service initialized with client_id: {self.client_id[:10] if self.client_id else 'None'}...")
+    
+    def _create_client(self) -> httpx.AsyncClient:
+        """Create the shared pooled HTTP client used for all Spotify calls."""
+        # HTTP/2 needs the optional h2 package (httpx[http2])
+        http2 = settings.spotify_http2 and importlib.util.find_spec("h2") is not None
+        return httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.spotify_max_connections,
+                max_keepalive_connections=settings.spotify_max_keepalive_connections,
+                keepalive_expiry=settings.spotify_keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(
+                settings.spotify_read_timeout,
+                connect=settings.spotify_connect_timeout,
+                pool=settings.spotify_pool_timeout,
+            ),
+        )
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared client, creating it lazily outside the app lifespan."""
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+        return self._client
+    
+    async def startup(self) -> None:
+        """Open the pooled HTTP client and the track catalog; called on application startup."""
+        self._get_client()
+        logger.info("Spotify HTTP client started")
+        if settings.recommendation_source == "auto":
+            await load_catalog()
+    
+    async def shutdown(self) -> None:
+        """Close the pooled HTTP client and its connections; called on application shutdown."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("Spotify HTTP client closed")
+        if self.recommendation_cache is not None:
+            await self.recommendation_cache.close()
+        
+    @property
+    def access_token(self) -> Optional[str]:
+        """Currently cached access token, if still valid."""
+        return self.token_manager.token
         
     async def _get_access_token(self) -> str:
-        """Get Spotify access token using client credentials flow."""
-        if self.access_token:
-            return self.access_token
-            
+        """Get a valid Spotify access token, refreshing it before it expires."""
+        return await self.token_manager.get_token()
+    
+    async def _fetch_access_token(self) -> Tuple[str, float]:
+        """Request a new access token using the client credentials flow."""
         try:
             # Check if credentials are properly configured
             if not self.client_id or not self.client_secret or self.client_id == "your_spotify_client_id_here":
@@ -33,72 +139,94 @@ class SpotifyService:
             credentials = f"{self.client_id}:{self.client_secret}"
             credentials_b64 = base64.b64encode(credentials.encode()).decode()
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    "https://accounts.spotify.com/api/token",
-                    headers={
-                        "Authorization": f"Basic {credentials_b64}",
-                        "Content-Type": "application/x-www-form-urlencoded"
-                    },
-                    data={"grant_type": "client_credentials"}
-                )
-                
-                logger.info(f"Spotify token response status: {response.status_code}")
-                
-                if response.status_code == 200:
-                    token_data = response.json()
-                    self.access_token = token_data["access_token"]
-                    logger.info("Successfully obtained Spotify access token")
-                    return self.access_token
-                else:
-                    logger.error(f"Failed to get Spotify token: {response.status_code} - {response.text}")
-                    raise Exception(f"Spotify auth failed: {response.status_code}")
+            response = await self._get_client().post(
+                f"{settings.spotify_accounts_url}/api/token",
+                headers={
+                    "Authorization": f"Basic {credentials_b64}",
+                    "Content-Type": "application/x-www-form-urlencoded"
+                },
+                data={"grant_type": "client_credentials"}
+            )
+            
+            logger.info(f"Spotify token response status: {response.status_code}")
+            
+            if response.status_code == 200:
+                token_data = response.json()
+                logger.info("Successfully obtained Spotify access token")
+                return token_data["access_token"], token_data.get("expires_in", 3600)
+            else:
+                logger.error(f"Failed to get Spotify token: {response.status_code} - {response.text}")
+                raise Exception(f"Spotify auth failed: {response.status_code}")
                     
         except Exception as e:
             logger.error(f"Spotify authentication error: {e}")
             raise
     
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send an authenticated API request through the rate limiter and circuit breaker.
+        
+        Throttled (429) and server error responses are retried up to
+        ``spotify_max_retries`` times. A 429 pauses the shared rate limiter for
+        its ``Retry-After``. Waits longer than ``spotify_max_wait_seconds`` are
+        not attempted.
+        
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            RateLimitedError: If Spotify keeps throttling or the wait would exceed the bound
+        """
+        if not self.circuit_breaker.allow_request():
+            raise CircuitOpenError("Spotify circuit breaker is open")
+        
+        max_wait = settings.spotify_max_wait_seconds
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire(max_wait=max_wait)
+            try:
+                response = await self._send(method, url, **kwargs)
+            except httpx.HTTPError:
+                self.circuit_breaker.record_failure()
+                raise
+            
+            if response.status_code != 429 and response.status_code < 500:
+                self.circuit_breaker.record_success()
+                return response
+            
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if response.status_code == 429:
+                self.rate_limiter.pause(retry_after if retry_after is not None else 1.0)
+            delay = retry_after if retry_after is not None else 0.5 * 2 ** attempt
+            
+            if attempt >= settings.spotify_max_retries or delay > max_wait:
+                # A Retry-After beyond what we are willing to wait opens the breaker for that long
+                self.circuit_breaker.record_failure(open_for=retry_after if delay > max_wait else None)
+                if response.status_code == 429:
+                    raise RateLimitedError(f"Spotify rate limited; retry after {retry_after}s", retry_after)
+                return response
+            
+            attempt += 1
+            logger.warning(f"Spotify returned {response.status_code}; retry {attempt} in {delay:.2f}s")
+            if response.status_code != 429:
+                # 429 waits are enforced by the paused rate limiter
+                await asyncio.sleep(delay)
+    
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request with the current token, retrying once with a fresh token on 401."""
+        token = await self._get_access_token()
+        headers = {**kwargs.pop("headers", {}), "Authorization": f"Bearer {token}"}
+        response = await self._get_client().request(method, url, headers=headers, **kwargs)
+        
+        if response.status_code == 401:
+            logger.warning("Spotify rejected access token; refreshing and retrying once")
+            self.token_manager.invalidate(token)
+            headers["Authorization"] = f"Bearer {await self._get_access_token()}"
+            response = await self._get_client().request(method, url, headers=headers, **kwargs)
+        
+        return response
+    
     def _map_mood_to_spotify_params(self, scene_mood: str, energy_level: float = 0.5) -> Dict[str, Any]:
         """Map scene mood to Spotify audio features and search parameters."""
-        mood_mappings = {
-            "Joyful and Energetic": {
-                "valence": 0.8,
-                "energy": 0.9,
-                "danceability": 0.8,
-                "tempo": "120-140",
-                "genres": ["pop", "dance", "funk", "upbeat"]
-            },
-            "Calm and Peaceful": {
-                "valence": 0.6,
-                "energy": 0.3,
-                "danceability": 0.4,
-                "tempo": "60-100",
-                "genres": ["ambient", "chill", "acoustic", "folk"]
-            },
-            "Dramatic and Intense": {
-                "valence": 0.4,
-                "energy": 0.8,
-                "danceability": 0.5,
-                "tempo": "100-130",
-                "genres": ["rock", "cinematic", "epic", "orchestral"]
-            },
-            "Romantic": {
-                "valence": 0.7,
-                "energy": 0.4,
-                "danceability": 0.6,
-                "tempo": "70-110",
-                "genres": ["love songs", "ballad", "romantic", "r&b"]
-            },
-            "Mysterious": {
-                "valence": 0.3,
-                "energy": 0.6,
-                "danceability": 0.4,
-                "tempo": "80-120",
-                "genres": ["dark", "electronic", "ambient", "experimental"]
-            }
-        }
-        
-        return mood_mappings.get(scene_mood, mood_mappings["Joyful and Energetic"])
+        return resolve_mood(scene_mood).params()
     
     async def search_tracks_by_mood(
         self, 
@@ -107,145 +235,164 @@ class SpotifyService:
         limit: int = 5
     ) -> List[Dict[str, Any]]:
         """Search for tracks based on scene mood and visual elements."""
+        query = self._build_mood_query(scene_mood, visual_elements)
         try:
-            token = await self._get_access_token()
-            mood_params = self._map_mood_to_spotify_params(scene_mood)
-            
-            # Create search query based on mood and visual elements
-            search_terms = []
-            
-            # Add mood-based terms (simpler approach)
-            if scene_mood == "Joyful and Energetic":
-                search_terms.extend(["happy", "upbeat", "energetic", "fun"])
-            elif scene_mood == "Calm and Peaceful":
-                search_terms.extend(["calm", "peaceful", "chill", "relaxing"])
-            elif scene_mood == "Dramatic and Intense":
-                search_terms.extend(["dramatic", "intense", "epic", "powerful"])
-            elif scene_mood == "Romantic":
-                search_terms.extend(["love", "romantic", "sweet", "tender"])
-            else:
-                search_terms.extend(["music", "popular", "trending"])
+            return await self._search_tracks(query, scene_mood, visual_elements, limit)
+        except (RateLimitedError, CircuitOpenError) as e:
+            logger.warning(f"Spotify unavailable for '{query}': {e}")
+            return []
+    
+    def _build_mood_query(self, scene_mood: str, visual_elements: List[str]) -> str:
+        """Build a search query from the scene mood and visual elements."""
+        # Create search query based on mood and visual elements
+        search_terms = []
+        
+        # Add mood-based terms
+        search_terms.extend(resolve_mood(scene_mood).search_terms)
+        
+        # Add visual element context
+        if "Dancing" in visual_elements:
+            search_terms.append("dance")
+        if "Nature" in visual_elements:
+            search_terms.append("nature")
+        if "Party" in visual_elements or "Celebration" in visual_elements:
+            search_terms.append("party")
             
-            # Add visual element context
-            if "Dancing" in visual_elements:
-                search_terms.append("dance")
-            if "Nature" in visual_elements:
-                search_terms.append("nature")
-            if "Party" in visual_elements or "Celebration" in visual_elements:
-                search_terms.append("party")
-                
-            # Create simple search query
-            query = " ".join(search_terms[:3])  # Use top 3 terms
+        # Create simple search query
+        return " ".join(search_terms[:3])  # Use top 3 terms
+    
+    def _build_description_query(self, scene_description: str, ambient_tags: List[str]) -> Optional[str]:
+        """Build a search query from setting keywords in the scene description and ambient tags."""
+        words = re.findall(r"[a-z]+", " ".join([scene_description or ""] + (ambient_tags or [])).lower())
+        terms = list(dict.fromkeys(word for word in words if word in DESCRIPTION_KEYWORDS))
+        return " ".join(terms[:3]) or None
+    
+    async def _search_tracks(
+        self,
+        query: str,
+        scene_mood: str,
+        visual_elements: List[str],
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Search tracks for ``query`` and format them for the scene.
+        
+        Search errors are logged and give no results, except that throttling
+        and an open circuit breaker with no cached result to serve are raised
+        so callers can fall back to another source.
+        
+        Raises:
+            RateLimitedError: If Spotify is throttling and no stale result is cached
+            CircuitOpenError: If the circuit breaker is open and no stale result is cached
+        """
+        try:
             logger.info(f"Spotify search query: '{query}'")
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    "https://api.spotify.com/v1/search",
-                    headers={"Authorization": f"Bearer {token}"},
-                    params={
-                        "q": query,
-                        "type": "track",
-                        "limit": limit,  # Just get what we need
-                        "market": "US"
-                    }
+            cache_key = (query, limit, settings.spotify_market)
+            try:
+                tracks = await self._search_cache.get_or_load(
+                    cache_key, lambda: self._search_track_items(query, limit, settings.spotify_market)
                 )
-                
-                logger.info(f"Spotify API response status: {response.status_code}")
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    tracks = data.get("tracks", {}).get("items", [])
-                    logger.info(f"Found {len(tracks)} tracks from Spotify")
-                    
-                    if len(tracks) == 0:
-                        logger.warning(f"No tracks found for query: '{query}'")
-                        return []
-                    
-                    # Format tracks without audio features 
-                    recommendations = []
-                    for track in tracks[:limit]:
-                        # Estimate mood based on track name and artist
-                        estimated_mood = self._estimate_mood_from_track_info(track, scene_mood)
-                        
-                        formatted_track = {
-                            "title": track["name"],
-                            "artist": ", ".join([artist["name"] for artist in track["artists"]]),
-                            "genre": "Various",  # Spotify doesn't provide genre in track data
-                            "mood": estimated_mood,
-                            "energy_level": self._estimate_energy_from_mood(scene_mood),
-                            "valence": self._estimate_valence_from_mood(scene_mood),
-                            "preview_url": track.get("preview_url"),
-                            "spotify_id": track["id"],
-                            "spotify_url": track["external_urls"]["spotify"],
-                            "confidence_score": self._calculate_basic_confidence(track, scene_mood),
-                            "audio_features": {
-                                "danceability": self._estimate_danceability(scene_mood, visual_elements),
-                                "tempo": self._estimate_tempo(scene_mood),
-                                "popularity": track.get("popularity", 50)
-                            }
-                        }
-                        
-                        recommendations.append(formatted_track)
-                    
-                    return recommendations
-                    
-                else:
-                    logger.error(f"Spotify search failed with status {response.status_code}: {response.text}")
-                    
+            except Exception as e:
+                # Fall back to an expired cached result rather than no recommendations
+                tracks = self._search_cache.get_stale(cache_key)
+                if tracks is None:
+                    raise
+                level = logging.INFO if isinstance(e, RateLimitedError) else logging.WARNING
+                logger.log(level, f"Serving stale Spotify results for '{query}': {e}")
+            
+            if len(tracks) == 0:
+                logger.warning(f"No tracks found for query: '{query}'")
                 return []
+            
+            # Format tracks without audio features 
+            recommendations = []
+            for track in tracks[:limit]:
+                # Estimate mood based on track name and artist
+                estimated_mood = self._estimate_mood_from_track_info(track, scene_mood)
                 
+                formatted_track = {
+                    "title": track["name"],
+                    "artist": ", ".join([artist["name"] for artist in track["artists"]]),
+                    "genre": "Various",  # Spotify doesn't provide genre in track data
+                    "mood": estimated_mood,
+                    "energy_level": self._estimate_energy_from_mood(scene_mood),
+                    "valence": self._estimate_valence_from_mood(scene_mood),
+                    "preview_url": track.get("preview_url"),
+                    "spotify_id": track["id"],
+                    "spotify_url": track["external_urls"]["spotify"],
+                    "audio_features": {
+                        "danceability": self._estimate_danceability(scene_mood, visual_elements),
+                        "tempo": self._estimate_tempo(scene_mood),
+                        "popularity": track.get("popularity", 50),
+                        # Derived from the scene mood, not the track; the re-ranker ignores them
+                        "estimated": True
+                    }
+                }
+                
+                recommendations.append(formatted_track)
+            
+            # Score the whole batch at once; search order is kept
+            relevance = score_candidates(recommendations, self._target_vector(scene_mood), self._title_keywords(scene_mood))
+            for recommendation, score in zip(recommendations, relevance):
+                recommendation["confidence_score"] = round(float(score), 3)
+            
+            return recommendations
+            
+        except (RateLimitedError, CircuitOpenError):
+            raise
         except Exception as e:
             logger.error(f"Spotify search error: {e}")
             return []
     
+    async def _search_track_items(self, query: str, limit: int, market: str) -> List[Dict[str, Any]]:
+        """Run a track search against the Spotify API and return the raw track items."""
+        response = await self._request(
+            "GET",
+            f"{settings.spotify_api_url}/search",
+            params={
+                "q": query,
+                "type": "track",
+                "limit": limit,  # Just get what we need
+                "market": market
+            }
+        )
+        
+        logger.info(f"Spotify API response status: {response.status_code}")
+        
+        if response.status_code != 200:
+            raise Exception(f"Spotify search failed with status {response.status_code}: {response.text}")
+        
+        tracks = response.json().get("tracks", {}).get("items", [])
+        logger.info(f"Found {len(tracks)} tracks from Spotify")
+        return tracks
+    
+    def search_cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss metrics for the search result cache."""
+        return self._search_cache.stats()
+    
+    def rate_limit_stats(self) -> Dict[str, Any]:
+        """Rate limiter and circuit breaker state."""
+        return {
+            "rate_limiter": self.rate_limiter.stats(),
+            "circuit_breaker": self.circuit_breaker.stats(),
+        }
+    
     def _estimate_mood_from_track_info(self, track: Dict, scene_mood: str) -> str:
         """Estimate mood based on track name and context."""
-        title = track["name"].lower()
-        artist = track["artists"][0]["name"].lower()
-        
-        # Simple heuristics based on common words
-        if any(word in title for word in ["happy", "joy", "fun", "party", "dance"]):
-            return "Upbeat and Joyful"
-        elif any(word in title for word in ["love", "heart", "romantic"]):
-            return "Romantic"
-        elif any(word in title for word in ["calm", "peace", "chill", "relax"]):
-            return "Calm and Peaceful"
-        elif any(word in title for word in ["intense", "power", "strong", "epic"]):
-            return "Intense and Dramatic"
-        else:
-            return scene_mood  # Default to scene mood
+        return TRACK_MOOD_MATCHER.first(track["name"], default=scene_mood)
     
     def _estimate_energy_from_mood(self, scene_mood: str) -> float:
         """Estimate energy level based on scene mood."""
-        mood_energy = {
-            "Joyful and Energetic": 0.8,
-            "Calm and Peaceful": 0.3,
-            "Dramatic and Intense": 0.8,
-            "Romantic": 0.4,
-            "Mysterious": 0.6
-        }
-        return mood_energy.get(scene_mood, 0.5)
+        return resolve_mood(scene_mood).estimate("energy")
     
     def _estimate_valence_from_mood(self, scene_mood: str) -> float:
         """Estimate valence (positivity) based on scene mood."""
-        mood_valence = {
-            "Joyful and Energetic": 0.9,
-            "Calm and Peaceful": 0.6,
-            "Dramatic and Intense": 0.4,
-            "Romantic": 0.7,
-            "Mysterious": 0.3
-        }
-        return mood_valence.get(scene_mood, 0.5)
+        return resolve_mood(scene_mood).estimate("valence")
     
     def _estimate_danceability(self, scene_mood: str, visual_elements: List[str]) -> float:
         """Estimate danceability based on mood and visual elements."""
-        base_dance = {
-            "Joyful and Energetic": 0.8,
-            "Calm and Peaceful": 0.3,
-            "Dramatic and Intense": 0.5,
-            "Romantic": 0.6,
-            "Mysterious": 0.4
-        }.get(scene_mood, 0.5)
+        base_dance = resolve_mood(scene_mood).estimate("danceability")
         
         # Boost if dancing is in visual elements
         if "Dancing" in visual_elements or "Party" in visual_elements:
@@ -255,58 +402,238 @@ class SpotifyService:
     
     def _estimate_tempo(self, scene_mood: str) -> float:
         """Estimate tempo based on scene mood."""
-        mood_tempo = {
-            "Joyful and Energetic": 130,
-            "Calm and Peaceful": 80,
-            "Dramatic and Intense": 120,
-            "Romantic": 90,
-            "Mysterious": 100
-        }
-        return mood_tempo.get(scene_mood, 100)
-    
-    def _calculate_basic_confidence(self, track: Dict, scene_mood: str) -> float:
-        """Calculate basic confidence score based on popularity and relevance."""
-        popularity = track.get("popularity", 50) / 100  # Normalize to 0-1
-        
-        # Simple relevance check based on track title
-        title = track["name"].lower()
-        relevance = 0.5  # Base relevance
-        
-        if scene_mood == "Joyful and Energetic":
-            if any(word in title for word in ["happy", "joy", "fun", "party", "dance", "upbeat"]):
-                relevance += 0.3
-        elif scene_mood == "Calm and Peaceful":
-            if any(word in title for word in ["calm", "peace", "chill", "relax", "quiet"]):
-                relevance += 0.3
-        
-        # Combine popularity and relevance 
-        return min((popularity * 0.4 + relevance * 0.6), 1.0)
+        return resolve_mood(scene_mood).estimate("tempo")
     
     async def get_recommendations_by_scene(
         self, 
         scene_description: str, 
         scene_mood: str, 
         visual_elements: List[str],
-        ambient_tags: List[str]
+        ambient_tags: List[str],
+        limit: int = 3,
+        music_year_start: Optional[int] = None,
+        music_year_end: Optional[int] = None,
+        user_description: Optional[str] = None
     ) -> List[Dict[str, Any]]:
-        """Get music recommendations based on complete scene analysis."""
-        try:
-            # Use Spotify search for now (recommendations endpoint requires seed tracks)
-            recommendations = await self.search_tracks_by_mood(
-                scene_mood, visual_elements, limit=3
-            )
+        """
+        Get music recommendations based on complete scene analysis.
+        
+        When a local track catalog is configured (and ``recommendation_source``
+        is ``"auto"``), candidates come from a nearest-neighbor search against the
+        scene mood's target audio features, with no Spotify call.
+        
+        Otherwise the primary mood search, a search derived from the scene
+        description and the fallback mood search run concurrently. Their results
+        are deduplicated by Spotify ID. Candidates are gathered until the primary
+        search has finished and ``limit`` tracks are in hand, or until the latency
+        budget runs out.
+        
+        Either way, the candidates are re-ranked in one batch by relevance with
+        maximal marginal relevance for artist diversity. Results are cached
+        across requests under the scene's normalized signature.
+        
+        Args:
+            scene_description: Scene description text
+            scene_mood: Detected scene mood
+            visual_elements: Detected visual elements
+            ambient_tags: Detected ambient tags
+            limit: Number of recommendations to return
+            music_year_start: Earliest release year
+            music_year_end: Latest release year
+            user_description: The user's own description of the music they want
             
-            if not recommendations and scene_mood != "Joyful and Energetic":
-                # Fallback to a more general mood if no results
-                recommendations = await self.search_tracks_by_mood(
-                    "Joyful and Energetic", visual_elements, limit=3
+        Returns:
+            Up to ``limit`` formatted track recommendations
+        """
+        description_query = self._build_description_query(
+            " ".join(filter(None, [scene_description, user_description])), ambient_tags
+        )
+        user_words = tuple(word for word in re.findall(r"[a-z]+", (user_description or "").lower()) if len(word) > 3)
+        keywords = self._title_keywords(scene_mood) + tuple((description_query or "").split()) + user_words
+        
+        def select() -> Awaitable[List[Dict[str, Any]]]:
+            return self._select_recommendations(
+                scene_mood, visual_elements, description_query, keywords, limit, music_year_start, music_year_end
+            )
+        
+        if self.recommendation_cache is None:
+            return await select()
+        signature = scene_signature(
+            scene_mood, visual_elements, ambient_tags, music_year_start, music_year_end, limit,
+            description_terms=keywords,
+        )
+        return await self.recommendation_cache.get_or_compute(signature, select)
+    
+    async def _select_recommendations(
+        self,
+        scene_mood: str,
+        visual_elements: List[str],
+        description_query: Optional[str],
+        keywords: Tuple[str, ...],
+        limit: int,
+        music_year_start: Optional[int],
+        music_year_end: Optional[int],
+    ) -> List[Dict[str, Any]]:
+        """Gather candidates from the catalog or Spotify and re-rank them."""
+        target = self._target_vector(scene_mood)
+        candidate_limit = limit * settings.rerank_candidate_multiplier
+        
+        catalog = await load_catalog() if settings.recommendation_source == "auto" else None
+        if catalog is not None:
+            candidates = recommend_from_catalog(
+                catalog,
+                self._map_mood_to_spotify_params(scene_mood),
+                scene_mood,
+                limit=candidate_limit,
+                year_start=music_year_start,
+                year_end=music_year_end,
+            )
+            return rerank(candidates, target, keywords, limit=limit, diversity=settings.rerank_diversity)
+        
+        candidates = await self._search_candidates(
+            scene_mood, visual_elements, description_query, limit, candidate_limit, music_year_start, music_year_end
+        )
+        return rerank(candidates, target, keywords, limit=limit, diversity=settings.rerank_diversity)
+    
+    async def _search_candidates(
+        self,
+        scene_mood: str,
+        visual_elements: List[str],
+        description_query: Optional[str],
+        limit: int,
+        candidate_limit: int,
+        music_year_start: Optional[int],
+        music_year_end: Optional[int],
+    ) -> List[Dict[str, Any]]:
+        """
+        Gather candidates from concurrent Spotify searches within the latency budget.
+        
+        When Spotify is throttling or its circuit breaker is open and the
+        searches come back short of ``limit``, the rest is filled from the local
+        track catalog if one is configured.
+        """
+        
+        # Use Spotify search for now (recommendations endpoint requires seed tracks)
+        queries = [(self._build_mood_query(scene_mood, visual_elements), scene_mood)]
+        if description_query:
+            queries.append((description_query, scene_mood))
+        if scene_mood != FALLBACK_MOOD:
+            queries.append((self._build_mood_query(FALLBACK_MOOD, visual_elements), FALLBACK_MOOD))
+        if music_year_start or music_year_end:
+            year_filter = f"year:{music_year_start or 1900}-{music_year_end or time.gmtime().tm_year}"
+            queries = [(f"{query} {year_filter}", mood) for query, mood in queries]
+        queries = list(dict.fromkeys(queries))
+        
+        tasks = [
+            asyncio.ensure_future(self._search_tracks(query, mood, visual_elements, candidate_limit))
+            for query, mood in queries
+        ]
+        results: List[Optional[List[Dict[str, Any]]]] = [None] * len(tasks)
+        unavailable: Optional[Exception] = None
+        deadline = time.monotonic() + settings.spotify_recommendation_budget_seconds
+        pending = set(tasks)
+        
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, deadline - time.monotonic()), return_when=asyncio.FIRST_COMPLETED
                 )
+                if not done:
+                    logger.warning(f"Recommendation budget exhausted with {len(pending)} searches pending")
+                    break
+                for task in done:
+                    try:
+                        results[tasks.index(task)] = task.result()
+                    except (RateLimitedError, CircuitOpenError) as e:
+                        results[tasks.index(task)] = []
+                        unavailable = e
+                if results[0] is not None and len(self._merge_results(results)) >= limit:
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+        
+        candidates = self._merge_results(results)
+        if unavailable is not None and len(candidates) < limit:
+            catalog = await load_catalog()
+            if catalog is not None:
+                logger.warning(f"Spotify unavailable ({unavailable}); filling recommendations from the track catalog")
+                seen = {candidate["spotify_id"] for candidate in candidates}
+                candidates += [
+                    candidate
+                    for candidate in recommend_from_catalog(
+                        catalog,
+                        self._map_mood_to_spotify_params(scene_mood),
+                        scene_mood,
+                        limit=candidate_limit,
+                        year_start=music_year_start,
+                        year_end=music_year_end,
+                    )
+                    if candidate["spotify_id"] is None or candidate["spotify_id"] not in seen
+                ]
+        return candidates
+    
+    async def get_recommendations_batch(self, scenes: Sequence[Dict[str, Any]]) -> Tuple[List[Any], int]:
+        """
+        Get recommendations for many scenes in one call.
+        
+        Identical scene descriptors are resolved once. The unique scenes run
+        concurrently (at most ``recommendation_batch_concurrency`` at a time)
+        and share the search cache, so a query that several scenes need, such
+        as the fallback mood search, is sent to Spotify once per batch.
+        
+        Args:
+            scenes: Keyword arguments for :meth:`get_recommendations_by_scene`, one per scene
             
-            return recommendations
-            
-        except Exception as e:
-            logger.error(f"Error getting scene recommendations: {e}")
-            return []
+        Returns:
+            One entry per scene in request order (its recommendations, or the
+            exception that scene raised), and the number of unique scenes
+        """
+        unique: Dict[Tuple, Dict[str, Any]] = {}
+        keys = []
+        for scene in scenes:
+            key = self.scene_key(scene)
+            unique.setdefault(key, scene)
+            keys.append(key)
+        
+        semaphore = asyncio.Semaphore(settings.recommendation_batch_concurrency)
+        
+        async def recommend(scene: Dict[str, Any]) -> List[Dict[str, Any]]:
+            async with semaphore:
+                return await self.get_recommendations_by_scene(**scene)
+        
+        results = await asyncio.gather(*(recommend(scene) for scene in unique.values()), return_exceptions=True)
+        by_key = dict(zip(unique, results))
+        logger.info(f"Batch recommendations: {len(scenes)} scenes, {len(unique)} unique")
+        return [by_key[key] for key in keys], len(unique)
+    
+    def scene_key(self, scene: Dict[str, Any]) -> Tuple:
+        """Key under which two scene descriptors get the same recommendations."""
+        return (
+            (scene.get("scene_description") or "").strip(),
+            (scene.get("scene_mood") or "").strip().lower(),
+            tuple(sorted(scene.get("visual_elements") or ())),
+            normalize_terms(scene.get("ambient_tags")),
+            scene.get("limit", 3),
+            scene.get("music_year_start"),
+            scene.get("music_year_end"),
+        )
+    
+    def _target_vector(self, scene_mood: str) -> np.ndarray:
+        """Target audio feature vector for a scene mood."""
+        return mood_vector(scene_mood)
+    
+    def _title_keywords(self, scene_mood: str) -> Tuple[str, ...]:
+        """Words in a track title or artist that suggest it fits the scene mood."""
+        return resolve_mood(scene_mood).title_keywords
+    
+    def _merge_results(self, results: List[Optional[List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        """Merge per-query results, dropping repeated Spotify IDs."""
+        merged: Dict[str, Dict[str, Any]] = {}
+        for recommendations in results:
+            for recommendation in recommendations or []:
+                merged.setdefault(recommendation["spotify_id"], recommendation)
+        return list(merged.values())
 
 
 # Global instance
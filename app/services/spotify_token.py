@@ -0,0 +1,81 @@
+"""Expiry-aware, single-flight access token management for the Spotify API."""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Fetches a new token: () -> (access_token, expires_in_seconds)
+TokenFetcher = Callable[[], Awaitable[Tuple[str, float]]]
+
+
+class SpotifyTokenManager:
+    """Caches a client-credentials token and refreshes it before it expires.
+
+    Within ``refresh_margin`` seconds of expiry the current token is still
+    returned while a refresh runs in the background; once expired, callers wait
+    for the refresh. Concurrent callers always share a single in-flight refresh.
+    """
+
+    def __init__(self, fetch: TokenFetcher, refresh_margin: float = 60.0):
+        self._fetch = fetch
+        self.refresh_margin = refresh_margin
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.refresh_count = 0
+
+    @property
+    def token(self) -> Optional[str]:
+        """The cached token if it has not expired yet."""
+        if self._token and time.monotonic() < self._expires_at:
+            return self._token
+        return None
+
+    @property
+    def expires_in(self) -> float:
+        """Seconds until the cached token expires (0 when there is none)."""
+        return max(0.0, self._expires_at - time.monotonic()) if self._token else 0.0
+
+    async def get_token(self) -> str:
+        """Return a valid token, refreshing it first if it has expired."""
+        token = self.token
+        if token is None:
+            return await self.refresh()
+        if self.expires_in <= self.refresh_margin:
+            self._start_refresh()
+        return token
+
+    async def refresh(self) -> str:
+        """Fetch a new token, joining a refresh that is already in flight."""
+        # Shield so a cancelled caller does not cancel the refresh other callers are waiting on
+        return await asyncio.shield(self._start_refresh())
+
+    def invalidate(self, token: Optional[str] = None) -> None:
+        """Drop the cached token, e.g. after a 401; ignored if ``token`` was already replaced."""
+        if token is None or token == self._token:
+            self._token = None
+            self._expires_at = 0.0
+
+    def _start_refresh(self) -> asyncio.Task:
+        task = self._refresh_task
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(self._do_refresh())
+            task.add_done_callback(self._log_refresh_failure)
+            self._refresh_task = task
+        return task
+
+    @staticmethod
+    def _log_refresh_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Spotify token refresh failed: {task.exception()}")
+
+    async def _do_refresh(self) -> str:
+        token, expires_in = await self._fetch()
+        self._token = token
+        self._expires_at = time.monotonic() + float(expires_in)
+        self.refresh_count += 1
+        logger.info(f"Spotify access token refreshed; expires in {int(expires_in)}s")
+        return token
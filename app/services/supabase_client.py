@@ -1,15 +1,37 @@
 """Supabase client service for database and storage operations."""
 
+import asyncio
+import functools
+import json
 import logging
-from typing import Optional, Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List, Callable, Tuple, TypeVar
 from supabase import create_client, Client
 from gotrue.errors import AuthError
 from app.config import settings
+from app.services.analysis_proxy import ensure_analysis_proxy
+from app.services.instrumentation import StageRecorder
+from app.services.segmented_processing import VideoSegment, process_video_segmented, should_segment
+from app.services.simulation import generate_simulation_result
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Request listing columns: everything but the result JSON, plus a summary of it
+REQUEST_SUMMARY_COLUMNS = (
+    "id, user_id, video_filename, video_url, status, description, music_year_start, music_year_end, "
+    "video_metadata, estimated_cost, proxy_video_url, proxy_audio_url, error_message, "
+    "created_at, updated_at, completed_at, recommendation_count, scene_mood:result->>scene_mood"
+)
+
 class SupabaseService:
-    """Service class for Supabase operations."""
+    """Service class for Supabase operations.
+    
+    supabase-py's client is synchronous, so every call that does network I/O
+    runs on a bounded thread pool rather than blocking the event loop.
+    """
     
     def __init__(self):
         """Initialize Supabase client."""
@@ -21,11 +43,35 @@ class SupabaseService:
             settings.supabase_url,
             settings.supabase_anon_key
         )
+        self._executor: Optional[ThreadPoolExecutor] = None
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.supabase_max_workers,
+                thread_name_prefix="supabase"
+            )
+        return self._executor
+    
+    async def _run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a blocking supabase-py call on the worker pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), functools.partial(func, *args, **kwargs))
+    
+    async def startup(self) -> None:
+        """Open connections ahead of the first request; nothing to do for the HTTP client."""
+        pass
+    
+    async def shutdown(self) -> None:
+        """Shut down the worker pool, letting running calls finish."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
         
     async def authenticate_user(self, token: str) -> Optional[Dict[str, Any]]:
         """Authenticate user with JWT token."""
         try:
-            response = self.client.auth.get_user(token)
+            response = await self._run(self.client.auth.get_user, token)
             return response.user.model_dump() if response.user else None
         except AuthError as e:
             logger.error(f"Authentication failed: {e}")
@@ -42,6 +88,9 @@ class SupabaseService:
         description: Optional[str] = None,
         music_year_start: Optional[int] = None,
         music_year_end: Optional[int] = None,
+        video_metadata: Optional[Dict[str, Any]] = None,
+        estimated_cost: Optional[float] = None,
+        video_path: Optional[str] = None,
     ) -> Optional[Dict[str, Any]]:
         """Create a new processing request in the database with music preferences."""
         try:
@@ -55,7 +104,14 @@ class SupabaseService:
                 "music_year_end": music_year_end
             }
             
-            response = self.client.table("processing_requests").insert(request_data).execute()
+            if video_metadata is not None:
+                request_data["video_metadata"] = video_metadata
+            if estimated_cost is not None:
+                request_data["estimated_cost"] = estimated_cost
+            if video_path is not None:
+                request_data["video_path"] = video_path
+            
+            response = await self._run(self.client.table("processing_requests").insert(request_data).execute)
             
             if response.data:
                 logger.info(f"Created processing request: {response.data[0]['id']}")
@@ -66,14 +122,30 @@ class SupabaseService:
             logger.error(f"Failed to create processing request: {e}")
             return None
     
-    async def get_user_requests(self, user_id: str) -> List[Dict[str, Any]]:
-        """Get all processing requests for a user."""
+    async def get_user_requests(
+        self,
+        user_id: str,
+        limit: int = 50,
+        before: Optional[Tuple[str, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Get a page of a user's processing requests, newest first, as summaries without results.
+        
+        ``before`` is the ``(created_at, id)`` of the last request on the
+        previous page; ties on ``created_at`` are broken by ``id``.
+        """
         try:
-            response = self.client.table("processing_requests")\
-                .select("*")\
+            query = self.client.table("processing_requests")\
+                .select(REQUEST_SUMMARY_COLUMNS)\
                 .eq("user_id", user_id)\
-                .order("created_at", desc=True)\
-                .execute()
+                .limit(limit)
+            # Set directly: this postgrest-py has no or_(), and repeated order() calls are not combined
+            if before:
+                created_at, request_id = before
+                query.params = query.params.add(
+                    "or", f'(created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{request_id}))'
+                )
+            query.params = query.params.add("order", "created_at.desc,id.desc")
+            response = await self._run(query.execute)
             
             return response.data if response.data else []
             
@@ -84,12 +156,12 @@ class SupabaseService:
     async def get_request_by_id(self, request_id: str, user_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific processing request by ID."""
         try:
-            response = self.client.table("processing_requests")\
+            query = self.client.table("processing_requests")\
                 .select("*")\
                 .eq("id", request_id)\
                 .eq("user_id", user_id)\
-                .single()\
-                .execute()
+                .single()
+            response = await self._run(query.execute)
             
             return response.data if response.data else None
             
@@ -97,6 +169,25 @@ class SupabaseService:
             logger.error(f"Failed to get request {request_id}: {e}")
             return None
     
+    async def get_recent_stage_metrics(self, limit: int = 500) -> List[Dict[str, Any]]:
+        """Get stage metrics from the most recently completed requests across all users."""
+        try:
+            query = self.client.table("processing_requests")\
+                .select("stage_metrics:result->stage_metrics")\
+                .eq("status", "completed")\
+                .order("completed_at", desc=True)\
+                .limit(limit)
+            response = await self._run(query.execute)
+            
+            stage_metrics = []
+            for row in response.data or []:
+                stage_metrics.extend(row.get("stage_metrics") or [])
+            return stage_metrics
+            
+        except Exception as e:
+            logger.error(f"Failed to get stage metrics: {e}")
+            return []
+    
     async def update_request_status(
         self,
         request_id: str,
@@ -117,10 +208,10 @@ class SupabaseService:
             if status == "completed":
                 update_data["completed_at"] = "now()"
             
-            response = self.client.table("processing_requests")\
+            query = self.client.table("processing_requests")\
                 .update(update_data)\
-                .eq("id", request_id)\
-                .execute()
+                .eq("id", request_id)
+            response = await self._run(query.execute)
             
             return len(response.data) > 0
             
@@ -128,19 +219,120 @@ class SupabaseService:
             logger.error(f"Failed to update request {request_id}: {e}")
             return False
     
+    async def update_request_preferences(
+        self,
+        request_id: str,
+        description: Optional[str],
+        music_year_start: int,
+        music_year_end: int,
+        result: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """Store new music preferences and the recommendations selected for them."""
+        try:
+            query = self.client.table("processing_requests")\
+                .update({
+                    "description": description,
+                    "music_year_start": music_year_start,
+                    "music_year_end": music_year_end,
+                    "result": result,
+                    "updated_at": "now()",
+                })\
+                .eq("id", request_id)
+            response = await self._run(query.execute)
+            
+            return response.data[0] if response.data else None
+            
+        except Exception as e:
+            logger.error(f"Failed to update preferences for request {request_id}: {e}")
+            return None
+    
+    async def get_request_proxy(self, request_id: str) -> Optional[Dict[str, Any]]:
+        """Get the stored analysis proxy URLs of a request."""
+        try:
+            query = self.client.table("processing_requests")\
+                .select("proxy_video_url, proxy_audio_url")\
+                .eq("id", request_id)\
+                .limit(1)
+            response = await self._run(query.execute)
+            
+            return response.data[0] if response.data else None
+            
+        except Exception as e:
+            logger.error(f"Failed to get proxy for request {request_id}: {e}")
+            return None
+    
+    async def update_request_proxy(
+        self,
+        request_id: str,
+        proxy_video_url: str,
+        proxy_audio_url: Optional[str] = None
+    ) -> bool:
+        """Record analysis proxy URLs and schedule the raw upload for early expiry."""
+        try:
+            expires_at = datetime.now(timezone.utc) + timedelta(days=settings.raw_upload_retention_days)
+            query = self.client.table("processing_requests")\
+                .update({
+                    "proxy_video_url": proxy_video_url,
+                    "proxy_audio_url": proxy_audio_url,
+                    "raw_video_expires_at": expires_at.isoformat(),
+                })\
+                .eq("id", request_id)
+            response = await self._run(query.execute)
+            
+            return len(response.data) > 0
+            
+        except Exception as e:
+            logger.error(f"Failed to record proxy for request {request_id}: {e}")
+            return False
+    
+    async def expire_raw_uploads(self, limit: int = 100) -> int:
+        """Delete raw uploads past their expiry whose analysis proxies are stored.
+
+        Each expired request's ``video_url`` is repointed at its video proxy so
+        re-runs and clients never follow a link to the deleted original.
+        """
+        try:
+            query = self.client.table("processing_requests")\
+                .select("id, video_path, proxy_video_url")\
+                .lt("raw_video_expires_at", datetime.now(timezone.utc).isoformat())\
+                .not_.is_("video_path", "null")\
+                .not_.is_("proxy_video_url", "null")\
+                .limit(limit)
+            response = await self._run(query.execute)
+            
+            rows = response.data or []
+            if not rows:
+                return 0
+            
+            await self._run(self.client.storage.from_("videos").remove, [row["video_path"] for row in rows])
+            for row in rows:
+                query = self.client.table("processing_requests")\
+                    .update({"video_path": None, "video_url": row["proxy_video_url"], "raw_video_expires_at": None})\
+                    .eq("id", row["id"])
+                await self._run(query.execute)
+            
+            logger.info(f"Expired {len(rows)} raw uploads")
+            return len(rows)
+            
+        except Exception as e:
+            logger.error(f"Failed to expire raw uploads: {e}")
+            return 0
+    
     async def upload_file(
         self, 
         bucket: str, 
         file_path: str, 
         file_content: bytes,
-        content_type: str = "video/mp4"
+        content_type: str = "video/mp4",
+        upsert: bool = False
     ) -> Optional[str]:
-        """Upload file to Supabase Storage."""
+        """Upload file to Supabase Storage, replacing an existing object when ``upsert`` is set."""
         try:
-            response = self.client.storage.from_(bucket).upload(
+            response = await self._run(
+                self.client.storage.from_(bucket).upload,
                 file_path, 
                 file_content,
-                file_options={"content-type": content_type}
+                file_options={"content-type": content_type, "x-upsert": "true" if upsert else "false"}
             )
             
             if response:
@@ -169,10 +361,26 @@ class SupabaseService:
         video_url: str,
         description: Optional[str] = None,
         music_year_start: Optional[int] = None,
-        music_year_end: Optional[int] = None
+        music_year_end: Optional[int] = None,
+        video_duration: Optional[float] = None,
+        video_path: Optional[str] = None,
+        video_size: Optional[int] = None,
+        has_audio: bool = True
     ) -> bool:
         """Enqueue a processing job by calling the Edge Function."""
         try:
+            recorder = StageRecorder()
+            
+            # Produce the low-resolution analysis proxy once so later stages and re-runs read it
+            proxy = None
+            if settings.analysis_proxy_enabled and video_path:
+                with recorder.stage("proxy_transcode") as stage:
+                    proxy = await ensure_analysis_proxy(request_id, video_url, video_path, has_audio=has_audio)
+                    if proxy and proxy.bytes_written:
+                        # ffmpeg read the whole upload to write the proxies
+                        stage.bytes_in = video_size or 0
+                        stage.bytes_out = proxy.bytes_written
+            
             # Check if we should use real AI processing
             if settings.use_real_ai and settings.use_edge_functions:
                 logger.info(f"🎯 Starting REAL AI processing for request: {request_id}")
@@ -190,9 +398,36 @@ class SupabaseService:
                     request_body["music_year_start"] = music_year_start
                 if music_year_end is not None:
                     request_body["music_year_end"] = music_year_end
+                if proxy:
+                    request_body["analysis_video_url"] = proxy.video_url
+                    if proxy.audio_url:
+                        request_body["analysis_audio_url"] = proxy.audio_url
+                
+                if should_segment(video_duration):
+                    # Long videos are analyzed by one edge invocation per time segment, merged here
+                    await self.update_request_status(request_id=request_id, status="processing")
+                    with ThreadPoolExecutor(
+                        max_workers=settings.segment_max_workers, thread_name_prefix="edge-segment"
+                    ) as executor:
+                        segmented_result = await process_video_segmented(
+                            request_id, video_url, video_duration,
+                            processor=functools.partial(self._analyze_segment_remotely, request_body),
+                            executor=executor,
+                        )
+                    recorder.metrics.extend(segmented_result.stage_metrics)
+                    await self._save_processing_result(
+                        request_id, segmented_result.model_dump(mode="json"), recorder
+                    )
+                    logger.info(f"✅ Real AI processing completed for request: {request_id}")
+                    return True
+                
+                if recorder.metrics:
+                    # The edge function stores the result, so it carries our stages into it
+                    request_body["stage_metrics"] = recorder.to_list()
                 
                 # Call the actual Edge Function
-                response = self.client.functions.invoke(
+                response = await self._run(
+                    self.client.functions.invoke,
                     "video-processor",
                     invoke_options={
                         "body": request_body
@@ -202,7 +437,6 @@ class SupabaseService:
                 # Handle response - it might be bytes or dict
                 if isinstance(response, bytes):
                     try:
-                        import json
                         response_data = json.loads(response.decode('utf-8'))
                     except (json.JSONDecodeError, UnicodeDecodeError) as e:
                         logger.error(f"Failed to parse Edge Function response: {e}")
@@ -234,7 +468,7 @@ class SupabaseService:
             # Fallback to simulation mode
             logger.info(f"🧪 Simulating processing for request: {request_id} (real AI not configured)")
             
-            # Simulate processing delay
+            # Simulate processing delay; simulated work moves no media, so it is not recorded as a stage
             import asyncio
             await asyncio.sleep(2)
             
@@ -244,18 +478,20 @@ class SupabaseService:
                 status="processing"
             )
             
-            # Simulate completion after a short delay
-            await asyncio.sleep(3)
-            
-            # Create unique simulation results based on video characteristics
-            mock_result = self._generate_unique_simulation_result(request_id, video_url)
+            if should_segment(video_duration):
+                # Long videos are analyzed as parallel time segments and merged
+                segmented_result = await process_video_segmented(request_id, video_url, video_duration)
+                mock_result = segmented_result.model_dump(mode="json")
+                recorder.metrics.extend(segmented_result.stage_metrics)
+            else:
+                # Simulate completion after a short delay
+                await asyncio.sleep(3)
+                
+                # Create unique simulation results based on video characteristics
+                mock_result = generate_simulation_result(request_id, video_url)
             
             # Update status to completed
-            await self.update_request_status(
-                request_id=request_id,
-                status="completed",
-                result=mock_result
-            )
+            await self._save_processing_result(request_id, mock_result, recorder)
             
             logger.info(f"🧪 Simulated processing completed for request: {request_id}")
             return True
@@ -269,169 +505,51 @@ class SupabaseService:
                 error_message=f"Processing failed: {str(e)}"
             )
             return False
-            
-    def _generate_unique_simulation_result(self, request_id: str, video_url: str) -> dict:
-        """Generate unique simulation results based on video characteristics."""
-        import hashlib
-        import time
-        
-        # Create hashes for uniqueness
-        video_hash = int(hashlib.md5(request_id[-8:].encode()).hexdigest()[:8], 16)
-        url_hash = sum(ord(c) for c in video_url)
-        combined_hash = video_hash + url_hash
-        
-        # Generate unique frame count and names
-        frame_count = 4 + (combined_hash % 4)  # 4-7 frames
-        timestamp = int(time.time())
-        extracted_frames = [
-            f"{request_id}_frame_{str(i+1).zfill(3)}_{timestamp + i}.jpg" 
-            for i in range(frame_count)
-        ]
-        
-        # Generate unique ambient tags
-        tag_categories = [
-            ["Music", "Instruments", "Melody", "Harmony"],
-            ["Nature", "Birds", "Wind", "Water", "Outdoor"],
-            ["Urban", "Traffic", "City", "Voices", "Street"],
-            ["Indoor", "Conversation", "Footsteps", "Ambient", "Room"],
-            ["Electronic", "Synthesizer", "Digital", "Technology"],
-            ["Celebration", "Laughter", "Applause", "Joy", "Party"],
-            ["Peaceful", "Calm", "Meditation", "Quiet", "Serene"],
-            ["Energetic", "Movement", "Activity", "Dynamic", "Vibrant"]
-        ]
-        
-        category_index = combined_hash % len(tag_categories)
-        ambient_tags = tag_categories[category_index][:3 + (combined_hash % 2)]
-        
-        # Generate unique visual elements
-        visual_base = [
-            "Lighting", "Color Dynamics", "Movement Patterns", "Composition", 
-            "Depth", "Texture", "Contrast", "Perspective", "Focus"
-        ]
-        visual_context = [
-            "Cinematic Flow", "Natural Beauty", "Rhythmic Motion", "Organic Shapes",
-            "Geometric Forms", "Atmospheric Depth", "Character Interaction", "Environmental Context"
-        ]
-        
-        visual_elements = []
-        for i in range(4):
-            if i < 2:
-                idx = (combined_hash + i * 7) % len(visual_base)
-                visual_elements.append(visual_base[idx])
-            else:
-                idx = (combined_hash + i * 11) % len(visual_context)
-                visual_elements.append(visual_context[idx])
-        
-        # Enhanced mood generation with more variety
-        mood_options = [
-            "Energetic and Vibrant", "Calm and Contemplative", "Dramatic and Intense",
-            "Playful and Lighthearted", "Mysterious and Intriguing", "Warm and Inviting",
-            "Cool and Professional", "Nostalgic and Reflective", "Adventurous and Bold",
-            "Romantic and Dreamy", "Suspenseful and Tense", "Uplifting and Inspiring",
-            "Melancholic and Thoughtful", "Chaotic and Energetic", "Serene and Peaceful",
-            "Dark and Moody", "Bright and Cheerful", "Sophisticated and Elegant",
-            "Raw and Authentic", "Futuristic and Modern", "Whimsical and Creative"
-        ]
-        
-        # Use multiple factors for mood selection to ensure variety
-        mood_index = (combined_hash * 3 + video_hash + url_hash) % len(mood_options)
-        mood = mood_options[mood_index]
-        
-        # Enhanced scene description templates for more variety
-        description_templates = [
-            f"Captivating {frame_count}-frame sequence with {mood.lower()} undertones. Audio features {', '.join(ambient_tags[:2]).lower()} elements while visuals emphasize {', '.join(visual_elements[:2]).lower()} throughout the composition.",
-            f"Rich visual narrative spanning {frame_count} distinct moments, characterized by {mood.lower()} energy. The footage highlights {', '.join(visual_elements[:2]).lower()} complemented by {', '.join(ambient_tags[:2]).lower()} soundscape.",
-            f"Compelling video analysis revealing {frame_count} key frames with {mood.lower()} atmosphere. Content showcases {', '.join(visual_elements[:2]).lower()} enhanced by {', '.join(ambient_tags[:2]).lower()} audio signature."
-        ]
-        
-        description_index = (video_hash + combined_hash) % len(description_templates)
-        scene_description = description_templates[description_index]
-        
-        # Generate unique transcription
-        transcription_variants = [
-            f"Audio analysis of video {request_id[-6:]} reveals {ambient_tags[0].lower()} elements with varied tonal qualities.",
-            f"Voice and environmental audio detected in sequence {request_id[-6:]} with {ambient_tags[0].lower()} characteristics.",
-            f"Complex audio landscape in video {request_id[-6:]} featuring {ambient_tags[0].lower()} components and ambient soundscape."
-        ]
-        
-        transcription = transcription_variants[combined_hash % len(transcription_variants)]
-        
-        # Enhanced unique music recommendations with larger database
-        music_database = [
-            {"title": "Dynamic Rhythm", "artist": "Pulse Collective", "genre": "Electronic", "mood": "Energetic", "energy": 0.85, "valence": 0.9},
-            {"title": "Serene Flow", "artist": "Ambient Waters", "genre": "Ambient", "mood": "Calm", "energy": 0.25, "valence": 0.7},
-            {"title": "Urban Beats", "artist": "City Pulse", "genre": "Hip-Hop", "mood": "Urban", "energy": 0.8, "valence": 0.75},
-            {"title": "Natural Harmony", "artist": "Organic Sound", "genre": "Folk", "mood": "Peaceful", "energy": 0.4, "valence": 0.8},
-            {"title": "Cinematic Journey", "artist": "Epic Sounds", "genre": "Orchestral", "mood": "Dramatic", "energy": 0.9, "valence": 0.6},
-            {"title": "Contemplative Space", "artist": "Mindful Tones", "genre": "Neo-Classical", "mood": "Reflective", "energy": 0.3, "valence": 0.65},
-            {"title": "Vibrant Energy", "artist": "Colorful Beats", "genre": "Dance", "mood": "Joyful", "energy": 0.95, "valence": 0.92},
-            {"title": "Mysterious Depths", "artist": "Shadow Music", "genre": "Dark Ambient", "mood": "Mysterious", "energy": 0.4, "valence": 0.35},
-            {"title": "Sunset Vibes", "artist": "Golden Hour", "genre": "Chill Pop", "mood": "Warm", "energy": 0.6, "valence": 0.8},
-            {"title": "Digital Dreams", "artist": "Synth Collective", "genre": "Synthwave", "mood": "Futuristic", "energy": 0.7, "valence": 0.7},
-            {"title": "Mountain Echo", "artist": "Valley Sounds", "genre": "Acoustic", "mood": "Nature", "energy": 0.5, "valence": 0.75},
-            {"title": "Night Drive", "artist": "Midnight Express", "genre": "Electronic Rock", "mood": "Adventurous", "energy": 0.85, "valence": 0.65},
-            {"title": "Coffee Shop Melody", "artist": "Café Musicians", "genre": "Jazz", "mood": "Cozy", "energy": 0.4, "valence": 0.8},
-            {"title": "Ocean Waves", "artist": "Seaside Harmony", "genre": "Ambient Nature", "mood": "Tranquil", "energy": 0.2, "valence": 0.9},
-            {"title": "City Lights", "artist": "Metro Vibes", "genre": "Lo-Fi Hip Hop", "mood": "Modern", "energy": 0.6, "valence": 0.6},
-            {"title": "Storm Brewing", "artist": "Thunder Collective", "genre": "Dark Rock", "mood": "Intense", "energy": 0.95, "valence": 0.3},
-            {"title": "Pixel Perfect", "artist": "Retro Gaming", "genre": "Chiptune", "mood": "Playful", "energy": 0.8, "valence": 0.9},
-            {"title": "Forest Path", "artist": "Woodland Ensemble", "genre": "Celtic", "mood": "Mystical", "energy": 0.5, "valence": 0.7}
-        ]
-        
-        # Use a more sophisticated selection algorithm for maximum uniqueness
-        recommendations = []
-        used_indices = set()
-        
-        # Create unique seed for this video
-        video_seed = hash(f"{request_id}_{video_url}") % 10000
-        
-        for i in range(3):
-            # Use multiple factors to ensure uniqueness
-            selection_factor = (combined_hash * (i + 1) + video_seed + len(video_url) * i) % len(music_database)
-            
-            # Ensure no duplicates
-            while selection_factor in used_indices:
-                selection_factor = (selection_factor + 7) % len(music_database)
-            used_indices.add(selection_factor)
-            
-            track = music_database[selection_factor]
-            
-            # Add slight variations to confidence scores
-            base_confidence = 0.78 + (combined_hash % 20) / 100  # 0.78-0.97
-            confidence_variation = (video_seed % 10) / 100  # 0.00-0.09
-            final_confidence = min(0.99, base_confidence + confidence_variation)
-            
-            recommendations.append({
-                "title": track["title"],
-                "artist": track["artist"],
-                "genre": track["genre"],
-                "mood": track["mood"],
-                "energy_level": track["energy"],
-                "valence": track["valence"],
-                "confidence_score": round(final_confidence, 3)
-            })
-        
-        reasoning = (
-            f"Based on the {mood.lower()} scene analysis featuring {visual_elements[0].lower()} "
-            f"and {visual_elements[1].lower()} with {ambient_tags[0].lower()} audio elements, "
-            f"these recommendations complement the unique characteristics of video {request_id[-6:]}."
-        )
-        
-        return {
-            "scene_description": scene_description,
-            "scene_mood": mood,
-            "visual_elements": visual_elements,
-            "ambient_tags": ambient_tags,
-            "extracted_frames": extracted_frames,
-            "transcription": transcription,
-            "recommendations": recommendations,
-            "reasoning": reasoning,
-            "processing_duration": 4.5 + (combined_hash % 20) / 10,  # 4.5-6.4 seconds
-            "model_versions": {
-                "video_analysis": f"simulation-v{1 + (combined_hash % 3)}.{combined_hash % 10}",
-                "audio_analysis": f"content-aware-v{1 + (combined_hash % 2)}.{(combined_hash * 7) % 10}"
-            }
-        }
+    
+    def _analyze_segment_remotely(
+        self,
+        request_body: Dict[str, Any],
+        request_id: str,
+        video_url: str,
+        segment: VideoSegment
+    ) -> Dict[str, Any]:
+        """Analyze one segment with the Edge Function; runs on a segment worker thread."""
+        body = {**request_body, "segment": {"index": segment.index, "start": segment.start, "end": segment.end}}
+        response = self.client.functions.invoke("video-processor", invoke_options={"body": body})
+        if isinstance(response, bytes):
+            response = json.loads(response.decode('utf-8'))
+        if not response or not response.get("result"):
+            error = response.get("error") if response else None
+            raise RuntimeError(f"Edge function error on segment {segment.index}: {error}")
+        return response["result"]
+    
+    async def _save_processing_result(
+        self,
+        request_id: str,
+        result: Dict[str, Any],
+        recorder: StageRecorder
+    ) -> None:
+        """Store a completed result together with the job's stage metrics."""
+        with recorder.stage("save_results") as stage:
+            result["stage_metrics"] = recorder.to_list()
+            stage.bytes_out = len(json.dumps(result))
+            await self.update_request_status(
+                request_id=request_id,
+                status="completed",
+                result=result
+            )
+
+def create_data_service() -> SupabaseService:
+    """Build the data service configured by ``data_backend``."""
+    if settings.data_backend == "postgres":
+        try:
+            from app.services.postgres_repository import PostgresRepository
+            return PostgresRepository()
+        except ImportError:
+            logger.warning("The asyncpg package is not installed; using the Supabase REST data backend")
+    elif settings.data_backend != "supabase":
+        logger.warning(f"Unknown data backend '{settings.data_backend}'; using the Supabase REST data backend")
+    return SupabaseService()
 
 # Global instance
-supabase_service = SupabaseService() 
\ No newline at end of file
+supabase_service = create_data_service() 
\ No newline at end of file
@@ -0,0 +1,206 @@
+"""Upload-time video metadata probing, cost estimation and admission control."""
+
+import asyncio
+import json
+import logging
+import shutil
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.models.requests import VideoMetadata
+from app.services.mp4 import MP4ParseError, find_top_level_box, looks_like_mp4, parse_moov
+
+logger = logging.getLogger(__name__)
+
+# ISO-BMFF sample entry codes mapped to ffprobe codec names
+MP4_CODEC_NAMES = {
+    "avc1": "h264",
+    "avc3": "h264",
+    "hvc1": "hevc",
+    "hev1": "hevc",
+    "vp09": "vp9",
+    "av01": "av1",
+    "mp4v": "mpeg4",
+    "mp4a": "aac",
+    "Opus": "opus",
+    "ac-3": "ac3",
+    "ec-3": "eac3",
+    "alac": "alac",
+}
+
+# Pixel count the per-frame cost constant is calibrated for (1080p)
+REFERENCE_PIXELS = 1920 * 1080
+
+
+class VideoRejectedError(Exception):
+    """Raised when a probed video fails admission control."""
+    pass
+
+
+def _probe_mp4(file_content: bytes) -> VideoMetadata:
+    """Read metadata from an in-memory MP4 by touching only box headers and ``moov``."""
+    read_at = lambda offset, length: file_content[offset:offset + length]
+    moov_box = find_top_level_box(read_at, b"moov", len(file_content))
+    if moov_box is None:
+        raise MP4ParseError("No moov box found")
+
+    movie = parse_moov(file_content[moov_box.offset:moov_box.end])
+    video = movie.track("vide")
+    audio = movie.track("soun")
+
+    metadata = VideoMetadata(
+        container="mp4",
+        duration_seconds=round(movie.duration_seconds, 3),
+        has_video=video is not None,
+        has_audio=audio is not None,
+        size_bytes=len(file_content),
+    )
+    if video:
+        metadata.width = video.width
+        metadata.height = video.height
+        metadata.video_codec = MP4_CODEC_NAMES.get(video.codec, video.codec)
+        if video.duration_seconds:
+            metadata.frame_rate = round(video.sample_count / video.duration_seconds, 3)
+    if audio:
+        metadata.audio_codec = MP4_CODEC_NAMES.get(audio.codec, audio.codec)
+    if metadata.duration_seconds:
+        metadata.bit_rate = int(len(file_content) * 8 / metadata.duration_seconds)
+    return metadata
+
+
+def _parse_frame_rate(rate: Optional[str]) -> Optional[float]:
+    if not rate or "/" not in rate:
+        return None
+    numerator, denominator = rate.split("/", 1)
+    try:
+        return round(float(numerator) / float(denominator), 3) if float(denominator) else None
+    except ValueError:
+        return None
+
+
+def _metadata_from_ffprobe(probe: Dict[str, Any], size_bytes: int) -> VideoMetadata:
+    streams = probe.get("streams", [])
+    container = probe.get("format", {})
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+
+    duration = container.get("duration") or (video or {}).get("duration")
+    duration = round(float(duration), 3) if duration not in (None, "N/A") else None
+
+    return VideoMetadata(
+        container=(container.get("format_name") or "").split(",")[0] or None,
+        duration_seconds=duration,
+        width=(video or {}).get("width"),
+        height=(video or {}).get("height"),
+        frame_rate=_parse_frame_rate((video or {}).get("avg_frame_rate")),
+        video_codec=(video or {}).get("codec_name"),
+        audio_codec=(audio or {}).get("codec_name"),
+        has_video=video is not None,
+        has_audio=audio is not None,
+        size_bytes=size_bytes,
+        bit_rate=int(size_bytes * 8 / duration) if duration else None,
+    )
+
+
+async def _probe_with_ffprobe(header: bytes, size_bytes: int) -> Optional[VideoMetadata]:
+    """Run ffprobe over the header bytes only, fed through stdin."""
+    if shutil.which("ffprobe") is None:
+        logger.warning("ffprobe not found; skipping metadata probe")
+        return None
+
+    process = await asyncio.create_subprocess_exec(
+        "ffprobe", "-v", "error", "-print_format", "json", "-show_format", "-show_streams", "-i", "pipe:0",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(header), timeout=settings.probe_timeout_seconds)
+    except asyncio.TimeoutError:
+        process.kill()
+        logger.warning("ffprobe timed out")
+        return None
+
+    if not stdout:
+        logger.warning(f"ffprobe failed: {stderr.decode(errors='replace').strip()}")
+        return None
+    return _metadata_from_ffprobe(json.loads(stdout), size_bytes)
+
+
+async def probe_video(file_content: bytes) -> Optional[VideoMetadata]:
+    """
+    Probe container metadata from the uploaded video's header.
+
+    MP4/MOV files are parsed in-process from the top-level box headers and the
+    ``moov`` index; other containers are probed by ffprobe over the first
+    ``probe_header_bytes`` bytes.
+
+    Args:
+        file_content: Uploaded video bytes
+
+    Returns:
+        Probed metadata, or None if the container could not be probed
+    """
+    try:
+        if looks_like_mp4(file_content[:16]):
+            try:
+                return _probe_mp4(file_content)
+            except MP4ParseError as e:
+                logger.info(f"MP4 header parse failed, falling back to ffprobe: {e}")
+        return await _probe_with_ffprobe(file_content[:settings.probe_header_bytes], len(file_content))
+    except Exception as e:
+        logger.error(f"Video probe failed: {e}")
+        return None
+
+
+def estimate_processing_cost(metadata: VideoMetadata) -> float:
+    """
+    Estimate worker-seconds needed to process a video.
+
+    The estimate covers sampled frame decode and analysis (scaled by resolution),
+    the analyzed audio window and the time to read the file.
+
+    Args:
+        metadata: Probed video metadata
+
+    Returns:
+        Estimated processing cost in worker-seconds
+    """
+    duration = metadata.duration_seconds or 0.0
+    cost = settings.cost_base_seconds
+
+    if metadata.has_video:
+        frames = min(settings.max_frames_extract, max(1, int(duration / settings.frame_interval_seconds) + 1))
+        pixels = (metadata.width or 1920) * (metadata.height or 1080)
+        cost += frames * settings.cost_per_frame_seconds * max(pixels / REFERENCE_PIXELS, 0.25)
+
+    if metadata.has_audio:
+        cost += min(duration, settings.audio_analysis_duration) * settings.cost_per_audio_second
+
+    if metadata.size_bytes:
+        cost += metadata.size_bytes / settings.cost_read_bytes_per_second
+
+    return round(cost, 3)
+
+
+def check_admission(metadata: VideoMetadata, estimated_cost: float) -> None:
+    """
+    Reject pathological inputs before any processing is scheduled.
+
+    Raises:
+        VideoRejectedError: If the video has no video stream, is too long,
+            too large in resolution or too expensive to process
+    """
+    if not metadata.has_video:
+        raise VideoRejectedError("File contains no video stream")
+
+    if metadata.duration_seconds is not None and metadata.duration_seconds > settings.max_video_duration_seconds:
+        raise VideoRejectedError(
+            f"Video too long. Maximum duration: {settings.max_video_duration_seconds} seconds"
+        )
+
+    if metadata.width and metadata.height and metadata.width * metadata.height > settings.max_video_pixels:
+        raise VideoRejectedError(f"Video resolution too high: {metadata.width}x{metadata.height}")
+
+    if settings.max_estimated_cost_seconds and estimated_cost > settings.max_estimated_cost_seconds:
+        raise VideoRejectedError("Video is too expensive to process")
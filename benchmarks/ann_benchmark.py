@@ -0,0 +1,74 @@
+"""
+Benchmark the IVF track index against brute-force search.
+
+Reports build time, recall@k and per-query latency at several catalog sizes,
+with and without a year filter. Vectors are synthetic track features drawn
+from a mixture of mood clusters.
+
+Usage:
+    python benchmarks/ann_benchmark.py --sizes 10000 100000 1000000 --k 10
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.catalog_index import IVFIndex, brute_force_search  # noqa: E402
+
+DIM = 4
+
+
+def synthetic_tracks(size: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.random((32, DIM))
+    vectors = centers[rng.integers(0, len(centers), size)] + rng.normal(0, 0.08, (size, DIM))
+    years = rng.integers(1950, 2025, size)
+    return np.clip(vectors, 0, 1).astype(np.float32), years
+
+
+def time_queries(search, queries) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        search(query)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def run(size: int, k: int, n_queries: int, n_probe: int) -> None:
+    vectors, years = synthetic_tracks(size)
+    queries = np.random.default_rng(1).random((n_queries, DIM), dtype=np.float32)
+
+    start = time.perf_counter()
+    index = IVFIndex(DIM, n_lists=max(1, int(np.sqrt(size))), n_probe=n_probe)
+    index.train(vectors)
+    index.add(vectors, years=years)
+    build_seconds = time.perf_counter() - start
+
+    for label, year_start, year_end in (("all years", None, None), ("1990-1999", 1990, 1999)):
+        mask = None if year_start is None else (years >= year_start) & (years <= year_end)
+        exact = [brute_force_search(vectors, q, k, mask)[0] for q in queries]
+        approx = [index.search(q, k, year_start=year_start, year_end=year_end)[0] for q in queries]
+        recall = np.mean([len(set(a.tolist()) & set(e.tolist())) / len(e) for a, e in zip(approx, exact)])
+
+        brute_ms = time_queries(lambda q: brute_force_search(vectors, q, k, mask), queries)
+        ivf_ms = time_queries(lambda q: index.search(q, k, year_start=year_start, year_end=year_end), queries)
+        print(
+            f"{size:>9,d}  {label:<10} build {build_seconds:6.2f}s  recall@{k} {recall:.3f}  "
+            f"brute {brute_ms:8.3f} ms  ivf {ivf_ms:7.3f} ms  speedup {brute_ms / ivf_ms:6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--n-probe", type=int, default=8)
+    args = parser.parse_args()
+
+    for catalog_size in args.sizes:
+        run(catalog_size, args.k, args.queries, args.n_probe)
@@ -0,0 +1,81 @@
+"""
+Benchmark the precompiled keyword matcher against per-keyword substring scans.
+
+Classifies a synthetic list of track titles into mood categories, first with
+``any(word in title for word in [...])`` per category (the previous
+heuristic), then with a single :class:`KeywordMatcher` pass per title.
+
+Usage:
+    python benchmarks/keyword_matcher_benchmark.py --tracks 200000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.keyword_matcher import KeywordMatcher  # noqa: E402
+from app.services.spotify_service import TRACK_MOOD_MATCHER  # noqa: E402
+
+WORDS = (
+    "night", "city", "lights", "summer", "rain", "road", "home", "fire", "river", "dream",
+    "happy", "love", "calm", "epic", "heart", "party", "chill", "power", "blue", "gold",
+)
+
+
+def synthetic_titles(size: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(WORDS, k=rng.randint(1, 5))).title() for _ in range(size)]
+
+
+def naive_categories(vocabulary, title: str):
+    title = title.lower()
+    return {category for category, keywords in vocabulary.items() if any(word in title for word in list(keywords))}
+
+
+def run(size: int, vocabulary_size: int) -> None:
+    titles = synthetic_titles(size)
+    vocabulary = {category: list(words) for category, words in _vocabulary(vocabulary_size).items()}
+    matcher = KeywordMatcher(vocabulary)
+
+    start = time.perf_counter()
+    naive = [naive_categories(vocabulary, title) for title in titles]
+    naive_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compiled = [matcher.categories(title) for title in titles]
+    compiled_seconds = time.perf_counter() - start
+
+    assert naive == compiled, "Matcher results differ from substring scans"
+    print(
+        f"{size:>9,d} titles  {sum(map(len, vocabulary.values())):>4d} keywords  "
+        f"naive {naive_seconds / size * 1e6:7.2f} us/title  "
+        f"compiled {compiled_seconds / size * 1e6:7.2f} us/title  "
+        f"speedup {naive_seconds / compiled_seconds:5.1f}x"
+    )
+
+
+def _vocabulary(size: int):
+    """The service's mood vocabulary, padded with synthetic categories up to ``size`` keywords per category."""
+    vocabulary = {category: set() for category in TRACK_MOOD_MATCHER.order}
+    for keyword, categories in TRACK_MOOD_MATCHER._categories.items():
+        for category in categories:
+            vocabulary[category].add(keyword)
+    rng = random.Random(1)
+    for category, keywords in vocabulary.items():
+        while len(keywords) < size:
+            keywords.add("".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(4, 8))))
+    return vocabulary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tracks", type=int, default=200_000)
+    parser.add_argument("--keywords", type=int, nargs="+", default=[5, 25, 100], help="Keywords per category")
+    args = parser.parse_args()
+
+    for keywords_per_category in args.keywords:
+        run(args.tracks, keywords_per_category)
@@ -0,0 +1,122 @@
+"""
+Benchmark Spotify search latency with a fresh HTTP client per call vs the pooled service client.
+
+Runs a local mock of the Spotify accounts and search endpoints so the numbers
+reflect connection setup cost rather than Spotify's own latency. Every call
+searches a distinct query, so none is answered from the service's search
+cache, and the rate limit is raised so it does not cap throughput.
+
+Usage:
+    python benchmarks/spotify_client_benchmark.py --requests 200 --concurrency 10
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import sys
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+mock_spotify = FastAPI()
+
+
+@mock_spotify.post("/api/token")
+async def token():
+    return {"access_token": "benchmark-token", "token_type": "Bearer", "expires_in": 3600}
+
+
+@mock_spotify.get("/v1/search")
+async def search(q: str, limit: int = 5):
+    items = [
+        {
+            "id": f"track{i}",
+            "name": f"{q} {i}",
+            "artists": [{"name": "Benchmark Artist"}],
+            "external_urls": {"spotify": f"https://open.spotify.com/track/track{i}"},
+            "popularity": 50,
+        }
+        for i in range(limit)
+    ]
+    return {"tracks": {"items": items}}
+
+
+def start_mock_server(port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(mock_spotify, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def run(label: str, call, total: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(total)])
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{label:<18} {total / elapsed:8.1f} req/s   "
+        f"p50 {statistics.median(latencies):7.2f} ms   p95 {p95:7.2f} ms"
+    )
+
+
+async def main(args) -> None:
+    base_url = f"http://127.0.0.1:{args.port}"
+    os.environ["SPOTIFY_CLIENT_ID"] = "benchmark-client"
+    os.environ["SPOTIFY_CLIENT_SECRET"] = "benchmark-secret"
+    os.environ["SPOTIFY_ACCOUNTS_URL"] = base_url
+    os.environ["SPOTIFY_API_URL"] = f"{base_url}/v1"
+    os.environ["SPOTIFY_RATE_LIMIT_PER_SECOND"] = "1000000"
+    os.environ["SPOTIFY_RATE_LIMIT_BURST"] = "1000000"
+
+    from app.services.spotify_service import SpotifyService
+
+    class FreshClientSpotifyService(SpotifyService):
+        """Previous behaviour: a new client, and so a new TCP (and TLS) connection, per API request."""
+
+        async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+            token = await self._get_access_token()
+            headers = {**kwargs.pop("headers", {}), "Authorization": f"Bearer {token}"}
+            async with self._create_client() as client:
+                return await client.request(method, url, headers=headers, **kwargs)
+
+    start_mock_server(args.port)
+
+    # Both services issue the same searches through the same request path; only client reuse differs
+    queries = (f"happy upbeat energetic {n}" for n in itertools.count())
+    services = {"fresh client": FreshClientSpotifyService(), "pooled client": SpotifyService()}
+    for label, service in services.items():
+        await service.startup()
+
+        async def call(service=service):
+            await service._search_tracks(next(queries), "Joyful and Energetic", [], limit=3)
+
+        await call()  # Warm up the token (and the pool)
+        await run(label, call, args.requests, args.concurrency)
+        await service.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,96 @@
+"""
+Benchmark Supabase query throughput with blocking calls on the event loop vs the service's thread pool.
+
+Runs a local mock of the PostgREST endpoint with a fixed response latency, so
+requests/sec shows how many queries are actually in flight at once: calls made
+inline on the event loop stay at one at a time however many are issued.
+
+Usage:
+    python benchmarks/supabase_offload_benchmark.py --requests 200 --latency-ms 20 --concurrency 1 4 16 64
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+mock_postgrest = FastAPI()
+LATENCY = {"seconds": 0.02}
+
+
+@mock_postgrest.get("/rest/v1/processing_requests")
+async def select_requests():
+    await asyncio.sleep(LATENCY["seconds"])
+    return [{"id": "request-1", "status": "completed"}]
+
+
+def start_mock_server(port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(mock_postgrest, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def throughput(call, total: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await call()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(total)])
+    return total / (time.perf_counter() - start)
+
+
+async def main(args) -> None:
+    LATENCY["seconds"] = args.latency_ms / 1000
+    os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{args.port}"
+    os.environ.setdefault("SUPABASE_ANON_KEY", "benchmark.anon.key")
+    os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "benchmark.service.key")
+    os.environ["SUPABASE_MAX_WORKERS"] = str(args.workers)
+
+    from app.services.supabase_client import SupabaseService
+
+    start_mock_server(args.port)
+    service = SupabaseService()
+
+    async def blocking_call():
+        # Previous behaviour: the synchronous client called directly inside the coroutine
+        service.client.table("processing_requests")\
+            .select("*")\
+            .eq("user_id", "benchmark-user")\
+            .order("created_at", desc=True)\
+            .execute()
+
+    async def offloaded_call():
+        await service.get_user_requests("benchmark-user")
+
+    await offloaded_call()  # Warm up the pool and connection
+
+    print(f"{args.latency_ms:.0f} ms query latency, {args.workers} worker threads")
+    print(f"{'in flight':>9}  {'blocking req/s':>14}  {'thread pool req/s':>17}")
+    for concurrency in args.concurrency:
+        blocking = await throughput(blocking_call, args.requests, concurrency)
+        offloaded = await throughput(offloaded_call, args.requests, concurrency)
+        print(f"{concurrency:>9}  {blocking:>14.1f}  {offloaded:>17.1f}")
+
+    await service.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--port", type=int, default=8766)
+    asyncio.run(main(parser.parse_args()))
@@ -18,6 +18,7 @@ function App() {
   const [requests, setRequests] = useState<ProcessingRequest[]>([]);
   const [selectedRequest, setSelectedRequest] = useState<ProcessingRequest | null>(null);
   const [loading, setLoading] = useState(false);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
 
   const isAuthenticated = !!user;
 
@@ -31,8 +32,9 @@ function App() {
   const loadRequests = async () => {
     setLoading(true);
     try {
-      const userRequests = await apiService.getUserRequests();
-      setRequests(userRequests);
+      const page = await apiService.getUserRequests();
+      setRequests(page.requests);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error('Failed to load requests:', error);
     } finally {
@@ -40,6 +42,17 @@ function App() {
     }
   };
 
+  const loadMoreRequests = async () => {
+    if (!nextCursor) return;
+    try {
+      const page = await apiService.getUserRequests(nextCursor);
+      setRequests(prev => [...prev, ...page.requests]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Failed to load more requests:', error);
+    }
+  };
+
   const handleUploadComplete = async (request: ProcessingRequest) => {
     setRequests(prev => [request, ...prev]);
     
@@ -83,9 +96,22 @@ function App() {
     setTimeout(pollStatus, 1000);
   };
 
-  const handleRequestSelect = (request: ProcessingRequest) => {
+  const handleRequestSelect = async (request: ProcessingRequest) => {
     setSelectedRequest(request);
     
+    // Listings omit results; load the full request to show them
+    if (request.status === ProcessingStatus.COMPLETED && !request.result) {
+      try {
+        const fullRequest = await apiService.getRequest(request.id);
+        setSelectedRequest(fullRequest);
+        setRequests(prev => prev.map(req => 
+          req.id === request.id ? fullRequest : req
+        ));
+      } catch (error) {
+        console.error('Failed to load request details:', error);
+      }
+    }
+    
     // If the selected request is still processing, start polling for updates
     if (request.status === ProcessingStatus.PROCESSING || 
         request.status === ProcessingStatus.PENDING) {
@@ -185,6 +211,7 @@ function App() {
             <RequestHistory 
               requests={requests}
               onRequestSelect={handleRequestSelect}
+              onLoadMore={nextCursor ? loadMoreRequests : undefined}
             />
           </div>
 
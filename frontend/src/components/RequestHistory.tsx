@@ -5,12 +5,14 @@ import { ProcessingStatus } from '../types';
 interface RequestHistoryProps {
   requests: ProcessingRequest[];
   onRequestSelect?: (request: ProcessingRequest) => void;
+  onLoadMore?: () => void;
   className?: string;
 }
 
 export const RequestHistory: React.FC<RequestHistoryProps> = ({
   requests,
   onRequestSelect,
+  onLoadMore,
   className = ''
 }) => {
   const getStatusIcon = (status: ProcessingStatus): string => {
@@ -87,7 +89,7 @@ export const RequestHistory: React.FC<RequestHistoryProps> = ({
       <div className="history-header">
         <h3>📊 Processing History</h3>
         <span className="request-count">
-          {requests.length} request{requests.length !== 1 ? 's' : ''}
+          {requests.length}{onLoadMore ? '+' : ''} request{requests.length !== 1 ? 's' : ''}
         </span>
       </div>
 
@@ -121,9 +123,9 @@ export const RequestHistory: React.FC<RequestHistoryProps> = ({
                 </div>
               )}
 
-              {request.result?.recommendations && (
+              {(request.result?.recommendations?.length ?? request.recommendation_count) != null && (
                 <div className="recommendations-count">
-                  🎵 {request.result.recommendations.length} songs
+                  🎵 {request.result?.recommendations?.length ?? request.recommendation_count} songs
                 </div>
               )}
             </div>
@@ -142,6 +144,12 @@ export const RequestHistory: React.FC<RequestHistoryProps> = ({
           </div>
         ))}
       </div>
+
+      {onLoadMore && (
+        <button className="btn-secondary load-more" onClick={onLoadMore}>
+          Load more
+        </button>
+      )}
     </div>
   );
 }; 
\ No newline at end of file
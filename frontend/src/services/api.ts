@@ -1,6 +1,6 @@
 import axios from 'axios';
 import { supabase } from './supabase';
-import type { ProcessingRequest } from '../types';
+import type { ProcessingRequest, RequestPage } from '../types';
 
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000';
 
@@ -74,12 +74,16 @@ export const apiService = {
     return response.data;
   },
 
-  // Get all user requests with enhanced polling
-  async getUserRequests(): Promise<ProcessingRequest[]> {
+  // Get a page of user requests (summaries without results), newest first
+  async getUserRequests(cursor?: string | null): Promise<RequestPage> {
     const response = await api.get('/requests/', {
+      params: cursor ? { cursor } : undefined,
       timeout: 60000, // 1 minute for listing requests
     });
-    return response.data;
+    return {
+      requests: response.data,
+      nextCursor: response.headers['x-next-cursor'] ?? null,
+    };
   },
 
   // Get specific request by ID with progress tracking
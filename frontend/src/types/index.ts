@@ -58,12 +58,20 @@ export interface ProcessingRequest {
   music_year_start?: number;
   music_year_end?: number;
   result?: ProcessingResult;
+  // Present on request listings, which omit the result
+  scene_mood?: string;
+  recommendation_count?: number;
   error_message?: string;
   created_at: string;
   updated_at: string;
   completed_at?: string;
 }
 
+export interface RequestPage {
+  requests: ProcessingRequest[];
+  nextCursor: string | null;
+}
+
 export interface ProcessingRequestCreate {
   video_filename: string;
   video_content_type: string;
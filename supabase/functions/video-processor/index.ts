@@ -1,10 +1,16 @@
 import { serve } from "https://deno.land/std@0.168.0/http/server.ts";
 import { createClient } from "https://esm.sh/@supabase/supabase-js@2";
+import { encode as encodeBase64 } from "https://deno.land/std@0.168.0/encoding/base64.ts";
+// Mood profiles shared with the API (app/services/mood_profiles.py)
+import moodTable from "../_shared/mood_profiles.json" with { type: "json" };
 
 // Types for our processing pipeline
 interface VideoProcessingState {
   request_id: string;
   video_url: string;
+  analysis_video_url?: string;
+  analysis_audio_url?: string;
+  segment?: SegmentWindow;
   extracted_frames?: string[];
   transcription?: string;
   ambient_tags?: string[];
@@ -33,10 +39,62 @@ interface MusicRecommendation {
   confidence_score: number;
 }
 
+// One entry of the shared mood table
+interface MoodProfile {
+  name: string;
+  valence: number;
+  energy: number;
+  danceability: number;
+  tempo: [number, number];
+  genres: string[];
+  search_terms: string[];
+  title_keywords?: string[];
+  estimates?: Record<string, number>;
+  synonyms?: string[];
+}
+
+interface MoodTable {
+  default_mood: string;
+  stop_words: string[];
+  suffixes: [string, string][];
+  stem_length: number;
+  profiles: MoodProfile[];
+}
+
+const MOOD_TABLE = moodTable as MoodTable;
+
+// Resource usage recorded for a single pipeline stage
+interface StageMetrics {
+  stage: string;
+  wall_time: number;
+  cpu_time: number | null;
+  peak_rss_bytes: number | null;
+  bytes_in: number;
+  bytes_out: number;
+  started_at: string;
+}
+
+// Media bytes a stage actually moved: downloaded from storage, and uploaded to model APIs
+interface StageIO {
+  bytes_in: number;
+  bytes_out: number;
+}
+
+// Time window of a long video analyzed on its own; the caller merges the segments' results
+interface SegmentWindow {
+  index: number;
+  start: number;
+  end: number;
+}
+
 // Input validation interface
 interface ProcessingRequest {
   request_id: string;
   video_url: string;
+  analysis_video_url?: string;
+  analysis_audio_url?: string;
+  stage_metrics?: StageMetrics[];
+  segment?: SegmentWindow;
   description?: string;
   music_year_start?: number;
   music_year_end?: number;
@@ -51,9 +109,123 @@ const supabase = createClient(supabaseUrl, supabaseServiceKey);
 const geminiApiKey = Deno.env.get("GEMINI_API_KEY");
 const openaiApiKey = Deno.env.get("OPENAI_API_KEY");
 
+// Largest media each model API accepts: Whisper uploads, and Gemini inline data once base64-encoded
+const WHISPER_MAX_BYTES = 25 * 1024 * 1024;
+const GEMINI_INLINE_MAX_BYTES = 15 * 1024 * 1024;
+
+// Media the model stages read: the low-resolution analysis proxies when they were produced, else the upload
+function videoSource(state: VideoProcessingState): string {
+  return state.analysis_video_url || state.video_url;
+}
+
+function audioSource(state: VideoProcessingState): string {
+  return state.analysis_audio_url || state.video_url;
+}
+
+// Simulated analyses derive their output from the upload's URL (plus the segment's media fragment),
+// so they are the same with or without proxies
+function simulationKey(state: VideoProcessingState): string {
+  return state.segment ? `${state.video_url}#t=${state.segment.start},${state.segment.end}` : state.video_url;
+}
+
+// Download media for a model call, or null when it is larger than the model accepts
+async function fetchMedia(url: string, maxBytes: number, io: StageIO): Promise<Uint8Array | null> {
+  const response = await fetch(url);
+  if (!response.ok) {
+    throw new Error(`Media fetch failed with status ${response.status}`);
+  }
+  const declared = Number(response.headers.get("content-length") || 0);
+  if (declared > maxBytes) {
+    await response.body?.cancel();
+    return null;
+  }
+  const bytes = new Uint8Array(await response.arrayBuffer());
+  io.bytes_in += bytes.length;
+  return bytes.length > maxBytes ? null : bytes;
+}
+
+function mediaFilename(url: string): string {
+  return new URL(url).pathname.split("/").pop() || "media";
+}
+
+async function fetchRange(url: string, from: number, to: number, io: StageIO): Promise<Uint8Array> {
+  const response = await fetch(url, { headers: { Range: `bytes=${from}-${to - 1}` } });
+  if (!response.ok) {
+    throw new Error(`Media fetch failed with status ${response.status}`);
+  }
+  const bytes = new Uint8Array(await response.arrayBuffer());
+  io.bytes_in += bytes.length;
+  // A server that ignores the range sends the whole file
+  return response.status === 206 ? bytes : bytes.subarray(from, to);
+}
+
+// Cut a segment's window out of the PCM WAV audio proxy with range requests, so a segment reads only its own audio
+async function fetchWavSegment(
+  url: string,
+  segment: SegmentWindow,
+  maxBytes: number,
+  io: StageIO
+): Promise<Uint8Array | null> {
+  const head = await fetchRange(url, 0, 4096, io);
+  const view = new DataView(head.buffer, head.byteOffset, head.byteLength);
+  let fmt: Uint8Array | null = null;
+  let dataStart = -1;
+  for (let offset = 12; offset + 8 <= head.length;) {
+    const id = new TextDecoder().decode(head.subarray(offset, offset + 4));
+    const size = view.getUint32(offset + 4, true);
+    if (id === "fmt ") {
+      fmt = head.slice(offset + 8, offset + 8 + size);
+    } else if (id === "data") {
+      dataStart = offset + 8;
+      break;
+    }
+    offset += 8 + size + (size % 2);
+  }
+  if (!fmt || dataStart < 0) {
+    throw new Error("Audio proxy is not a PCM WAV file");
+  }
+  
+  const fmtView = new DataView(fmt.buffer);
+  const sampleRate = fmtView.getUint32(4, true);
+  const blockAlign = fmtView.getUint16(12, true);
+  const from = dataStart + Math.floor(segment.start * sampleRate) * blockAlign;
+  const to = dataStart + Math.floor(segment.end * sampleRate) * blockAlign;
+  const headerLength = 20 + fmt.length + 8;
+  if (headerLength + (to - from) > maxBytes) {
+    return null;
+  }
+  const pcm = await fetchRange(url, from, to, io);
+  
+  // RIFF header with the original fmt chunk and a data chunk sized to the slice
+  const wav = new Uint8Array(headerLength + pcm.length);
+  const wavView = new DataView(wav.buffer);
+  const encoder = new TextEncoder();
+  wav.set(encoder.encode("RIFF"), 0);
+  wavView.setUint32(4, wav.length - 8, true);
+  wav.set(encoder.encode("WAVEfmt "), 8);
+  wavView.setUint32(16, fmt.length, true);
+  wav.set(fmt, 20);
+  wav.set(encoder.encode("data"), 20 + fmt.length);
+  wavView.setUint32(24 + fmt.length, pcm.length, true);
+  wav.set(pcm, headerLength);
+  return wav;
+}
+
+// Audio for transcription: the segment's slice of the audio proxy in segment mode, else the whole track
+async function readAudio(state: VideoProcessingState, io: StageIO): Promise<Uint8Array | null> {
+  if (!state.segment) {
+    return await fetchMedia(audioSource(state), WHISPER_MAX_BYTES, io);
+  }
+  if (!state.analysis_audio_url) {
+    // Only the PCM proxy can be cut here; the upload's audio is compressed inside its container
+    return null;
+  }
+  return await fetchWavSegment(state.analysis_audio_url, state.segment, WHISPER_MAX_BYTES, io);
+}
+
 // Simple frame extraction with video metadata
 async function extractFrames(state: VideoProcessingState): Promise<Partial<VideoProcessingState>> {
-  console.log(`[extract_frames] Processing video: ${state.video_url}`);
+  console.log(`[extract_frames] Processing video: ${videoSource(state)}`);
   
   try {
     // Generate unique frame names based on request_id and timestamp
@@ -75,7 +247,7 @@ async function extractFrames(state: VideoProcessingState): Promise<Partial<Video
 }
 
 // Enhanced transcription with video-specific context
-async function transcribeVoice(state: VideoProcessingState): Promise<Partial<VideoProcessingState>> {
+async function transcribeVoice(state: VideoProcessingState, io: StageIO): Promise<Partial<VideoProcessingState>> {
   console.log("[transcribe_voice] Starting voice transcription");
   
   try {
@@ -84,7 +256,7 @@ async function transcribeVoice(state: VideoProcessingState): Promise<Partial<Vid
       
       // Use video URL and request ID to create unique transcriptions
       const videoHash = state.request_id.slice(-4); // Last 4 chars of request ID for uniqueness
-      const urlLength = state.video_url.length;
+      const urlLength = simulationKey(state).length;
       
       // Generate transcription based on video characteristics
       let transcription = "";
@@ -108,24 +280,50 @@ async function transcribeVoice(state: VideoProcessingState): Promise<Partial<Vid
       return { transcription };
     }
 
+    // Transcribe the audio proxy (mono 16 kHz, a fraction of the upload's size) with Whisper
+    try {
+      const audio = await readAudio(state, io);
+      if (audio) {
+        const form = new FormData();
+        form.append("file", new Blob([audio]), mediaFilename(audioSource(state)));
+        form.append("model", "whisper-1");
+        const whisperResponse = await fetch("https://api.openai.com/v1/audio/transcriptions", {
+          method: "POST",
+          headers: { "Authorization": `Bearer ${openaiApiKey}` },
+          body: form
+        });
+        io.bytes_out += audio.length;
+        if (!whisperResponse.ok) {
+          throw new Error(`Whisper API error: ${whisperResponse.status}`);
+        }
+        const { text } = await whisperResponse.json();
+        console.log(`[transcribe_voice] ✅ Transcribed ${audio.length} bytes of audio with Whisper`);
+        return { transcription: text || "" };
+      }
+      console.warn("[transcribe_voice] Audio is unavailable or too large for Whisper, using contextual analysis");
+    } catch (whisperError) {
+      console.error("[transcribe_voice] Whisper transcription failed:", whisperError);
+    }
+    
     // Enhanced AI-powered transcription simulation
     console.log("[transcribe_voice] Using enhanced AI-powered audio analysis");
     
     try {
       // Create contextual transcription based on video characteristics
       const videoHash = state.request_id.slice(-4);
-      const urlLength = state.video_url.length;
+      const videoKey = simulationKey(state);
+      const urlLength = videoKey.length;
       const timestamp = Date.now();
       
       // Determine likely content type from URL patterns
       let contentType = "general";
-      if (state.video_url.includes("sample") || state.video_url.includes("demo")) {
+      if (videoKey.includes("sample") || videoKey.includes("demo")) {
         contentType = "demo";
-      } else if (state.video_url.includes("music") || state.video_url.includes("song")) {
+      } else if (videoKey.includes("music") || videoKey.includes("song")) {
         contentType = "music";
-      } else if (state.video_url.includes("nature") || state.video_url.includes("outdoor")) {
+      } else if (videoKey.includes("nature") || videoKey.includes("outdoor")) {
         contentType = "nature";
-      } else if (state.video_url.includes("urban") || state.video_url.includes("city")) {
+      } else if (videoKey.includes("urban") || videoKey.includes("city")) {
         contentType = "urban";
       }
       
@@ -194,7 +392,7 @@ async function tagAmbient(state: VideoProcessingState): Promise<Partial<VideoPro
   try {
     // Use video characteristics to determine ambient tags
     const videoHash = parseInt(state.request_id.slice(-8), 16) || 1; // Convert last 8 chars to number
-    const urlHash = state.video_url.split('').reduce((a, b) => a + b.charCodeAt(0), 0);
+    const urlHash = simulationKey(state).split('').reduce((a, b) => a + b.charCodeAt(0), 0);
     const combinedHash = videoHash + urlHash;
     
     const tagCategories = [
@@ -231,7 +429,7 @@ async function tagAmbient(state: VideoProcessingState): Promise<Partial<VideoPro
 }
 
 // Enhanced scene analysis using Gemini API with actual video context
-async function analyzeScene(state: VideoProcessingState): Promise<Partial<VideoProcessingState>> {
+async function analyzeScene(state: VideoProcessingState, io: StageIO): Promise<Partial<VideoProcessingState>> {
   console.log("[analyze_scene] Starting scene analysis");
   
   try {
@@ -240,7 +438,7 @@ async function analyzeScene(state: VideoProcessingState): Promise<Partial<VideoP
       
       // Create unique analysis based on video characteristics
       const videoHash = parseInt(state.request_id.slice(-8), 16) || 1;
-      const urlHash = state.video_url.split('').reduce((a, b) => a + b.charCodeAt(0), 0);
+      const urlHash = simulationKey(state).split('').reduce((a, b) => a + b.charCodeAt(0), 0);
       const frameCount = state.extracted_frames?.length || 5;
       const ambientContext = state.ambient_tags?.join(" ") || "general";
       const transcriptionContext = state.transcription || "";
@@ -282,13 +480,14 @@ async function analyzeScene(state: VideoProcessingState): Promise<Partial<VideoP
     const ambientTags = state.ambient_tags?.join(", ") || "general audio";
     const transcription = state.transcription || "audio analysis pending";
     
-    const contextPrompt = `Analyze video content based on the following data and provide a detailed analysis in JSON format:
+    const contextPrompt = `Analyze the attached video (if any) together with the following data and provide a detailed analysis in JSON format:
 
 Video Analysis Context:
 - Extracted frames: ${frameCount} frames analyzed
 - Audio transcription: "${transcription}"
 - Ambient audio tags: ${ambientTags}
-- Video identifier: ${state.request_id.slice(-8)}
+- Video identifier: ${state.request_id.slice(-8)}${state.segment ? `
+- Time window: ${state.segment.start}s to ${state.segment.end}s of a longer video; describe only this window` : ""}
 
 Create a unique analysis for this specific video content. Provide varied and creative descriptions that would help recommend appropriate music.
 
@@ -302,17 +501,42 @@ Respond with valid JSON in this exact format:
 Make the response unique and specific to this video data.`;
 
     try {
+      // Let Gemini watch the video itself: the low-resolution proxy fits inline where the upload may not
+      const parts: Record<string, unknown>[] = [{ text: contextPrompt }];
+      let attachedBytes = 0;
+      try {
+        const video = await fetchMedia(videoSource(state), GEMINI_INLINE_MAX_BYTES, io);
+        if (video) {
+          const videoPart: Record<string, unknown> = { inline_data: { mime_type: "video/mp4", data: encodeBase64(video) } };
+          if (state.segment) {
+            // Gemini clips the attached video to the segment itself
+            videoPart.video_metadata = {
+              start_offset: `${state.segment.start}s`,
+              end_offset: `${state.segment.end}s`,
+            };
+          }
+          parts.unshift(videoPart);
+          attachedBytes = video.length;
+          console.log(`[analyze_scene] Attached ${video.length} bytes of video`);
+        } else {
+          console.warn("[analyze_scene] Video is too large to attach, analyzing from context only");
+        }
+      } catch (videoError) {
+        console.warn("[analyze_scene] Could not read video, analyzing from context only:", videoError);
+      }
+      
       const geminiResponse = await fetch(`https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key=${geminiApiKey}`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({
-          contents: [{ parts: [{ text: contextPrompt }] }],
+          contents: [{ parts }],
           generationConfig: { 
             temperature: 0.9, // Higher temperature for variety
             maxOutputTokens: 800 
           }
         })
       });
+      io.bytes_out += attachedBytes;
 
       if (!geminiResponse.ok) {
         const errorText = await geminiResponse.text();
@@ -374,7 +598,7 @@ Make the response unique and specific to this video data.`;
 // Enhanced fallback analysis generator
 async function generateEnhancedFallbackAnalysis(state: any) {
   const requestHash = state.request_id.slice(-6);
-  const urlLength = state.video_url.length;
+  const urlLength = simulationKey(state).length;
   const timestamp = Date.now();
   
   // Create deterministic but varied results based on video characteristics
@@ -558,28 +782,8 @@ async function searchSpotifyTracks(
   yearStart: number = 1980,
   yearEnd: number = 2024
 ): Promise<MusicRecommendation[]> {
-  // Expanded mood-to-genre mapping with more variety
-  const moodToGenres: Record<string, string[]> = {
-    "Joyful and Energetic": ["pop", "dance", "funk", "electronic"],
-    "Energetic and Vibrant": ["dance", "electronic", "pop", "house"],
-    "Calm and Peaceful": ["ambient", "chill", "acoustic", "new age"],
-    "Calm and Contemplative": ["acoustic", "indie", "folk", "ambient"],
-    "Dramatic and Intense": ["rock", "cinematic", "epic", "orchestral"],
-    "Mysterious and Intriguing": ["dark", "electronic", "ambient", "experimental"],
-    "Warm and Inviting": ["indie", "folk", "acoustic", "jazz"],
-    "Cool and Professional": ["electronic", "minimal", "techno", "ambient"],
-    "Nostalgic and Reflective": ["indie", "alternative", "folk", "classical"],
-    "Adventurous and Bold": ["rock", "electronic", "world", "experimental"],
-    "Romantic and Dreamy": ["r&b", "soul", "indie", "ballad"],
-    "Uplifting and Inspiring": ["pop", "indie", "gospel", "classical"],
-    "Dark and Moody": ["alternative", "electronic", "dark ambient", "post rock"],
-    "Bright and Cheerful": ["pop", "indie pop", "folk", "reggae"],
-    "Playful and Lighthearted": ["pop", "indie", "electronic", "funk"],
-    "Dynamic and Contextual": ["electronic", "cinematic", "experimental", "indie"]
-  };
-  
-  // Get genres for the mood, with fallback
-  const genres = moodToGenres[sceneMood] || moodToGenres["Dynamic and Contextual"] || ["electronic", "pop"];
+  // Get genres for the mood, or for the closest known mood
+  const genres = resolveMoodProfile(sceneMood).genres;
   
   // Build varied search queries based on video characteristics and user input
   let searchTerms = [];
@@ -698,39 +902,40 @@ async function searchSpotifyTracks(
     return [];
   }
   
-  // Remove duplicates and shuffle for variety
+  // Remove duplicates, keeping the first result for each track
   const uniqueTracks = Array.from(new Map(allTracks.map(track => [track.id, track])).values());
   
-  // Sort by popularity and relevance to user preferences
-  const sortedTracks = uniqueTracks.sort((a, b) => {
-    let aScore = a.popularity;
-    let bScore = b.popularity;
-    
-    // Boost score for tracks matching user description
-    if (userDescription) {
-      const descLower = userDescription.toLowerCase();
-      const aName = a.name.toLowerCase();
-      const bName = b.name.toLowerCase();
-      const aArtist = a.artists.map(artist => artist.name.toLowerCase()).join(' ');
-      const bArtist = b.artists.map(artist => artist.name.toLowerCase()).join(' ');
-      
-      // Check for keyword matches in track name or artist
-      const descWords = descLower.split(/\s+/).filter(word => word.length > 3);
-      for (const word of descWords) {
-        if (aName.includes(word) || aArtist.includes(word)) aScore += 20;
-        if (bName.includes(word) || bArtist.includes(word)) bScore += 20;
-      }
-    }
-    
-    // Add randomness for variety
-    aScore += Math.random() * 30;
-    bScore += Math.random() * 30;
-    
-    return bScore - aScore;
+  // Score every track once: popularity plus a boost per description keyword
+  const descWords = userDescription
+    ? userDescription.toLowerCase().split(/\s+/).filter(word => word.length > 3)
+    : [];
+  const matchDescWords = compileKeywordMatcher(Object.fromEntries(descWords.map(word => [word, [word]])));
+  const descMatches = new Map<string, number>();
+  const scores = new Map<string, number>();
+  for (const track of uniqueTracks) {
+    const trackText = `${track.name} ${track.artists.map((artist: any) => artist.name).join(' ')}`;
+    const matches = matchDescWords(trackText).size;
+    descMatches.set(track.id, matches);
+    scores.set(track.id, (track.popularity || 0) + matches * 20);
+  }
+  
+  // Deterministic order: score, then track ID
+  const sortedTracks = uniqueTracks.sort((a, b) =>
+    (scores.get(b.id)! - scores.get(a.id)!) || (a.id < b.id ? -1 : a.id > b.id ? 1 : 0)
+  );
+  
+  // Prefer one track per lead artist for variety, then fill from the rest
+  const seenArtists = new Set<string>();
+  const distinctArtistTracks = sortedTracks.filter(track => {
+    const artist = (track.artists[0]?.name || "").toLowerCase();
+    if (seenArtists.has(artist)) return false;
+    seenArtists.add(artist);
+    return true;
   });
+  const repeatArtistTracks = sortedTracks.filter(track => !distinctArtistTracks.includes(track));
   
   // Get audio features for selected tracks
-  const selectedTracks = sortedTracks.slice(0, 5);
+  const selectedTracks = [...distinctArtistTracks, ...repeatArtistTracks].slice(0, 5);
   const trackIds = selectedTracks.map((track: any) => track.id).join(",");
   
   let audioFeatures = [];
@@ -752,7 +957,8 @@ async function searchSpotifyTracks(
     console.warn("[searchSpotifyTracks] Failed to get audio features", featuresError);
   }
   
-  // Format recommendations with variety
+  // Format recommendations
+  const moodProfile = resolveMoodProfile(sceneMood);
   const recommendations: MusicRecommendation[] = [];
   
   for (let i = 0; i < Math.min(selectedTracks.length, 3); i++) {
@@ -763,19 +969,14 @@ async function searchSpotifyTracks(
     const trackGenre = determineTrackGenre(track, searchTerms);
     
     // Calculate enhanced confidence based on user preferences
-    let confidence = features ? calculateMatchScore(features, sceneMood) : (0.6 + Math.random() * 0.3);
+    // Without audio features, fall back to popularity (0.6-0.9)
+    let confidence = features
+      ? calculateMatchScore(features, sceneMood)
+      : 0.6 + ((track.popularity || 0) / 100) * 0.3;
     
     // Boost confidence for user description matches
-    if (userDescription) {
-      const descLower = userDescription.toLowerCase();
-      const trackText = `${track.name} ${track.artists.map(a => a.name).join(' ')}`.toLowerCase();
-      const descWords = descLower.split(/\s+/).filter(word => word.length > 3);
-      
-      for (const word of descWords) {
-        if (trackText.includes(word)) {
-          confidence = Math.min(0.95, confidence + 0.1);
-        }
-      }
+    if (descMatches.get(track.id)) {
+      confidence = Math.min(0.95, confidence + 0.1 * descMatches.get(track.id)!);
     }
     
     recommendations.push({
@@ -783,8 +984,8 @@ async function searchSpotifyTracks(
       artist: track.artists.map((artist: any) => artist.name).join(", "),
       genre: trackGenre,
       mood: features ? getMoodFromFeatures(features) : determineTrackMood(track.name, sceneMood),
-      energy_level: features?.energy || (Math.random() * 0.4 + 0.3), // 0.3-0.7 fallback
-      valence: features?.valence || (Math.random() * 0.4 + 0.4), // 0.4-0.8 fallback
+      energy_level: features?.energy ?? moodEstimate(moodProfile, "energy"),
+      valence: features?.valence ?? moodEstimate(moodProfile, "valence"),
       preview_url: track.preview_url,
       spotify_id: track.id,
       confidence_score: confidence
@@ -812,27 +1013,54 @@ function determineTrackGenre(track: any, searchTerms: string[]): string {
     if (term.includes("ambient")) return "Ambient";
   }
   
-  // Fallback to random genre for variety
-  return genres[Math.floor(Math.random() * genres.length)];
+  // Fallback to a genre derived from the track ID, so the same track always gets the same genre
+  const idHash = String(track.id || "").split('').reduce((a, b) => a + b.charCodeAt(0), 0);
+  return genres[idHash % genres.length];
 }
 
-// Helper function to determine track mood
-function determineTrackMood(trackName: string, sceneMood: string): string {
-  const moodKeywords = {
-    "Happy": ["love", "bright", "sunny", "joy", "celebrate"],
-    "Calm": ["peaceful", "quiet", "still", "gentle", "soft"],
-    "Energetic": ["power", "energy", "strong", "wild", "fast"],
-    "Mysterious": ["dark", "shadow", "mystery", "unknown", "deep"],
-    "Romantic": ["love", "heart", "romance", "sweet", "tender"]
-  };
-  
-  const lowerTrackName = trackName.toLowerCase();
-  
-  for (const [mood, keywords] of Object.entries(moodKeywords)) {
-    if (keywords.some(keyword => lowerTrackName.includes(keyword))) {
-      return mood;
+// Precompiled keyword matcher: one regex pass finds every category with a keyword in the text.
+// The lookahead tries every position, so overlapping keywords are all found; longest-first
+// alternation plus prefix-inherited categories keeps shorter keywords at the same position.
+function compileKeywordMatcher(vocabulary: Record<string, string[]>): (text: string) => Set<string> {
+  const keywordCategories = new Map<string, Set<string>>();
+  for (const [category, keywords] of Object.entries(vocabulary)) {
+    for (const keyword of keywords.map(k => k.toLowerCase()).filter(k => k)) {
+      if (!keywordCategories.has(keyword)) keywordCategories.set(keyword, new Set());
+      keywordCategories.get(keyword)!.add(category);
     }
   }
+  const keywords = [...keywordCategories.keys()].sort((a, b) => b.length - a.length || (a < b ? -1 : 1));
+  const categories = new Map<string, Set<string>>(keywords.map(keyword => [
+    keyword,
+    new Set(keywords.filter(k => keyword.startsWith(k)).flatMap(k => [...keywordCategories.get(k)!]))
+  ]));
+  const escaped = keywords.map(keyword => keyword.replace(/[.*+?^${}()|[\]\\]/g, "\\$&"));
+  const pattern = keywords.length ? new RegExp(`(?=(${escaped.join("|")}))`, "gi") : null;
+  
+  return (text: string) => {
+    const found = new Set<string>();
+    if (!pattern || !text) return found;
+    for (const match of text.matchAll(pattern)) {
+      for (const category of categories.get(match[1].toLowerCase())!) found.add(category);
+    }
+    return found;
+  };
+}
+
+const TRACK_MOOD_KEYWORDS: Record<string, string[]> = {
+  "Happy": ["love", "bright", "sunny", "joy", "celebrate"],
+  "Calm": ["peaceful", "quiet", "still", "gentle", "soft"],
+  "Energetic": ["power", "energy", "strong", "wild", "fast"],
+  "Mysterious": ["dark", "shadow", "mystery", "unknown", "deep"],
+  "Romantic": ["love", "heart", "romance", "sweet", "tender"]
+};
+const matchTrackMoods = compileKeywordMatcher(TRACK_MOOD_KEYWORDS);
+
+// Helper function to determine track mood
+function determineTrackMood(trackName: string, sceneMood: string): string {
+  const found = matchTrackMoods(trackName);
+  const mood = Object.keys(TRACK_MOOD_KEYWORDS).find(category => found.has(category));
+  if (mood) return mood;
   
   // Extract first word from scene mood as fallback
   return sceneMood.split(' ')[0] || "Various";
@@ -850,16 +1078,72 @@ function getMoodFromFeatures(features: any): string {
   return "Moderate";
 }
 
-function calculateMatchScore(features: any, sceneMood: string): number {
-  const moodTargets: Record<string, {valence: number, energy: number}> = {
-    "Joyful and Energetic": { valence: 0.8, energy: 0.9 },
-    "Calm and Peaceful": { valence: 0.6, energy: 0.3 },
-    "Dramatic and Intense": { valence: 0.4, energy: 0.8 },
-    "Romantic": { valence: 0.7, energy: 0.4 },
-    "Mysterious": { valence: 0.3, energy: 0.6 }
-  };
+// Stems of a mood string: lowercase words without filler, suffixes rewritten, cut to the stem length
+const MOOD_STOP_WORDS = new Set(MOOD_TABLE.stop_words);
+function moodStems(mood: string): Set<string> {
+  const words = (mood.toLowerCase().match(/[a-z]+/g) || []).filter(word => !MOOD_STOP_WORDS.has(word));
+  return new Set(words.map(word => {
+    for (const [suffix, replacement] of MOOD_TABLE.suffixes) {
+      if (word.endsWith(suffix) && word.length - suffix.length >= 3) {
+        word = word.slice(0, -suffix.length) + replacement;
+        break;
+      }
+    }
+    return word.slice(0, MOOD_TABLE.stem_length);
+  }));
+}
+
+// Stems describing each profile: its name, search terms and synonyms
+const MOOD_PROFILES = new Map<string, MoodProfile>(
+  MOOD_TABLE.profiles.map(profile => [profile.name.toLowerCase(), profile] as [string, MoodProfile])
+);
+const PROFILE_STEMS = MOOD_TABLE.profiles.map(profile => ({
+  profile,
+  stems: moodStems([profile.name, ...profile.search_terms, ...(profile.synonyms || [])].join(" ")),
+}));
+
+// Map a free-text mood (e.g. model output) to the closest mood profile, as app/services/mood_profiles.py does:
+// known names directly, anything else by cosine similarity of word stems, ties to the earlier profile.
+// Results are kept in a small LRU, so repeated moods are a single map lookup.
+const MOOD_CACHE_SIZE = 1024;
+const resolvedMoods = new Map<string, MoodProfile>();
+function resolveMoodProfile(mood: string | undefined): MoodProfile {
+  const fallback = MOOD_PROFILES.get(MOOD_TABLE.default_mood.toLowerCase())!;
+  if (!mood) return fallback;
+  const known = MOOD_PROFILES.get(mood.trim().toLowerCase());
+  if (known) return known;
+  const cached = resolvedMoods.get(mood);
+  if (cached) {
+    resolvedMoods.delete(mood);
+    resolvedMoods.set(mood, cached);
+    return cached;
+  }
   
-  const target = moodTargets[sceneMood] || moodTargets["Joyful and Energetic"];
+  const stems = moodStems(mood);
+  let best = fallback;
+  let bestScore = 0;
+  for (const { profile, stems: profileStems } of PROFILE_STEMS) {
+    const overlap = [...stems].filter(stem => profileStems.has(stem)).length;
+    const score = overlap ? overlap / Math.sqrt(stems.size * profileStems.size) : 0;
+    if (score > bestScore) {
+      best = profile;
+      bestScore = score;
+    }
+  }
+  if (resolvedMoods.size >= MOOD_CACHE_SIZE) {
+    resolvedMoods.delete(resolvedMoods.keys().next().value);
+  }
+  resolvedMoods.set(mood, best);
+  return best;
+}
+
+// Value reported for a track found for this mood when Spotify has no audio features for it
+function moodEstimate(profile: MoodProfile, feature: "energy" | "valence"): number {
+  return profile.estimates?.[feature] ?? profile[feature];
+}
+
+function calculateMatchScore(features: any, sceneMood: string): number {
+  const target = resolveMoodProfile(sceneMood);
   
   const valenceDiff = Math.abs(features.valence - target.valence);
   const energyDiff = Math.abs(features.energy - target.energy);
@@ -873,7 +1157,7 @@ async function queryMusicFallback(state: VideoProcessingState): Promise<Partial<
   
   // Generate unique recommendations based on video characteristics
   const videoHash = parseInt(state.request_id.slice(-8), 16) || 1;
-  const urlHash = state.video_url.split('').reduce((a, b) => a + b.charCodeAt(0), 0);
+  const urlHash = simulationKey(state).split('').reduce((a, b) => a + b.charCodeAt(0), 0);
   const combinedHash = videoHash + urlHash;
   const mood = state.scene_mood || "Dynamic and Contextual";
   const ambientTags = state.ambient_tags || [];
@@ -1018,10 +1302,89 @@ async function queryMusicFallback(state: VideoProcessingState): Promise<Partial<
   };
 }
 
-// Main processing function
-async function processVideo(requestId: string, videoUrl: string) {
+// Run a pipeline stage, merge its output into the state and record its metrics
+async function runStage(
+  name: string,
+  state: VideoProcessingState,
+  stageMetrics: StageMetrics[],
+  stage: (state: VideoProcessingState, io: StageIO) => Promise<Partial<VideoProcessingState>>
+): Promise<void> {
+  const startedAt = new Date().toISOString();
+  const start = performance.now();
+  // Only media the stage reads or sends counts; stages that work from the state alone report zero
+  const io: StageIO = { bytes_in: 0, bytes_out: 0 };
+  let peakRss: number | null = null;
+  
+  try {
+    const result = await stage(state, io);
+    Object.assign(state, result);
+  } finally {
+    try {
+      peakRss = Deno.memoryUsage().rss;
+    } catch (_error) {
+      peakRss = null;
+    }
+    
+    const wallTime = (performance.now() - start) / 1000;
+    stageMetrics.push({
+      stage: name,
+      wall_time: Math.round(wallTime * 1e6) / 1e6,
+      cpu_time: null, // Not exposed by the Edge runtime
+      peak_rss_bytes: peakRss,
+      bytes_in: io.bytes_in,
+      bytes_out: io.bytes_out,
+      started_at: startedAt,
+    });
+    console.log(`[${name}] completed in ${wallTime.toFixed(3)}s`);
+  }
+}
+
+// Run the analysis stages over the state and build the processing result
+async function analyzeVideo(state: VideoProcessingState, stageMetrics: StageMetrics[]) {
   const startTime = Date.now();
   
+  // Step 1: Extract frames
+  await runStage("extract_frames", state, stageMetrics, extractFrames);
+  
+  // Step 2: Transcribe voice
+  await runStage("transcribe_voice", state, stageMetrics, transcribeVoice);
+  
+  // Step 3: Tag ambient sounds
+  await runStage("tag_ambient", state, stageMetrics, tagAmbient);
+  
+  // Step 4: Analyze scene
+  await runStage("analyze_scene", state, stageMetrics, analyzeScene);
+  
+  // Step 5: Generate music recommendations
+  await runStage("query_music", state, stageMetrics, queryMusic);
+  
+  if (state.error) {
+    throw new Error(state.error);
+  }
+
+  return {
+    extracted_frames: state.extracted_frames || [],
+    scene_description: state.scene_description,
+    scene_mood: state.scene_mood,
+    visual_elements: state.visual_elements || [],
+    transcription: state.transcription,
+    ambient_tags: state.ambient_tags || [],
+    recommendations: state.recommendations || [],
+    reasoning: state.reasoning,
+    processing_duration: (Date.now() - startTime) / 1000,
+    model_versions: state.model_versions || {},
+    stage_metrics: stageMetrics,
+  };
+}
+
+// Main processing function
+async function processVideo(
+  requestId: string,
+  videoUrl: string,
+  analysisVideoUrl?: string,
+  analysisAudioUrl?: string,
+  upstreamMetrics: StageMetrics[] = []
+) {
   try {
     console.log(`[process_video] Starting processing for request: ${requestId}`);
     
@@ -1032,46 +1395,15 @@ async function processVideo(requestId: string, videoUrl: string) {
       .eq("id", requestId);
 
     // Sequential processing (simplified from LangGraph)
-    const state: VideoProcessingState = { request_id: requestId, video_url: videoUrl };
-    
-    // Step 1: Extract frames
-    const framesResult = await extractFrames(state);
-    Object.assign(state, framesResult);
-    
-    // Step 2: Transcribe voice
-    const transcriptionResult = await transcribeVoice(state);
-    Object.assign(state, transcriptionResult);
-    
-    // Step 3: Tag ambient sounds
-    const ambientResult = await tagAmbient(state);
-    Object.assign(state, ambientResult);
-    
-    // Step 4: Analyze scene
-    const sceneResult = await analyzeScene(state);
-    Object.assign(state, sceneResult);
-    
-    // Step 5: Generate music recommendations
-    const musicResult = await queryMusic(state);
-    Object.assign(state, musicResult);
-    
-    if (state.error) {
-      throw new Error(state.error);
-    }
-
-    const processingDuration = (Date.now() - startTime) / 1000;
-    
-    const processingResult = {
-      extracted_frames: state.extracted_frames || [],
-      scene_description: state.scene_description,
-      scene_mood: state.scene_mood,
-      visual_elements: state.visual_elements || [],
-      transcription: state.transcription,
-      ambient_tags: state.ambient_tags || [],
-      recommendations: state.recommendations || [],
-      reasoning: state.reasoning,
-      processing_duration: processingDuration,
-      model_versions: state.model_versions || {},
+    const state: VideoProcessingState = {
+      request_id: requestId,
+      video_url: videoUrl,
+      analysis_video_url: analysisVideoUrl,
+      analysis_audio_url: analysisAudioUrl,
     };
+    // Stages the caller ran before invoking us (e.g. the proxy transcode) lead the metrics
+    const processingResult = await analyzeVideo(state, [...upstreamMetrics]);
+    const processingDuration = processingResult.processing_duration;
 
     // Update the database with results
     await supabase
@@ -1109,6 +1441,28 @@ async function processVideo(requestId: string, videoUrl: string) {
   }
 }
 
+// Analyze one time segment of a long video; the caller merges the segments and records the request's status
+async function processSegment(
+  requestId: string,
+  videoUrl: string,
+  segment: SegmentWindow,
+  analysisVideoUrl?: string,
+  analysisAudioUrl?: string
+) {
+  console.log(`[process_segment] Segment ${segment.index} (${segment.start}s-${segment.end}s) of request: ${requestId}`);
+  
+  const state: VideoProcessingState = {
+    request_id: requestId,
+    video_url: videoUrl,
+    analysis_video_url: analysisVideoUrl,
+    analysis_audio_url: analysisAudioUrl,
+    segment,
+  };
+  const result = await analyzeVideo(state, []);
+  
+  return { success: true, request_id: requestId, segment: segment.index, result };
+}
+
 // Edge Function handler
 serve(async (req) => {
   const corsHeaders = {
@@ -1121,7 +1475,14 @@ serve(async (req) => {
   }
 
   try {
-    const { request_id, video_url } = await req.json();
+    const {
+      request_id,
+      video_url,
+      analysis_video_url,
+      analysis_audio_url,
+      stage_metrics,
+      segment,
+    }: ProcessingRequest = await req.json();
 
     if (!request_id || !video_url) {
       return new Response(
@@ -1133,7 +1494,9 @@ serve(async (req) => {
       );
     }
 
-    const result = await processVideo(request_id, video_url);
+    const result = segment
+      ? await processSegment(request_id, video_url, segment, analysis_video_url, analysis_audio_url)
+      : await processVideo(request_id, video_url, analysis_video_url, analysis_audio_url, stage_metrics || []);
 
     return new Response(JSON.stringify(result), {
       headers: { ...corsHeaders, "Content-Type": "application/json" },
@@ -0,0 +1,9 @@
+-- Add upload-time probe metadata and processing cost estimate to processing_requests
+ALTER TABLE processing_requests
+ADD COLUMN video_metadata jsonb,
+ADD COLUMN estimated_cost real;
+
+-- Shortest-job-first scheduling over pending requests
+CREATE INDEX idx_processing_requests_pending_cost
+    ON processing_requests (estimated_cost ASC NULLS LAST, created_at ASC)
+    WHERE status = 'pending';
@@ -0,0 +1,10 @@
+-- Track analysis proxies stored next to the original upload
+ALTER TABLE processing_requests
+ADD COLUMN proxy_video_url text,
+ADD COLUMN proxy_audio_url text,
+ADD COLUMN raw_video_expires_at timestamptz;
+
+-- Raw uploads with a proxy can be expired early
+CREATE INDEX idx_processing_requests_raw_video_expires_at
+    ON processing_requests (raw_video_expires_at)
+    WHERE raw_video_expires_at IS NOT NULL;
@@ -0,0 +1,14 @@
+-- Keyset pagination of a user's requests, newest first (GET /requests)
+CREATE INDEX idx_processing_requests_user_created
+    ON processing_requests (user_id, created_at DESC, id DESC);
+
+-- Covered by the leading column of the index above
+DROP INDEX IF EXISTS idx_processing_requests_user_id;
+
+-- Request listings no longer return the result JSON; keep the recommendation count they show
+ALTER TABLE processing_requests
+ADD COLUMN recommendation_count integer GENERATED ALWAYS AS (
+    CASE WHEN jsonb_typeof(result -> 'recommendations') = 'array'
+        THEN jsonb_array_length(result -> 'recommendations')
+    END
+) STORED;
@@ -0,0 +1,97 @@
+"""Shared pytest fixtures."""
+
+import struct
+
+import httpx
+import pytest
+
+VIDEO_SAMPLES = 600  # 60 seconds at 10 fps
+VIDEO_SAMPLE_SIZE = 20000
+AUDIO_SAMPLE_SIZE = 500
+KEYFRAME_INTERVAL = 20
+
+
+def _box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def _full_box(box_type: bytes, payload: bytes) -> bytes:
+    return _box(box_type, b"\x00\x00\x00\x00" + payload)
+
+
+def _track(track_id, handler, offsets, size, sync=None, width=0, height=0):
+    count = len(offsets)
+    if handler == b"vide":
+        entry = _box(b"avc1", b"\x00" * 6 + struct.pack(">H", 1) + b"\x00" * 16 + struct.pack(">HH", width, height) + b"\x00" * 50)
+    else:
+        entry = _box(b"mp4a", b"\x00" * 6 + struct.pack(">H", 1) + b"\x00" * 8 + struct.pack(">HHHHI", 2, 16, 0, 0, 48000 << 16))
+
+    stbl_children = [
+        _full_box(b"stsd", struct.pack(">I", 1) + entry),
+        _full_box(b"stts", struct.pack(">III", 1, count, 100)),
+        _full_box(b"stsc", struct.pack(">IIII", 1, 1, 1, 1)),
+        _full_box(b"stsz", struct.pack(">II", 0, count) + struct.pack(f">{count}I", *([size] * count))),
+        _full_box(b"stco", struct.pack(">I", count) + struct.pack(f">{count}I", *offsets)),
+    ]
+    if sync is not None:
+        stbl_children.append(_full_box(b"stss", struct.pack(">I", len(sync)) + struct.pack(f">{len(sync)}I", *[s + 1 for s in sync])))
+
+    tkhd = _full_box(b"tkhd", struct.pack(">IIIII", 0, 0, track_id, 0, count * 100) + b"\x00" * 16 + b"\x00" * 36 + struct.pack(">II", width << 16, height << 16))
+    mdhd = _full_box(b"mdhd", struct.pack(">IIII", 0, 0, 1000, count * 100) + b"\x00" * 4)
+    hdlr = _full_box(b"hdlr", struct.pack(">I4s", 0, handler) + b"\x00" * 13)
+    stbl = _box(b"stbl", b"".join(stbl_children))
+    minf = _box(b"minf", stbl)
+    mdia = _box(b"mdia", mdhd + hdlr + minf)
+    return _box(b"trak", tkhd + mdia)
+
+
+def build_mp4() -> bytes:
+    """Build an interleaved MP4 with the moov box at the end of the file."""
+    ftyp = _box(b"ftyp", b"isom\x00\x00\x02\x00isomiso2")
+    mdat_payload = bytearray()
+    video_offsets, audio_offsets = [], []
+    base = len(ftyp) + 8
+    for i in range(VIDEO_SAMPLES):
+        video_offsets.append(base + len(mdat_payload))
+        mdat_payload += bytes([i % 251]) * VIDEO_SAMPLE_SIZE
+        audio_offsets.append(base + len(mdat_payload))
+        mdat_payload += b"\xaa" * AUDIO_SAMPLE_SIZE
+    mdat = _box(b"mdat", bytes(mdat_payload))
+
+    mvhd = _full_box(b"mvhd", struct.pack(">IIII", 0, 0, 1000, VIDEO_SAMPLES * 100) + b"\x00" * 80)
+    video = _track(1, b"vide", video_offsets, VIDEO_SAMPLE_SIZE, sync=list(range(0, VIDEO_SAMPLES, KEYFRAME_INTERVAL)), width=1920, height=1080)
+    audio = _track(2, b"soun", audio_offsets, AUDIO_SAMPLE_SIZE)
+    moov = _box(b"moov", mvhd + video + audio)
+    return ftyp + mdat + moov
+
+
+def _range_transport(content: bytes, honor_range: bool = True) -> httpx.MockTransport:
+    """Serve ``content`` with optional support for single byte-range requests."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        header = request.headers.get("range")
+        if not honor_range or not header:
+            return httpx.Response(200, content=content)
+        start, end = header.replace("bytes=", "").split("-")
+        start, end = int(start), min(int(end), len(content) - 1)
+        if start >= len(content):
+            return httpx.Response(416)
+        return httpx.Response(
+            206,
+            content=content[start:end + 1],
+            headers={"Content-Range": f"bytes {start}-{end}/{len(content)}"},
+        )
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.fixture
+def mp4_bytes():
+    """Synthetic 60-second 1080p MP4 with interleaved audio and moov at the end."""
+    return build_mp4()
+
+
+@pytest.fixture
+def range_transport():
+    """Factory for mock transports serving bytes with HTTP range support."""
+    return _range_transport
@@ -0,0 +1,164 @@
+"""Tests for analysis proxy transcoding."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+
+from app.auth import get_current_user
+from app.main import app
+from app.services.analysis_proxy import (
+    AnalysisProxy,
+    build_analysis_proxy,
+    build_proxy_command,
+    ensure_analysis_proxy,
+    proxy_storage_paths,
+)
+from app.services.supabase_client import SupabaseService, supabase_service
+
+
+class TestAnalysisProxy:
+    """Test cases for proxy command construction and storage layout."""
+
+    def test_proxy_paths_sit_next_to_original(self):
+        """Test that proxies are stored beside the original upload."""
+        video_path, audio_path = proxy_storage_paths("videos/user-1/abc_clip.mov")
+
+        assert video_path == "videos/user-1/abc_clip.proxy.mp4"
+        assert audio_path == "videos/user-1/abc_clip.16k.wav"
+
+    def test_single_decode_with_two_outputs(self):
+        """Test one ffmpeg input producing low-res video and 16 kHz mono audio."""
+        command = build_proxy_command("in.mp4", "proxy.mp4", "audio.wav")
+
+        assert command.count("-i") == 1
+        assert "fps=2,scale=-2:'min(360,ih)'" in command
+        assert command[command.index("-ar") + 1] == "16000"
+        assert command[command.index("-ac") + 1] == "1"
+        assert command[-1] == "audio.wav"
+
+    def test_video_only_source(self):
+        """Test that no audio output is requested for silent videos."""
+        command = build_proxy_command("in.mp4", "proxy.mp4", None)
+
+        assert "0:a:0" not in command
+        assert command[-1] == "proxy.mp4"
+
+    def test_stored_proxy_is_reused(self):
+        """Test that a re-run reuses the recorded proxy instead of transcoding and uploading again."""
+        stored = {"proxy_video_url": "https://x/clip.proxy.mp4", "proxy_audio_url": "https://x/clip.16k.wav"}
+        with patch.object(supabase_service, "get_request_proxy", AsyncMock(return_value=stored)), \
+             patch.object(supabase_service, "upload_file", AsyncMock()) as upload, \
+             patch("app.services.analysis_proxy.build_analysis_proxy", AsyncMock()) as build:
+            proxy = asyncio.run(ensure_analysis_proxy("request-1", "https://x/clip.mov", "user-1/clip.mov"))
+
+        assert (proxy.video_url, proxy.audio_url) == (stored["proxy_video_url"], stored["proxy_audio_url"])
+        build.assert_not_called()
+        upload.assert_not_called()
+
+    def test_timed_out_transcode_is_reaped(self, tmp_path):
+        """Test that a killed ffmpeg process is waited for so it does not linger as a zombie."""
+        process = MagicMock()
+        process.communicate = AsyncMock(side_effect=asyncio.TimeoutError)
+        process.wait = AsyncMock()
+
+        with patch("app.services.analysis_proxy.shutil.which", return_value="/usr/bin/ffmpeg"), \
+             patch("asyncio.create_subprocess_exec", AsyncMock(return_value=process)):
+            try:
+                asyncio.run(build_analysis_proxy("in.mp4", str(tmp_path)))
+                assert False, "expected RuntimeError"
+            except RuntimeError as e:
+                assert "timed out" in str(e)
+
+        process.kill.assert_called_once()
+        process.wait.assert_awaited_once()
+
+    def test_expired_uploads_point_at_proxy(self):
+        """Test that expiring a raw upload repoints the request's video_url at its proxy."""
+        service = SupabaseService()
+        service.client = MagicMock()
+        table = service.client.table.return_value
+        table.select.return_value.lt.return_value.not_.is_.return_value.not_.is_.return_value.limit.return_value\
+            .execute.return_value = MagicMock(
+                data=[{"id": "request-1", "video_path": "user-1/clip.mov", "proxy_video_url": "https://x/p.mp4"}]
+            )
+
+        assert asyncio.run(service.expire_raw_uploads()) == 1
+        asyncio.run(service.shutdown())
+
+        service.client.storage.from_.return_value.remove.assert_called_once_with(["user-1/clip.mov"])
+        table.update.assert_called_once_with(
+            {"video_path": None, "video_url": "https://x/p.mp4", "raw_video_expires_at": None}
+        )
+
+
+class TestProxyJob:
+    """Test cases for running the proxy transcode in the processing job."""
+
+    def teardown_method(self):
+        app.dependency_overrides.clear()
+
+    def test_upload_schedules_job_in_background(self):
+        """Test that the upload route hands the proxy transcode and analysis to a background job."""
+        user_id = str(uuid4())
+        app.dependency_overrides[get_current_user] = lambda: {"id": user_id}
+        request = {
+            "id": str(uuid4()), "user_id": user_id, "video_filename": "clip.mp4", "status": "pending",
+            "created_at": "2024-01-01T00:00:00Z", "updated_at": "2024-01-01T00:00:00Z",
+        }
+        enqueue = AsyncMock(return_value=False)
+        update = AsyncMock(return_value=True)
+
+        with patch("app.routes.requests.probe_video", AsyncMock(return_value=None)), \
+             patch.object(supabase_service, "upload_file", AsyncMock(return_value="https://x/clip.mp4")), \
+             patch.object(supabase_service, "create_processing_request", AsyncMock(return_value=request)), \
+             patch.object(supabase_service, "enqueue_processing_job", enqueue), \
+             patch.object(supabase_service, "update_request_status", update):
+            response = TestClient(app).post("/requests/", files={"video_file": ("clip.mp4", b"data", "video/mp4")})
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "pending"
+        assert enqueue.await_args.kwargs["video_url"] == "https://x/clip.mp4"
+        assert enqueue.await_args.kwargs["video_path"].endswith("_clip.mp4")
+        update.assert_awaited_once()
+        assert update.await_args.kwargs["status"] == "failed"
+
+    def test_edge_function_gets_both_proxies(self):
+        """Test that the edge function is sent the video and audio proxy URLs."""
+        service = SupabaseService()
+        service.client = MagicMock()
+        service.client.functions.invoke.return_value = {"success": True}
+        proxy = AnalysisProxy(video_url="https://x/clip.proxy.mp4", audio_url="https://x/clip.16k.wav")
+
+        with patch("app.services.supabase_client.settings.analysis_proxy_enabled", True), \
+             patch("app.services.supabase_client.settings.use_real_ai", True), \
+             patch("app.services.supabase_client.settings.use_edge_functions", True), \
+             patch("app.services.supabase_client.ensure_analysis_proxy", AsyncMock(return_value=proxy)):
+            assert asyncio.run(service.enqueue_processing_job("request-1", "https://x/clip.mov", video_path="clip.mov"))
+        asyncio.run(service.shutdown())
+
+        body = service.client.functions.invoke.call_args.kwargs["invoke_options"]["body"]
+        assert body["analysis_video_url"] == proxy.video_url
+        assert body["analysis_audio_url"] == proxy.audio_url
+
+    def test_transcode_metrics_reach_edge_function(self):
+        """Test that the proxy transcode stage records upload and proxy bytes and is sent along."""
+        service = SupabaseService()
+        service.client = MagicMock()
+        service.client.functions.invoke.return_value = {"success": True}
+        proxy = AnalysisProxy(video_url="https://x/clip.proxy.mp4", bytes_written=1500)
+
+        with patch("app.services.supabase_client.settings.analysis_proxy_enabled", True), \
+             patch("app.services.supabase_client.settings.use_real_ai", True), \
+             patch("app.services.supabase_client.settings.use_edge_functions", True), \
+             patch("app.services.supabase_client.ensure_analysis_proxy", AsyncMock(return_value=proxy)):
+            asyncio.run(service.enqueue_processing_job(
+                "request-1", "https://x/clip.mov", video_path="clip.mov", video_size=90000
+            ))
+        asyncio.run(service.shutdown())
+
+        body = service.client.functions.invoke.call_args.kwargs["invoke_options"]["body"]
+        [stage] = body["stage_metrics"]
+        assert stage["stage"] == "proxy_transcode"
+        assert (stage["bytes_in"], stage["bytes_out"]) == (90000, 1500)
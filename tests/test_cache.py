@@ -0,0 +1,61 @@
+"""Tests for the async TTL + LRU cache."""
+
+import asyncio
+
+from app.services.cache import AsyncTTLCache
+
+
+class TestAsyncTTLCache:
+    """Test cases for AsyncTTLCache."""
+
+    def test_lru_eviction_and_expiry(self):
+        """Test least-recently-used eviction and per-entry TTL."""
+        cache = AsyncTTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1 and cache.get("c") == 3
+        assert cache.evictions == 1
+
+        cache.set("short", 4, ttl=0)
+        assert cache.get("short") is None
+
+    def test_inflight_loads_are_deduplicated(self):
+        """Test that concurrent misses for one key run the loader once."""
+        cache = AsyncTTLCache()
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return ["result"]
+
+        async def run():
+            results = await asyncio.gather(*[cache.get_or_load("key", loader) for _ in range(10)])
+            results.append(await cache.get_or_load("key", loader))
+            return results
+
+        assert asyncio.run(run()) == [["result"]] * 11
+        assert len(calls) == 1
+        stats = cache.stats()
+        assert (stats["misses"], stats["coalesced"], stats["hits"]) == (1, 9, 1)
+
+    def test_errors_are_not_cached(self):
+        """Test that a failing loader propagates to all waiters and is retried later."""
+        cache = AsyncTTLCache()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        async def run():
+            results = await asyncio.gather(
+                *[cache.get_or_load("key", failing) for _ in range(3)], return_exceptions=True
+            )
+            assert all(isinstance(result, RuntimeError) for result in results)
+            return await cache.get_or_load("key", lambda: asyncio.sleep(0, result="ok"))
+
+        assert asyncio.run(run()) == "ok"
@@ -0,0 +1,109 @@
+"""Tests for the local track catalog."""
+
+import asyncio
+import threading
+
+import numpy as np
+
+from app.services import catalog as catalog_module
+from app.services.catalog import TrackCatalog, target_vector
+from app.services.spotify_service import SpotifyService
+
+TRACKS = [
+    {"title": "Party Anthem", "artist": "A", "genre": "dance", "year": 2015,
+     "energy": 0.9, "valence": 0.85, "danceability": 0.85, "tempo": 128, "popularity": 80},
+    {"title": "Old Party", "artist": "B", "genre": "disco", "year": 1979,
+     "energy": 0.9, "valence": 0.9, "danceability": 0.8, "tempo": 125, "popularity": 70},
+    {"title": "Quiet Lake", "artist": "C", "genre": "ambient", "year": 2010,
+     "energy": 0.25, "valence": 0.6, "danceability": 0.35, "tempo": 75, "popularity": 40},
+    {"title": "Slow Dance", "artist": "D", "genre": "ballad", "year": 1995,
+     "energy": 0.4, "valence": 0.7, "danceability": 0.6, "tempo": 90, "popularity": 60},
+]
+
+
+class TestTrackCatalog:
+    """Test cases for vectorized catalog search."""
+
+    def test_target_vector_from_mood_params(self):
+        """Test tempo range strings are reduced to a normalized midpoint."""
+        vector = target_vector({"energy": 0.9, "valence": 0.8, "danceability": 0.8, "tempo": "120-140"})
+        np.testing.assert_allclose(vector, [0.9, 0.8, 0.8, 0.5333], atol=1e-3)
+
+    def test_nearest_tracks_with_year_filter(self):
+        """Test nearest-neighbor ordering and release year filtering."""
+        catalog = TrackCatalog.from_records(TRACKS)
+        target = target_vector({"energy": 0.9, "valence": 0.8, "danceability": 0.8, "tempo": "120-140"})
+
+        assert [i for i, _ in catalog.search(target, k=2)] == [0, 1]
+        assert [i for i, _ in catalog.search(target, k=2, year_start=1980, year_end=2000)] == [3]
+
+    def test_index_search_breaks_ties_by_popularity(self):
+        """Test that IVF results are ordered by distance, then popularity, like exact search."""
+        tracks = [{**TRACKS[2], "title": f"Lake {i}", "popularity": popularity}
+                  for i, popularity in enumerate([10, 90, 50])]
+        catalog = TrackCatalog.from_records(tracks)
+        target = target_vector({"energy": 0.3, "valence": 0.6, "danceability": 0.4, "tempo": 80})
+        exact = catalog.search(target, k=3)
+        catalog.build_index(n_lists=1)
+
+        assert catalog.search(target, k=3) == exact
+        assert [i for i, _ in exact] == [1, 2, 0]
+
+    def test_unknown_year_excluded_by_any_bound(self):
+        """Test that undated tracks are excluded by year_start, year_end or both, with and without the index."""
+        catalog = TrackCatalog.from_records(TRACKS + [{**TRACKS[3], "title": "Undated", "year": None}])
+        target = target_vector({"energy": 0.4, "valence": 0.7, "danceability": 0.6, "tempo": 90})
+        bounds = [{"year_start": 1900}, {"year_end": 2100}, {"year_start": 1900, "year_end": 2100}]
+
+        for indexed in (False, True):
+            if indexed:
+                catalog.build_index(n_lists=1)
+            for bound in bounds:
+                assert 4 not in [i for i, _ in catalog.search(target, k=5, **bound)], (indexed, bound)
+            assert 4 in [i for i, _ in catalog.search(target, k=5)]
+
+    def test_blank_csv_year_is_unknown(self, monkeypatch, tmp_path):
+        """Test that a blank CSV year loads as unknown and the first load runs off the event loop."""
+        path = tmp_path / "catalog.csv"
+        path.write_text(
+            "title,artist,genre,year,energy,valence,danceability,tempo,popularity,spotify_id\n"
+            "Undated,E,folk,,0.3,0.5,0.4,90,,\n"
+        )
+        monkeypatch.setattr(catalog_module.settings, "track_catalog_path", str(path))
+        monkeypatch.setattr(catalog_module, "_catalog_loaded", False)
+        monkeypatch.setattr(catalog_module, "_catalog", None)
+        loaded_in = []
+        load = catalog_module._load_configured_catalog
+        monkeypatch.setattr(
+            catalog_module, "_load_configured_catalog",
+            lambda: loaded_in.append(threading.current_thread()) or load()
+        )
+
+        catalog = asyncio.run(catalog_module.load_catalog())
+
+        assert catalog.track(0)["year"] is None
+        assert catalog.search(target_vector({}), k=1, year_start=1900) == []
+        assert loaded_in and loaded_in[0] is not threading.main_thread()
+
+    def test_scene_recommendations_use_catalog(self, monkeypatch, tmp_path):
+        """Test that a configured catalog serves recommendations without Spotify."""
+        path = tmp_path / "catalog.csv"
+        header = "title,artist,genre,year,energy,valence,danceability,tempo,popularity,spotify_id\n"
+        rows = "".join(
+            f"{t['title']},{t['artist']},{t['genre']},{t['year']},{t['energy']},{t['valence']},"
+            f"{t['danceability']},{t['tempo']},{t['popularity']},\n"
+            for t in TRACKS
+        )
+        path.write_text(header + rows)
+        monkeypatch.setattr(catalog_module.settings, "track_catalog_path", str(path))
+        monkeypatch.setattr(catalog_module, "_catalog_loaded", False)
+        monkeypatch.setattr(catalog_module, "_catalog", None)
+
+        service = SpotifyService()
+        service._create_client = lambda: (_ for _ in ()).throw(AssertionError("network used"))
+        results = asyncio.run(service.get_recommendations_by_scene(
+            "", "Calm and Peaceful", [], [], limit=2, music_year_start=2000, music_year_end=2024
+        ))
+
+        assert [r["title"] for r in results] == ["Quiet Lake", "Party Anthem"]
+        assert 0 < results[1]["confidence_score"] < results[0]["confidence_score"] <= 1
@@ -0,0 +1,61 @@
+"""Tests for the IVF approximate nearest-neighbor index."""
+
+import numpy as np
+import pytest
+
+from app.services.catalog_index import IVFIndex, brute_force_search
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(7).random((5000, 4), dtype=np.float32)
+
+
+def _recall(found, expected):
+    return len(set(found.tolist()) & set(expected.tolist())) / len(expected)
+
+
+class TestIVFIndex:
+    """Test cases for IVFIndex."""
+
+    def test_recall_against_brute_force(self, vectors):
+        """Test that probing a few cells recovers nearly all exact neighbors."""
+        index = IVFIndex(4, n_lists=64, n_probe=8)
+        index.train(vectors)
+        index.add(vectors)
+
+        queries = np.random.default_rng(1).random((20, 4), dtype=np.float32)
+        recalls = [_recall(index.search(q, k=10)[0], brute_force_search(vectors, q, k=10)[0]) for q in queries]
+        assert np.mean(recalls) >= 0.9
+
+    def test_filters_and_incremental_insert(self, vectors):
+        """Test year/genre filtering and that inserted rows are searchable."""
+        years = np.where(np.arange(len(vectors)) % 2, 1990, 2020)
+        genres = np.where(np.arange(len(vectors)) % 3, "rock", "jazz")
+        index = IVFIndex(4, n_lists=32, n_probe=2)
+        index.train(vectors)
+        index.add(vectors, years=years, genres=genres)
+
+        query = vectors[0]
+        ids, _ = index.search(query, k=20, year_start=2000, genres=["Jazz"])
+        assert len(ids) == 20
+        assert all(years[i] == 2020 and genres[i] == "jazz" for i in ids)
+
+        index.add(query[None, :] + 1e-4, ids=[99999], years=[2021], genres=["polka"])
+        ids, _ = index.search(query, k=1, genres=["polka"])
+        assert ids.tolist() == [99999]
+
+    def test_save_and_load(self, vectors, tmp_path):
+        """Test that a saved index returns identical results after loading."""
+        index = IVFIndex(4, n_lists=16)
+        index.train(vectors)
+        index.add(vectors[:1000], genres=["pop"] * 1000)
+        path = str(tmp_path / "index")
+        index.save(path)
+
+        loaded = IVFIndex.load(path)
+        assert isinstance(loaded._vectors, np.memmap) and not loaded._vectors.flags.writeable
+        loaded.add(vectors[1000:1010])
+        query = vectors[3]
+        assert index.search(query, k=5)[0].tolist() == loaded.search(query, k=5)[0].tolist()
+        assert len(loaded) == 1010 and loaded.genres == ["pop"]
@@ -0,0 +1,106 @@
+"""Tests for local music library ingestion."""
+
+import os
+
+import numpy as np
+import pytest
+
+from app.services.catalog import TrackCatalog
+from app.services.catalog_ingest import describe_file, extract_features, ingest_library
+from app.services.catalog_store import open_catalog, write_catalog
+from tests.test_catalog import TRACKS
+
+ANALYZED = []
+
+
+def fake_analyzer(path):
+    ANALYZED.append(os.path.basename(path))
+    if path.endswith(".mp3"):
+        raise ValueError("cannot decode")
+    size = os.path.getsize(path)
+    return {"tempo": 100.0 + size, "energy": 0.5, "valence": 0.5, "danceability": 0.5}
+
+
+class TestCatalogIngest:
+    """Test cases for incremental library ingestion."""
+
+    def test_only_new_or_changed_files_are_analyzed(self, tmp_path):
+        """Test incremental runs, touched-but-unchanged files, failures and removals."""
+        library = tmp_path / "library"
+        (library / "Jazz").mkdir(parents=True)
+        (library / "Jazz" / "Trio - Late Night.wav").write_bytes(b"a" * 10)
+        (library / "Jazz" / "Solo.flac").write_bytes(b"b" * 20)
+        (library / "Jazz" / "broken.mp3").write_bytes(b"c")
+        (library / "notes.txt").write_text("not audio")
+        catalog_dir = str(tmp_path / "catalog")
+
+        ANALYZED.clear()
+        stats = ingest_library(str(library), catalog_dir, workers=0, analyzer=fake_analyzer)
+        assert sorted(ANALYZED) == ["Solo.flac", "Trio - Late Night.wav", "broken.mp3"]
+        assert (stats["analyzed"], stats["failed"], stats["tracks"]) == (2, 1, 2)
+
+        catalog = open_catalog(catalog_dir)
+        assert catalog.track(1)["title"] == "Late Night"
+        assert catalog.track(1)["artist"] == "Trio" and catalog.track(1)["genre"] == "Jazz"
+
+        # Touch one file without changing it, change another, remove the third
+        ANALYZED.clear()
+        os.utime(library / "Jazz" / "Solo.flac", (1, 1))
+        (library / "Jazz" / "Trio - Late Night.wav").write_bytes(b"a" * 30)
+        (library / "Jazz" / "broken.mp3").unlink()
+        stats = ingest_library(str(library), catalog_dir, workers=0, analyzer=fake_analyzer)
+
+        assert ANALYZED == ["Trio - Late Night.wav"]
+        assert (stats["analyzed"], stats["unchanged"], stats["tracks"]) == (1, 1, 2)
+        assert open_catalog(catalog_dir).track(1)["tempo"] == 130.0
+
+    def test_existing_catalog_not_overwritten(self, tmp_path):
+        """Test that a catalog not written by ingestion is only replaced when asked to."""
+        library = tmp_path / "library"
+        library.mkdir()
+        (library / "Song.wav").write_bytes(b"a")
+        catalog_dir = str(tmp_path / "catalog")
+        write_catalog(TrackCatalog.from_records(TRACKS), catalog_dir)
+
+        with pytest.raises(FileExistsError):
+            ingest_library(str(library), catalog_dir, workers=0, analyzer=fake_analyzer)
+        assert len(open_catalog(catalog_dir)) == len(TRACKS)
+
+        ingest_library(str(library), catalog_dir, workers=0, analyzer=fake_analyzer, replace=True)
+        assert len(open_catalog(catalog_dir)) == 1
+
+
+class TestFeatureExtraction:
+    """Test cases for librosa feature extraction and tag metadata."""
+
+    def test_extract_features_from_click_track(self, tmp_path):
+        """Test that a loud 120 BPM click track yields its tempo, high energy and bounded features."""
+        pytest.importorskip("librosa")
+        soundfile = pytest.importorskip("soundfile")
+        sr = 22050
+        t = np.arange(int(sr * 0.05)) / sr
+        click = 0.8 * np.sin(2 * np.pi * 880 * t) * np.exp(-t * 60)
+        y = np.zeros(sr * 20, dtype=np.float32)
+        for start in range(0, len(y) - len(click), sr // 2):
+            y[start:start + len(click)] += click
+        path = str(tmp_path / "click.wav")
+        soundfile.write(path, y, sr)
+
+        features = extract_features(path)
+
+        assert set(features) == {"duration", "tempo", "energy", "valence", "danceability"}
+        assert features["tempo"] == pytest.approx(120, rel=0.05)
+        assert features["duration"] == pytest.approx(20, abs=0.01)
+        assert all(0.0 <= features[name] <= 1.0 for name in ("energy", "valence", "danceability"))
+
+    def test_year_from_tags_not_mtime(self, tmp_path):
+        """Test that the release year comes from the date tag and is unknown without one."""
+        soundfile = pytest.importorskip("soundfile")
+        tagged, untagged = str(tmp_path / "Band - Tagged.wav"), str(tmp_path / "Untagged.wav")
+        for path in (tagged, untagged):
+            soundfile.write(path, np.zeros(1000, dtype=np.float32), 22050)
+        with soundfile.SoundFile(tagged, "r+") as f:
+            f.date = "1987-05-01"
+
+        assert describe_file(str(tmp_path), tagged)["year"] == 1987
+        assert describe_file(str(tmp_path), untagged)["year"] is None
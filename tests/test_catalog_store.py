@@ -0,0 +1,132 @@
+"""Tests for the memory-mapped columnar catalog format."""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from app.models.requests import MusicRecommendation
+from app.services.catalog import TrackCatalog, recommend_from_catalog, target_vector
+from app.services.catalog_index import IVFIndex
+from app.services.catalog_store import (
+    CatalogFormatError,
+    StringColumn,
+    main,
+    open_catalog,
+    write_catalog,
+)
+from tests.test_catalog import TRACKS
+
+
+class TestCatalogStore:
+    """Test cases for writing and mapping catalog directories."""
+
+    def test_round_trip_is_memory_mapped(self, tmp_path):
+        """Test that a written catalog maps back with identical rows and search results."""
+        catalog = TrackCatalog.from_records(TRACKS + [{**TRACKS[0], "title": "Café Ünïcode", "genre": None}])
+        directory = str(tmp_path / "catalog")
+        write_catalog(catalog, directory)
+
+        mapped = open_catalog(directory)
+
+        assert isinstance(mapped.energy, np.memmap)
+        assert isinstance(mapped.title, StringColumn)
+        assert len(mapped) == len(catalog)
+        assert mapped.track(4)["title"] == "Café Ünïcode" and mapped.track(4)["genre"] == ""
+        assert mapped.track(4)["spotify_id"] is None
+        target = target_vector({"energy": 0.3, "valence": 0.6, "danceability": 0.4, "tempo": "60-100"})
+        assert mapped.search(target, k=3, year_start=1990) == catalog.search(target, k=3, year_start=1990)
+
+    def test_mapped_recommendations_validate(self, tmp_path):
+        """Test that recommendations from a mapped catalog with blank strings are valid MusicRecommendations."""
+        blank = {**TRACKS[2], "title": "", "artist": "", "genre": "", "spotify_id": ""}
+        directory = str(tmp_path / "catalog")
+        write_catalog(TrackCatalog.from_records([blank]), directory)
+
+        recommendations = recommend_from_catalog(
+            open_catalog(directory), {"energy": 0.3, "valence": 0.6}, "Calm and Peaceful", limit=1
+        )
+
+        recommendation = MusicRecommendation(**recommendations[0])
+        assert (recommendation.genre, recommendation.spotify_id) == ("", None)
+
+    def test_version_mismatch_rejected(self, tmp_path):
+        """Test that catalogs from another format version are refused."""
+        directory = str(tmp_path / "catalog")
+        write_catalog(TrackCatalog.from_records(TRACKS), directory)
+        manifest_path = os.path.join(directory, "manifest.json")
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        manifest["version"] = 99
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f)
+
+        with pytest.raises(CatalogFormatError, match="version 99"):
+            open_catalog(directory)
+
+    def test_build_cli_with_index(self, tmp_path):
+        """Test the builder CLI from a JSON track list."""
+        source = tmp_path / "tracks.json"
+        source.write_text(json.dumps(TRACKS))
+        directory = str(tmp_path / "catalog")
+
+        main(["build", str(source), directory, "--index"])
+
+        assert os.path.isfile(os.path.join(directory, "index", "vectors.npy"))
+        assert [open_catalog(directory).track(i)["artist"] for i in range(4)] == ["A", "B", "C", "D"]
+
+    def test_rebuild_swaps_versions_atomically(self, tmp_path):
+        """Test that rebuilding repoints the catalog link and keeps only the replaced version."""
+        directory = str(tmp_path / "catalog")
+        for count in (2, 3, 4):
+            write_catalog(TrackCatalog.from_records(TRACKS[:count]), directory)
+
+        assert os.path.islink(directory)
+        assert len(open_catalog(directory)) == 4
+        assert len([entry for entry in os.listdir(tmp_path) if entry.startswith(".catalog.v")]) == 2
+
+    def test_replaces_legacy_directory(self, tmp_path):
+        """Test that a catalog written as a plain directory is replaced by a versioned link."""
+        directory = tmp_path / "catalog"
+        directory.mkdir()
+        (directory / "manifest.json").write_text("{}")
+
+        write_catalog(TrackCatalog.from_records(TRACKS), str(directory))
+
+        assert os.path.islink(directory) and len(open_catalog(str(directory))) == len(TRACKS)
+
+    def test_index_cli_for_track_list(self, tmp_path):
+        """Test that the index command builds a loadable index for a CSV or JSON catalog."""
+        source = tmp_path / "tracks.json"
+        source.write_text(json.dumps(TRACKS))
+        index_dir = str(tmp_path / "index")
+
+        main(["index", str(source), index_dir])
+
+        assert len(IVFIndex.load(index_dir)) == len(TRACKS)
+
+    def test_stale_index_ignored(self, tmp_path, monkeypatch):
+        """Test that an index built from different rows is not used to search a rebuilt catalog."""
+        from app.services import catalog as catalog_module
+
+        source = tmp_path / "tracks.json"
+        source.write_text(json.dumps(TRACKS))
+        index_dir = str(tmp_path / "index")
+        main(["index", str(source), index_dir])
+        directory = str(tmp_path / "catalog")
+        write_catalog(TrackCatalog.from_records(TRACKS[:2]), directory)
+
+        monkeypatch.setattr(catalog_module.settings, "track_catalog_path", directory)
+        monkeypatch.setattr(catalog_module.settings, "track_catalog_index_path", index_dir)
+        monkeypatch.setattr(catalog_module, "_catalog_loaded", False)
+        monkeypatch.setattr(catalog_module, "_catalog", None)
+        catalog = catalog_module.get_catalog()
+
+        assert catalog.index is None
+        assert len(catalog.search(target_vector({"energy": 0.3}), k=3)) == 2
+
+        write_catalog(TrackCatalog.from_records(TRACKS), directory, with_index=True)
+        monkeypatch.setattr(catalog_module.settings, "track_catalog_index_path", "")
+        monkeypatch.setattr(catalog_module, "_catalog_loaded", False)
+        assert catalog_module.get_catalog().index is not None
@@ -0,0 +1,99 @@
+"""Tests for pipeline stage instrumentation."""
+
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.auth import get_current_user
+from app.main import app
+from app.models.requests import ProcessingResult
+from app.services.instrumentation import StageRecorder, percentile, summarize_stage_metrics
+
+
+class TestStageRecorder:
+    """Test cases for StageRecorder."""
+
+    def test_records_stage_metrics(self):
+        """Test that wall time, CPU time and byte counts are captured."""
+        recorder = StageRecorder()
+
+        with recorder.stage("extract_frames") as stage:
+            time.sleep(0.01)
+            stage.bytes_in = 1024
+            stage.bytes_out = 256
+
+        metrics = recorder.metrics[0]
+        assert metrics.stage == "extract_frames"
+        assert metrics.wall_time >= 0.01
+        assert metrics.cpu_time is not None
+        assert (metrics.bytes_in, metrics.bytes_out) == (1024, 256)
+
+    def test_records_failed_stage(self):
+        """Test that a stage is still recorded when it raises."""
+        recorder = StageRecorder()
+
+        with pytest.raises(RuntimeError):
+            with recorder.stage("analyze_scene"):
+                raise RuntimeError("boom")
+
+        assert [metrics.stage for metrics in recorder.metrics] == ["analyze_scene"]
+
+    def test_metrics_round_trip_through_result(self):
+        """Test that serialized metrics validate as part of a ProcessingResult."""
+        recorder = StageRecorder()
+        with recorder.stage("query_music"):
+            pass
+
+        result = ProcessingResult(stage_metrics=recorder.to_list())
+        assert result.stage_metrics[0].stage == "query_music"
+
+
+class TestStageSummary:
+    """Test cases for percentile aggregation."""
+
+    def test_percentile_interpolates(self):
+        """Test linear interpolation between ranks."""
+        values = [1.0, 2.0, 3.0, 4.0]
+        assert percentile(values, 0) == 1.0
+        assert percentile(values, 50) == 2.5
+        assert percentile(values, 100) == 4.0
+
+    def test_summarize_groups_by_stage(self):
+        """Test per-stage percentiles over many jobs."""
+        stage_metrics = [
+            {"stage": "extract_frames", "wall_time": float(i), "cpu_time": None, "bytes_in": 10}
+            for i in range(1, 101)
+        ] + [{"stage": "query_music", "wall_time": 0.2}]
+
+        summary = summarize_stage_metrics(stage_metrics)
+
+        assert summary["extract_frames"]["count"] == 100
+        assert summary["extract_frames"]["wall_time"]["p50"] == pytest.approx(50.5)
+        assert summary["extract_frames"]["wall_time"]["max"] == 100.0
+        assert "cpu_time" not in summary["extract_frames"]
+        assert summary["query_music"]["wall_time"]["p99"] == 0.2
+
+
+class TestStageMetricsRoute:
+    """Test cases for the stage metrics endpoint."""
+
+    def teardown_method(self):
+        app.dependency_overrides.clear()
+
+    def _get(self, user):
+        app.dependency_overrides[get_current_user] = lambda: user
+        metrics = AsyncMock(return_value=[])
+        with patch("app.routes.metrics.supabase_service.get_recent_stage_metrics", metrics):
+            return TestClient(app).get("/metrics/stages"), metrics
+
+    def test_requires_admin_role(self):
+        """Test that only users with the admin role in app_metadata can read every user's stage metrics."""
+        response, metrics = self._get({"id": "user-1", "app_metadata": {}, "user_metadata": {"role": "admin"}})
+        assert response.status_code == 403
+        metrics.assert_not_called()
+
+        response, metrics = self._get({"id": "admin-1", "app_metadata": {"role": "admin"}})
+        assert response.status_code == 200
+        assert response.json() == {"request_limit": 500, "stages": {}}
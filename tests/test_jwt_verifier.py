@@ -0,0 +1,243 @@
+"""Tests for local Supabase access token verification."""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from app.config import settings
+from app.services.jwt_verifier import JWKSCache, SupabaseJWTVerifier, TokenVerificationError, UserCache
+
+SECRET = "test-jwt-secret"
+
+
+def _claims(**overrides):
+    claims = {
+        "sub": "user-123",
+        "aud": "authenticated",
+        "role": "authenticated",
+        "email": "test@example.com",
+        "exp": int(time.time()) + 3600,
+        "user_metadata": {"name": "Test"},
+    }
+    claims.update(overrides)
+    return claims
+
+
+def _rsa_keys(kid="key-1"):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    public_jwk = jwk.construct(public_pem, "RS256").to_dict()
+    public_jwk["kid"] = kid
+    return private_pem, public_jwk
+
+
+def _verifier(mode="local"):
+    verifier = SupabaseJWTVerifier()
+    verifier.mode = mode
+    return verifier
+
+
+class TestJWTVerifier:
+    """Test cases for access token verification."""
+
+    def test_valid_hs256_token_builds_user(self):
+        """Test that a valid token yields the user from its claims without a network call."""
+        token = jwt.encode(_claims(), SECRET, algorithm="HS256")
+        remote = AsyncMock()
+
+        with patch.object(settings, "supabase_jwt_secret", SECRET), \
+             patch("app.services.jwt_verifier.supabase_service.authenticate_user", remote):
+            user = asyncio.run(_verifier().authenticate(token))
+
+        assert user["id"] == "user-123"
+        assert user["email"] == "test@example.com"
+        assert user["user_metadata"] == {"name": "Test"}
+        remote.assert_not_called()
+
+    def test_rejects_expired_wrong_audience_and_forged_tokens(self):
+        """Test that expired, wrong-audience and wrongly signed tokens are rejected."""
+        tokens = [
+            jwt.encode(_claims(exp=int(time.time()) - 3600), SECRET, algorithm="HS256"),
+            jwt.encode(_claims(aud="someone-else"), SECRET, algorithm="HS256"),
+            jwt.encode(_claims(), "another-secret", algorithm="HS256"),
+            "not-a-jwt",
+        ]
+
+        with patch.object(settings, "supabase_jwt_secret", SECRET):
+            verifier = _verifier()
+            for token in tokens:
+                assert asyncio.run(verifier.authenticate(token)) is None
+
+    def test_rejects_disallowed_algorithm(self):
+        """Test that tokens signed with an algorithm outside the allow list are rejected."""
+        token = jwt.encode(_claims(), SECRET, algorithm="HS512")
+
+        with patch.object(settings, "supabase_jwt_secret", SECRET):
+            try:
+                asyncio.run(_verifier().verify(token))
+                assert False, "expected TokenVerificationError"
+            except TokenVerificationError as e:
+                assert "not allowed" in str(e)
+
+    def test_rs256_token_verified_with_jwks(self):
+        """Test that asymmetric tokens are verified with the key named by their kid."""
+        private_pem, public_jwk = _rsa_keys()
+        token = jwt.encode(_claims(), private_pem, algorithm="RS256", headers={"kid": "key-1"})
+        verifier = _verifier()
+
+        with patch.object(verifier.jwks, "_fetch", AsyncMock(return_value={"key-1": public_jwk})) as fetch:
+            first = asyncio.run(verifier.authenticate(token))
+            second = asyncio.run(verifier.authenticate(token))
+
+        assert first["id"] == second["id"] == "user-123"
+        fetch.assert_awaited_once()
+
+    def test_revalidate_mode_confirms_with_supabase(self):
+        """Test that revalidate mode rejects locally valid tokens that Supabase Auth rejects."""
+        token = jwt.encode(_claims(), SECRET, algorithm="HS256")
+
+        with patch.object(settings, "supabase_jwt_secret", SECRET):
+            with patch("app.services.jwt_verifier.supabase_service.authenticate_user",
+                       AsyncMock(return_value=None)):
+                assert asyncio.run(_verifier("revalidate").authenticate(token)) is None
+            with patch("app.services.jwt_verifier.supabase_service.authenticate_user",
+                       AsyncMock(return_value={"id": "user-123", "email": "test@example.com"})):
+                assert asyncio.run(_verifier("revalidate").authenticate(token))["id"] == "user-123"
+
+    def test_missing_secret_falls_back_to_supabase(self):
+        """Test that HS256 tokens go to Supabase Auth while SUPABASE_JWT_SECRET is unset."""
+        token = jwt.encode(_claims(), SECRET, algorithm="HS256")
+        remote = AsyncMock(return_value={"id": "user-123"})
+
+        with patch.object(settings, "supabase_jwt_secret", ""), \
+             patch("app.services.jwt_verifier.supabase_service.authenticate_user", remote):
+            user = asyncio.run(_verifier().authenticate(token))
+
+        assert user == {"id": "user-123"}
+        remote.assert_awaited_once_with(token)
+
+    def test_default_mode_follows_configured_keys(self):
+        """Test that verification stays remote until a Supabase JWT secret or JWKS URL is configured."""
+        with patch.object(settings, "auth_verification", ""), \
+             patch.object(settings, "supabase_jwt_secret", ""), \
+             patch.object(settings, "jwt_jwks_url", ""):
+            assert SupabaseJWTVerifier().mode == "remote"
+            with patch.object(settings, "supabase_jwt_secret", SECRET):
+                assert SupabaseJWTVerifier().mode == "local"
+            with patch.object(settings, "jwt_jwks_url", "https://example.test/jwks.json"):
+                assert SupabaseJWTVerifier().mode == "local"
+
+
+class TestJWKSCache:
+    """Test cases for the signing key cache."""
+
+    def test_unknown_kid_refresh_is_rate_limited_and_single_flight(self):
+        """Test that concurrent unknown-kid lookups share one fetch and do not refetch right away."""
+        cache = JWKSCache("https://example.test/jwks.json", refresh_interval=600, min_refresh_interval=30)
+
+        async def slow_fetch():
+            await asyncio.sleep(0.01)
+            return {"key-1": {"kid": "key-1"}}
+
+        async def run():
+            with patch.object(cache, "_fetch", side_effect=slow_fetch) as fetch:
+                keys = await asyncio.gather(*(cache.get_key("key-1") for _ in range(5)))
+                missing = await cache.get_key("unknown")
+                return keys, missing, fetch.call_count
+
+        keys, missing, calls = asyncio.run(run())
+
+        assert all(key == {"kid": "key-1"} for key in keys)
+        assert missing is None
+        assert calls == 1
+
+    def test_periodic_refresh(self):
+        """Test that the background loop refreshes the key set until stopped."""
+        cache = JWKSCache("https://example.test/jwks.json", refresh_interval=0.01)
+
+        async def run():
+            with patch.object(cache, "_fetch", AsyncMock(return_value={})):
+                cache.start()
+                await asyncio.sleep(0.05)
+                await cache.stop()
+
+        asyncio.run(run())
+
+        assert cache.refresh_count >= 2
+
+
+class TestUserCache:
+    """Test cases for the authenticated-user cache."""
+
+    def test_polling_reuses_remote_validation(self):
+        """Test that repeated and concurrent validations of one token call Supabase Auth once."""
+        token = jwt.encode(_claims(), SECRET, algorithm="HS256")
+        calls = []
+
+        async def validate(value):
+            calls.append(value)
+            await asyncio.sleep(0.01)
+            return {"id": "user-123"}
+
+        cache = UserCache(maxsize=10, ttl=60)
+
+        async def run():
+            concurrent = await asyncio.gather(*(cache.get_or_validate(token, validate) for _ in range(3)))
+            later = await cache.get_or_validate(token, validate)
+            return concurrent, later
+
+        concurrent, later = asyncio.run(run())
+
+        assert calls == [token]
+        assert all(user == {"id": "user-123"} for user in concurrent) and later == {"id": "user-123"}
+        stats = cache.stats()
+        assert (stats["misses"], stats["coalesced"], stats["hits"]) == (1, 2, 1)
+        assert stats["hit_rate"] == 0.75
+
+    def test_entries_capped_at_token_expiry_and_failures_not_cached(self):
+        """Test that tokens near expiry and failed validations are validated again."""
+        expiring = jwt.encode(_claims(exp=int(time.time()) - 1), SECRET, algorithm="HS256")
+        valid = jwt.encode(_claims(), SECRET, algorithm="HS256")
+        cache = UserCache(maxsize=10, ttl=60)
+        validate = AsyncMock(return_value={"id": "user-123"})
+        reject = AsyncMock(return_value=None)
+
+        for _ in range(2):
+            asyncio.run(cache.get_or_validate(expiring, validate))
+            asyncio.run(cache.get_or_validate(valid, reject))
+
+        assert validate.await_count == 2
+        assert reject.await_count == 2
+        assert cache.stats()["size"] == 0
+
+    def test_bounded_size(self):
+        """Test that the least recently used tokens are evicted beyond maxsize."""
+        cache = UserCache(maxsize=2, ttl=60)
+        validate = AsyncMock(return_value={"id": "user-123"})
+
+        for token in ("a", "b", "c"):
+            asyncio.run(cache.get_or_validate(token, validate))
+
+        assert cache.stats()["size"] == 2
+        assert cache.stats()["evictions"] == 1
+
+    def test_remote_mode_uses_cache(self):
+        """Test that remote mode validates each token with Supabase Auth once per TTL."""
+        remote = AsyncMock(return_value={"id": "user-123"})
+        verifier = _verifier("remote")
+
+        with patch("app.services.jwt_verifier.supabase_service.authenticate_user", remote):
+            for _ in range(3):
+                assert asyncio.run(verifier.authenticate("opaque-token"))["id"] == "user-123"
+
+        remote.assert_awaited_once_with("opaque-token")
+        assert verifier.stats()["user_cache"]["hits"] == 2
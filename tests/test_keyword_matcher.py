@@ -0,0 +1,45 @@
+"""Tests for the precompiled keyword matcher."""
+
+from app.services.keyword_matcher import KeywordMatcher, keyword_set_matcher
+from app.services.spotify_service import SpotifyService
+
+
+class TestKeywordMatcher:
+    """Test cases for single-pass keyword category matching."""
+
+    def test_finds_every_category_in_one_pass(self):
+        """Test that all categories are reported, including overlapping and prefix keywords."""
+        matcher = KeywordMatcher({
+            "happy": ("joy", "love"),
+            "romantic": ("lovesick", "heart"),
+            "calm": ("art",),
+        })
+
+        assert matcher.categories("LOVESICK Heart") == {"happy", "romantic", "calm"}
+        assert matcher.categories("Enjoy") == {"happy"}
+        assert matcher.categories("Nothing here") == set()
+        assert matcher.categories(None) == set()
+
+    def test_first_follows_vocabulary_order(self):
+        """Test that the earliest category in vocabulary order wins, not the earliest in the text."""
+        matcher = KeywordMatcher({"first": ("zeta",), "second": ("alpha",)})
+
+        assert matcher.first("alpha zeta") == "first"
+        assert matcher.first("alpha") == "second"
+        assert matcher.first("beta", default="none") == "none"
+
+    def test_keywords_are_literal(self):
+        """Test that regex metacharacters in keywords are matched literally."""
+        matcher = keyword_set_matcher(("r&b", "a.b"))
+
+        assert matcher.count("R&B classics") == 1
+        assert matcher.count("axb") == 0
+        assert keyword_set_matcher(("r&b", "a.b")) is matcher
+
+    def test_track_mood_estimate(self):
+        """Test the Spotify service mood heuristic keeps its priority order."""
+        service = SpotifyService()
+
+        assert service._estimate_mood_from_track_info({"name": "Epic Love Party"}, "Mysterious") == "Upbeat and Joyful"
+        assert service._estimate_mood_from_track_info({"name": "Heart of Stone"}, "Mysterious") == "Romantic"
+        assert service._estimate_mood_from_track_info({"name": "Untitled"}, "Mysterious") == "Mysterious"
@@ -0,0 +1,94 @@
+"""Tests for mood profiles and free-text mood resolution."""
+
+import json
+import os
+
+import numpy as np
+
+from app.services.mood_profiles import (
+    DEFAULT_MOOD,
+    MOOD_PROFILES,
+    MOOD_SYNONYMS,
+    MOOD_TABLE_PATH,
+    mood_vector,
+    resolve_mood,
+)
+from app.services.spotify_service import SpotifyService
+
+
+class TestMoodProfiles:
+    """Test cases for the mood profile table and resolver."""
+
+    def test_known_moods_resolve_directly(self):
+        """Test that every named profile, in any case, resolves to itself."""
+        for name in MOOD_PROFILES:
+            assert resolve_mood(name).name == name
+            assert resolve_mood(f"  {name.upper()} ").name == name
+
+    def test_unseen_moods_resolve_by_word_overlap(self):
+        """Test that model-style mood strings map to the closest profile."""
+        assert resolve_mood("Uplifting and Inspirational").name == "Uplifting and Inspiring"
+        assert resolve_mood("Tense, suspenseful thriller").name == "Suspenseful and Tense"
+        assert resolve_mood("happiness").name == "Joyful and Energetic"
+        assert resolve_mood("sad and lonely").name == "Melancholic and Thoughtful"
+
+    def test_everyday_mood_words_resolve_by_synonym(self):
+        """Test that common mood words outside the profile names resolve to a sensible profile."""
+        assert resolve_mood("Angry").name == "Dramatic and Intense"
+        assert resolve_mood("Excited").name == "Joyful and Energetic"
+        assert resolve_mood("Scary").name == "Suspenseful and Tense"
+
+    def test_unrelated_moods_get_neutral_profile(self):
+        """Test that moods with no known words fall back to the neutral profile, not an extreme one."""
+        assert resolve_mood("Quixotic").name == DEFAULT_MOOD
+        assert resolve_mood(None).name == DEFAULT_MOOD
+        assert resolve_mood("").name == DEFAULT_MOOD
+
+    def test_resolution_is_memoized(self):
+        """Test that repeated lookups are served from the LRU cache."""
+        resolve_mood.cache_clear()
+        resolve_mood("Glowing and Hopeful")
+        resolve_mood("Glowing and Hopeful")
+
+        assert resolve_mood.cache_info().hits == 1
+
+    def test_vectors_are_precomputed_and_read_only(self):
+        """Test that target vectors come from the shared table and cannot be modified."""
+        vector = mood_vector("Calm and Peaceful")
+
+        np.testing.assert_allclose(vector[:3], [0.3, 0.6, 0.4])
+        assert mood_vector("calm and peaceful") is vector
+        assert not vector.flags.writeable
+
+    def test_spotify_service_uses_profiles_for_unseen_moods(self):
+        """Test that the Spotify heuristics no longer treat unknown moods as joyful."""
+        service = SpotifyService()
+        melancholic = MOOD_PROFILES["Melancholic and Thoughtful"]
+
+        assert service._map_mood_to_spotify_params("Wistful and Melancholy") == melancholic.params()
+        assert service._estimate_energy_from_mood("Wistful and Melancholy") == melancholic.energy
+        assert service._build_mood_query("Wistful and Melancholy", []) == "melancholy sad thoughtful"
+
+    def test_original_moods_keep_their_track_estimates(self):
+        """Test that tracks for the original five moods report the estimates they always have."""
+        service = SpotifyService()
+
+        assert service._estimate_energy_from_mood("Joyful and Energetic") == 0.8
+        assert service._estimate_valence_from_mood("Joyful and Energetic") == 0.9
+        assert service._estimate_danceability("Calm and Peaceful", []) == 0.3
+        assert service._estimate_tempo("Dramatic and Intense") == 120
+        assert service._estimate_tempo("Joyful and Energetic") == 130
+        assert MOOD_PROFILES["Joyful and Energetic"].params()["valence"] == 0.8
+
+    def test_table_is_shared_with_edge_function(self):
+        """Test that the profiles come from the JSON table the edge function imports."""
+        with open(MOOD_TABLE_PATH, "r", encoding="utf-8") as f:
+            table = json.load(f)
+        edge_function = os.path.join(MOOD_TABLE_PATH.parents[1], "video-processor", "index.ts")
+        with open(edge_function, "r", encoding="utf-8") as f:
+            source = f.read()
+
+        assert list(MOOD_PROFILES) == [entry["name"] for entry in table["profiles"]]
+        assert all(MOOD_SYNONYMS[name] for name in MOOD_PROFILES)
+        assert '"../_shared/mood_profiles.json"' in source
+        assert "MOOD_TARGETS" not in source
@@ -0,0 +1,136 @@
+"""Tests for the direct Postgres data backend."""
+
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import patch
+from uuid import UUID
+
+from app.services.postgres_repository import (
+    GET_REQUEST_BY_ID,
+    GET_USER_REQUESTS,
+    GET_USER_REQUESTS_BEFORE,
+    UPDATE_REQUEST_STATUS,
+    PostgresRepository,
+)
+from app.services.supabase_client import SupabaseService, create_data_service
+
+REQUEST_ID = "6f1c1a52-6d1e-4c5e-9d0b-1f5a2f0e7c11"
+USER_ID = "0b8f0d57-2c43-4a53-8f52-6a3c8f3d9e21"
+
+
+class FakePool:
+    """Minimal stand-in for the asyncpg pool methods the repository uses."""
+
+    def __init__(self, rows=None, command="UPDATE 1"):
+        self.rows = rows or []
+        self.command = command
+        self.calls = []
+        self.closed = False
+
+    async def fetch(self, query, *args):
+        self.calls.append((query, args))
+        return self.rows
+
+    async def fetchrow(self, query, *args):
+        self.calls.append((query, args))
+        return self.rows[0] if self.rows else None
+
+    async def execute(self, query, *args):
+        self.calls.append((query, args))
+        return self.command
+
+    async def close(self):
+        self.closed = True
+
+
+def _row():
+    return {
+        "id": UUID(REQUEST_ID),
+        "user_id": UUID(USER_ID),
+        "status": "completed",
+        "result": {"scene_mood": "Calm and Peaceful"},
+        "created_at": datetime(2025, 1, 1, tzinfo=timezone.utc),
+        "completed_at": None,
+    }
+
+
+class TestPostgresRepository:
+    """Test cases for the asyncpg-backed repository."""
+
+    def test_rows_match_postgrest_shape(self):
+        """Test that rows come back with string IDs and timestamps like PostgREST responses."""
+        pool = FakePool(rows=[_row()])
+        repository = PostgresRepository(pool=pool)
+
+        request = asyncio.run(repository.get_request_by_id(REQUEST_ID, USER_ID))
+
+        assert request == {
+            "id": REQUEST_ID,
+            "user_id": USER_ID,
+            "status": "completed",
+            "result": {"scene_mood": "Calm and Peaceful"},
+            "created_at": "2025-01-01T00:00:00+00:00",
+            "completed_at": None,
+        }
+        assert pool.calls == [(GET_REQUEST_BY_ID, (REQUEST_ID, USER_ID))]
+
+    def test_user_requests_keyset_page(self):
+        """Test that listing pages resume after the cursor position with typed parameters."""
+        pool = FakePool(rows=[_row()])
+        repository = PostgresRepository(pool=pool)
+
+        asyncio.run(repository.get_user_requests(USER_ID, limit=20))
+        asyncio.run(repository.get_user_requests(USER_ID, limit=20, before=("2025-01-02T00:00:00+00:00", REQUEST_ID)))
+
+        assert pool.calls[0] == (GET_USER_REQUESTS, (USER_ID, 20))
+        assert pool.calls[1] == (
+            GET_USER_REQUESTS_BEFORE,
+            (USER_ID, 20, datetime(2025, 1, 2, tzinfo=timezone.utc), REQUEST_ID),
+        )
+        assert "result," not in GET_USER_REQUESTS
+
+    def test_update_status_reports_matched_rows(self):
+        """Test that status updates pass results through and report whether a row matched."""
+        pool = FakePool()
+        repository = PostgresRepository(pool=pool)
+
+        assert asyncio.run(repository.update_request_status(REQUEST_ID, "completed", result={"a": 1}))
+        assert pool.calls[0] == (UPDATE_REQUEST_STATUS, (REQUEST_ID, "completed", {"a": 1}, None))
+
+        pool.command = "UPDATE 0"
+        assert not asyncio.run(repository.update_request_status(REQUEST_ID, "processing"))
+
+    def test_query_errors_return_empty_results(self):
+        """Test that database errors are logged and reported like the REST backend does."""
+        pool = FakePool()
+
+        async def fail(query, *args):
+            raise ConnectionError("connection refused")
+
+        pool.fetch = pool.fetchrow = pool.execute = fail
+        repository = PostgresRepository(pool=pool)
+
+        assert asyncio.run(repository.get_user_requests(USER_ID)) == []
+        assert asyncio.run(repository.get_request_by_id(REQUEST_ID, USER_ID)) is None
+        assert asyncio.run(repository.update_request_status(REQUEST_ID, "failed")) is False
+
+    def test_shutdown_closes_pool(self):
+        """Test that shutting down closes the connection pool."""
+        pool = FakePool()
+        repository = PostgresRepository(pool=pool)
+
+        asyncio.run(repository.shutdown())
+
+        assert pool.closed
+
+
+class TestDataServiceFactory:
+    """Test cases for choosing the data backend."""
+
+    def test_falls_back_to_rest_without_asyncpg(self):
+        """Test that the postgres backend falls back to PostgREST when asyncpg is missing."""
+        with patch("app.services.supabase_client.settings.data_backend", "postgres"), \
+             patch.dict("sys.modules", {"asyncpg": None}):
+            service = create_data_service()
+
+        assert type(service) is SupabaseService
@@ -0,0 +1,66 @@
+"""Tests for client-side rate limiting and circuit breaking."""
+
+import asyncio
+import time
+
+import pytest
+
+from app.services.rate_limit import CircuitBreaker, RateLimitedError, TokenBucket, parse_retry_after
+
+
+class TestTokenBucket:
+    """Test cases for the token bucket limiter."""
+
+    def test_burst_then_paced(self):
+        """Test that a burst is allowed and further requests are spaced at the rate."""
+        bucket = TokenBucket(rate=50, capacity=5)
+
+        async def run():
+            start = time.perf_counter()
+            await asyncio.gather(*[bucket.acquire() for _ in range(10)])
+            return time.perf_counter() - start
+
+        elapsed = asyncio.run(run())
+        assert 0.08 <= elapsed < 0.5
+        assert bucket.waited == 5
+
+    def test_pause_and_bounded_wait(self):
+        """Test that a Retry-After pause rejects callers unwilling to wait that long."""
+        bucket = TokenBucket(rate=100, capacity=10)
+        bucket.pause(30)
+
+        with pytest.raises(RateLimitedError):
+            asyncio.run(bucket.acquire(max_wait=1.0))
+        assert bucket.rejected == 1
+
+    def test_parse_retry_after(self):
+        """Test delta-seconds and HTTP-date Retry-After values."""
+        assert parse_retry_after("3") == 3.0
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+class TestCircuitBreaker:
+    """Test cases for the circuit breaker."""
+
+    def test_opens_and_half_opens(self):
+        """Test open after the threshold, one probe when half-open, close on success."""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        breaker.record_failure()
+        assert breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert not breaker.allow_request()
+
+        time.sleep(0.06)
+        assert breaker.allow_request()
+        assert not breaker.allow_request()
+        breaker.record_success()
+        assert breaker.state == "closed"
+
+    def test_long_retry_after_opens_immediately(self):
+        """Test that an explicit open duration trips the breaker on the first failure."""
+        breaker = CircuitBreaker(failure_threshold=5, reset_timeout=1)
+        breaker.record_failure(open_for=60)
+        assert breaker.state == "open"
+        assert breaker.stats()["open_for"] > 59
@@ -0,0 +1,153 @@
+"""Tests for the cross-request recommendation cache."""
+
+import asyncio
+import time
+
+import httpx
+
+from app.services.recommendation_cache import (
+    MemoryBackend,
+    RecommendationCache,
+    RedisBackend,
+    scene_signature,
+)
+from tests.test_spotify_service import _search_response, _service
+
+
+class FakeRedis:
+    """Minimal stand-in for the redis.asyncio commands the backend uses."""
+
+    def __init__(self):
+        self.values = {}
+        self.scores = {}
+
+    async def get(self, key):
+        value, expires_at = self.values.get(key, (None, 0))
+        return value if time.time() < expires_at else None
+
+    async def set(self, key, value, ex):
+        self.values[key] = (value, time.time() + ex)
+
+    async def zadd(self, key, mapping):
+        self.scores.update(mapping)
+
+    async def zcard(self, key):
+        return len(self.scores)
+
+    async def zpopmin(self, key, count):
+        popped = sorted(self.scores.items(), key=lambda item: item[1])[:count]
+        for member, _ in popped:
+            del self.scores[member]
+        return popped
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+    async def aclose(self):
+        pass
+
+
+class FailingBackend(MemoryBackend):
+    async def get(self, key):
+        raise ConnectionError("cache down")
+
+
+class TestSceneSignature:
+    """Test cases for normalized scene signatures."""
+
+    def test_order_and_case_independent(self):
+        """Test that reordered, re-cased inputs share a signature."""
+        first = scene_signature("Calm and Peaceful", ["Beach", "Sunset"], ["Waves", "Wind"], 1990, 2000)
+        second = scene_signature("calm  and peaceful", ["sunset", "BEACH"], ["wind", "waves"], 1990, 2000)
+
+        assert first == second
+
+    def test_only_top_elements_count(self):
+        """Test that trailing low-salience tags do not split signatures, but inputs that matter do."""
+        base = scene_signature("Romantic", ["A", "B"], ["X"], top=2)
+
+        assert scene_signature("Romantic", ["A", "B", "C"], ["X"], top=2) == base
+        assert scene_signature("Romantic", ["A", "C"], ["X"], top=2) != base
+        assert scene_signature("Romantic", ["A", "B"], ["X"], 1990, 2000, top=2) != base
+        assert scene_signature("Romantic", ["A", "B"], ["X"], limit=5, top=2) != base
+
+
+class TestRecommendationCache:
+    """Test cases for caching, eviction and backend failures."""
+
+    def test_memory_backend_evicts_least_recently_used(self):
+        """Test the size bound and expiry of the in-process backend."""
+        async def run():
+            backend = MemoryBackend(maxsize=2, ttl=60)
+            await backend.set("a", "1")
+            await backend.set("b", "2")
+            await backend.get("a")
+            await backend.set("c", "3")
+            return [await backend.get(key) for key in "abc"], backend.evictions
+
+        assert asyncio.run(run()) == (["1", None, "3"], 1)
+
+    def test_redis_backend_bounds_entries(self):
+        """Test that the Redis backend evicts the least recently used keys beyond maxsize."""
+        async def run():
+            backend = RedisBackend("redis://unused", maxsize=2, ttl=60, client=FakeRedis())
+            for key in "abc":
+                await backend.set(key, key.upper())
+                await asyncio.sleep(0.01)
+            return [await backend.get(key) for key in "abc"], await backend.size()
+
+        assert asyncio.run(run()) == ([None, "B", "C"], 2)
+
+    def test_concurrent_misses_compute_once(self):
+        """Test that one computation serves concurrent lookups and later hits."""
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return [{"spotify_id": "a"}]
+
+        async def run():
+            cache = RecommendationCache(MemoryBackend(maxsize=10, ttl=60))
+            results = await asyncio.gather(*(cache.get_or_compute("sig", compute) for _ in range(3)))
+            results.append(await cache.get_or_compute("sig", compute))
+            return results, await cache.stats()
+
+        results, stats = asyncio.run(run())
+
+        assert len(calls) == 1
+        assert all(result == [{"spotify_id": "a"}] for result in results)
+        assert (stats["misses"], stats["coalesced"], stats["hits"]) == (1, 2, 1)
+
+    def test_backend_failure_falls_through(self):
+        """Test that an unreachable backend still returns computed recommendations."""
+        async def compute():
+            return [{"spotify_id": "a"}]
+
+        cache = RecommendationCache(FailingBackend(maxsize=10, ttl=60))
+
+        assert asyncio.run(cache.get_or_compute("sig", compute)) == [{"spotify_id": "a"}]
+        assert cache.errors == 1
+
+    def test_scene_recommendations_served_from_cache(self):
+        """Test that an equivalent scene from another request skips Spotify entirely."""
+        searches = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path.endswith("/search"):
+                searches.append(request.url.params["q"])
+            return _search_response(request)
+
+        service = _service(handler)
+
+        async def run():
+            first = await service.get_recommendations_by_scene("", "Romantic", ["Beach", "Sunset"], ["Waves"])
+            count = len(searches)
+            second = await service.get_recommendations_by_scene("", "romantic", ["Sunset", "Beach"], ["Waves"])
+            return first, second, count
+
+        first, second, count = asyncio.run(run())
+
+        assert first == second
+        assert len(searches) == count
@@ -0,0 +1,56 @@
+"""Tests for recommendation API routes."""
+
+from unittest.mock import AsyncMock, patch
+
+from fastapi.testclient import TestClient
+
+from app.auth import get_current_user
+from app.main import app
+
+RECOMMENDATION = {
+    "title": "Song",
+    "artist": "Artist",
+    "genre": "Various",
+    "mood": "Romantic",
+    "energy_level": 0.4,
+    "valence": 0.7,
+    "spotify_id": "track1",
+    "confidence_score": 0.8,
+}
+
+
+class TestBatchRecommendations:
+    """Test cases for the batch recommendations endpoint."""
+
+    def setup_method(self):
+        app.dependency_overrides[get_current_user] = lambda: {"id": "user-1"}
+        self.client = TestClient(app)
+
+    def teardown_method(self):
+        app.dependency_overrides.clear()
+
+    def test_results_in_request_order(self):
+        """Test per-scene results keep request order and failures stay in their slot."""
+        scenes = [{"scene_mood": "Romantic"}, {"scene_mood": "Broken"}, {"scene_mood": "Romantic"}]
+        batch = AsyncMock(return_value=([[RECOMMENDATION], RuntimeError("boom"), [RECOMMENDATION]], 2))
+
+        with patch("app.routes.recommendations.spotify_service.get_recommendations_batch", batch):
+            response = self.client.post("/recommendations/batch", json={"scenes": scenes})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["unique_scenes"] == 2
+        assert [len(result["recommendations"]) for result in body["results"]] == [1, 0, 1]
+        assert body["results"][1]["error"]
+        assert batch.call_args.args[0][0]["scene_mood"] == "Romantic"
+
+    def test_rejects_invalid_year_range_and_oversized_batches(self):
+        """Test descriptor validation and the batch size limit."""
+        invalid = {"scene_mood": "Romantic", "music_year_start": 2000, "music_year_end": 1990}
+        response = self.client.post("/recommendations/batch", json={"scenes": [invalid]})
+        assert response.status_code == 422
+
+        with patch("app.routes.recommendations.settings.recommendation_batch_max_scenes", 1):
+            scenes = [{"scene_mood": "Romantic"}] * 2
+            response = self.client.post("/recommendations/batch", json={"scenes": scenes})
+        assert response.status_code == 400
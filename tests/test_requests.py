@@ -284,4 +284,165 @@ class TestProcessingRequestService:
         service.supabase.table.return_value.update.assert_called()
         service.supabase.table.return_value.update.return_value.eq.assert_called_with(
             "id", str(request_id)
-        ) 
\ No newline at end of file
+        ) 
+
+class TestRerankRequest:
+    """Test cases for re-ranking a completed request with new preferences."""
+
+    def setup_method(self):
+        from app.auth import get_current_user
+
+        app.dependency_overrides[get_current_user] = lambda: {"id": "user-1"}
+        self.client = TestClient(app)
+        self.request = {
+            "id": str(uuid4()),
+            "user_id": str(uuid4()),
+            "video_filename": "clip.mp4",
+            "status": "completed",
+            "description": "upbeat",
+            "music_year_start": 1980,
+            "music_year_end": 2020,
+            "result": {
+                "scene_description": "A beach at sunset",
+                "scene_mood": "Calm and Peaceful",
+                "visual_elements": ["Beach"],
+                "ambient_tags": ["Waves"],
+                "transcription": "hello",
+                "recommendations": [],
+            },
+            "created_at": "2024-01-01T00:00:00Z",
+            "updated_at": "2024-01-01T00:00:00Z",
+        }
+
+    def teardown_method(self):
+        app.dependency_overrides.clear()
+
+    def test_rerank_reuses_stored_analysis(self):
+        """Test that only recommendation selection reruns, with merged preferences."""
+        recommendation = {
+            "title": "Song", "artist": "Artist", "genre": "Various", "mood": "Calm",
+            "energy_level": 0.3, "valence": 0.6, "confidence_score": 0.8,
+        }
+        recommend = AsyncMock(return_value=[recommendation])
+        update = AsyncMock(side_effect=lambda **kwargs: {
+            **self.request, "music_year_start": kwargs["music_year_start"], "result": kwargs["result"]
+        })
+
+        with patch("app.routes.requests.supabase_service.get_request_by_id", AsyncMock(return_value=self.request)), \
+                patch("app.routes.requests.supabase_service.update_request_preferences", update), \
+                patch("app.routes.requests.spotify_service.get_recommendations_by_scene", recommend), \
+                patch("app.routes.requests.supabase_service.enqueue_processing_job") as enqueue:
+            response = self.client.post(f"/requests/{self.request['id']}/rerank", json={"music_year_start": 1990})
+
+        assert response.status_code == 200
+        assert response.json()["result"]["recommendations"][0]["title"] == "Song"
+        assert response.json()["result"]["transcription"] == "hello"
+        kwargs = recommend.call_args.kwargs
+        assert kwargs["scene_mood"] == "Calm and Peaceful"
+        assert (kwargs["music_year_start"], kwargs["music_year_end"]) == (1990, 2020)
+        assert kwargs["user_description"] == "upbeat"
+        assert update.call_args.kwargs["music_year_start"] == 1990
+        enqueue.assert_not_called()
+
+    def test_rerank_requires_completed_analysis(self):
+        """Test that requests still processing cannot be re-ranked."""
+        pending = {**self.request, "status": "processing", "result": None}
+
+        with patch("app.routes.requests.supabase_service.get_request_by_id", AsyncMock(return_value=pending)):
+            response = self.client.post(f"/requests/{self.request['id']}/rerank", json={})
+
+        assert response.status_code == 400
+
+    def test_rerank_rejects_reversed_year_range(self):
+        """Test that the year range is validated after merging with stored preferences."""
+        with patch("app.routes.requests.supabase_service.get_request_by_id", AsyncMock(return_value=self.request)):
+            response = self.client.post(f"/requests/{self.request['id']}/rerank", json={"music_year_start": 2021})
+
+        assert response.status_code == 400
+
+    def test_rerank_null_preferences_keep_stored_values(self):
+        """Test that explicit nulls keep the stored preferences and out-of-range years are rejected."""
+        recommend = AsyncMock(return_value=[])
+        update = AsyncMock(side_effect=lambda **kwargs: {**self.request, "result": kwargs["result"]})
+
+        with patch("app.routes.requests.supabase_service.get_request_by_id", AsyncMock(return_value=self.request)), \
+                patch("app.routes.requests.supabase_service.update_request_preferences", update), \
+                patch("app.routes.requests.spotify_service.get_recommendations_by_scene", recommend):
+            response = self.client.post(
+                f"/requests/{self.request['id']}/rerank",
+                json={"music_year_start": None, "music_year_end": None, "description": None}
+            )
+            invalid = self.client.post(f"/requests/{self.request['id']}/rerank", json={"music_year_start": 1800})
+
+        assert response.status_code == 200
+        kwargs = recommend.call_args.kwargs
+        assert (kwargs["music_year_start"], kwargs["music_year_end"]) == (1980, 2020)
+        assert kwargs["user_description"] == "upbeat"
+        assert invalid.status_code == 422
+
+
+class TestListRequests:
+    """Test cases for paginated request listings."""
+
+    def setup_method(self):
+        from app.auth import get_current_user
+
+        app.dependency_overrides[get_current_user] = lambda: {"id": "user-1"}
+        self.client = TestClient(app)
+        self.rows = [
+            {
+                "id": str(uuid4()),
+                "user_id": str(uuid4()),
+                "video_filename": f"clip{i}.mp4",
+                "status": "completed",
+                "scene_mood": "Calm and Peaceful",
+                "recommendation_count": 3,
+                "created_at": f"2024-01-0{9 - i}T00:00:00+00:00",
+                "updated_at": f"2024-01-0{9 - i}T00:00:00+00:00",
+            }
+            for i in range(3)
+        ]
+
+    def teardown_method(self):
+        app.dependency_overrides.clear()
+
+    def test_pages_follow_next_cursor(self):
+        """Test that a full page returns a cursor that resumes after its last request."""
+        get_requests = AsyncMock(return_value=self.rows)
+
+        with patch("app.routes.requests.supabase_service.get_user_requests", get_requests):
+            response = self.client.get("/requests/?limit=2")
+
+            assert response.status_code == 200
+            assert [row["video_filename"] for row in response.json()] == ["clip0.mp4", "clip1.mp4"]
+            assert "result" not in response.json()[0]
+            assert response.json()[0]["recommendation_count"] == 3
+            get_requests.assert_awaited_with("user-1", limit=3, before=None)
+
+            cursor = response.headers["X-Next-Cursor"]
+            get_requests.return_value = self.rows[2:]
+            response = self.client.get(f"/requests/?limit=2&cursor={cursor}")
+
+        assert response.status_code == 200
+        assert "X-Next-Cursor" not in response.headers
+        get_requests.assert_awaited_with(
+            "user-1", limit=3, before=(self.rows[1]["created_at"], self.rows[1]["id"])
+        )
+
+    def test_page_size_is_capped(self):
+        """Test that oversized page requests are capped at the configured maximum."""
+        get_requests = AsyncMock(return_value=[])
+
+        with patch("app.routes.requests.supabase_service.get_user_requests", get_requests), \
+                patch("app.routes.requests.settings.requests_page_size_max", 10):
+            response = self.client.get("/requests/?limit=5000")
+
+        assert response.status_code == 200
+        get_requests.assert_awaited_with("user-1", limit=11, before=None)
+
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor is rejected."""
+        response = self.client.get("/requests/?cursor=not-a-cursor")
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,77 @@
+"""Tests for batch candidate scoring and MMR re-ranking."""
+
+import numpy as np
+
+from app.services.reranker import rerank, score_candidates
+
+TARGET = np.array([0.9, 0.8, 0.8, 0.5], dtype=np.float32)
+
+
+def _candidate(spotify_id, artist, title="Song", energy=0.9, valence=0.8, popularity=50):
+    return {
+        "spotify_id": spotify_id,
+        "title": title,
+        "artist": artist,
+        "energy_level": energy,
+        "valence": valence,
+        "audio_features": {"popularity": popularity},
+    }
+
+
+class TestReranker:
+    """Test cases for candidate re-ranking."""
+
+    def test_scores_features_popularity_and_keywords(self):
+        """Test that closer features, popularity and keyword matches all raise relevance."""
+        scores = score_candidates(
+            [
+                _candidate("a", "X"),
+                _candidate("b", "X", energy=0.2, valence=0.2),
+                _candidate("c", "X", popularity=90),
+                _candidate("d", "X", title="Beach Party"),
+            ],
+            TARGET,
+            keywords=("beach", "party"),
+        )
+
+        assert scores[0] > scores[1]
+        assert scores[2] > scores[0]
+        assert scores[3] > scores[0]
+
+    def test_ranking_ignores_input_order(self):
+        """Test that the same candidates always produce the same ranking."""
+        candidates = [_candidate(str(i), f"Artist {i}") for i in range(6)]
+
+        first = [track["spotify_id"] for track in rerank(candidates, TARGET, limit=3)]
+        second = [track["spotify_id"] for track in rerank(candidates[::-1], TARGET, limit=3)]
+
+        assert first == second == ["0", "1", "2"]
+
+    def test_prefers_distinct_artists(self):
+        """Test that near-duplicate tracks by one artist give way to other artists."""
+        candidates = [
+            _candidate("a1", "Same", popularity=80),
+            _candidate("a2", "Same", popularity=79),
+            _candidate("b", "Other", popularity=70),
+        ]
+
+        by_relevance = rerank(candidates, TARGET, limit=2, diversity=0.0)
+        diverse = rerank(candidates, TARGET, limit=2, diversity=0.3)
+
+        assert [track["spotify_id"] for track in by_relevance] == ["a1", "a2"]
+        assert [track["spotify_id"] for track in diverse] == ["a1", "b"]
+        assert diverse[0]["confidence_score"] > diverse[1]["confidence_score"]
+
+    def test_estimated_features_are_not_scored(self):
+        """Test that mood-estimated features neither change relevance nor count as redundancy."""
+        def estimated(spotify_id, artist, energy, popularity):
+            candidate = _candidate(spotify_id, artist, energy=energy, popularity=popularity)
+            return {**candidate, "audio_features": {"popularity": popularity, "estimated": True}}
+
+        candidates = [estimated("a", "X", 0.9, 80), estimated("b", "Y", 0.1, 80), estimated("c", "Z", 0.9, 40)]
+
+        scores = score_candidates(candidates, TARGET)
+        ranked = rerank(candidates, TARGET, limit=3, diversity=0.5)
+
+        np.testing.assert_allclose(scores, [0.48, 0.48, 0.24], atol=1e-6)
+        assert [track["spotify_id"] for track in ranked] == ["a", "b", "c"]
@@ -0,0 +1,159 @@
+"""Tests for time-segmented parallel processing."""
+
+import asyncio
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.services.segmented_processing import (
+    VideoSegment,
+    merge_segment_results,
+    plan_segments,
+    process_video_segmented,
+)
+from app.services.supabase_client import SupabaseService
+
+
+def _segment_result(mood, visuals, tags, transcription, recommendations):
+    return {
+        "scene_description": f"{mood} scene",
+        "scene_mood": mood,
+        "visual_elements": visuals,
+        "ambient_tags": tags,
+        "transcription": transcription,
+        "recommendations": recommendations,
+        "model_versions": {"video_analysis": "test-v1"},
+        "stage_metrics": [{"stage": "analysis", "wall_time": 0.5}],
+    }
+
+
+def _track(title, confidence):
+    return {
+        "title": title,
+        "artist": "Artist",
+        "genre": "Ambient",
+        "mood": "Calm",
+        "energy_level": 0.3,
+        "valence": 0.6,
+        "confidence_score": confidence,
+    }
+
+
+def fake_processor(request_id, video_url, segment):
+    """Segment processor used with a thread pool in tests."""
+    mood = "Calm and Peaceful" if segment.index % 2 == 0 else "Dramatic and Intense"
+    return _segment_result(mood, ["Nature"], ["Birds"], f"segment {segment.index}", [_track(f"Track {segment.index}", 0.8)])
+
+
+class TestSegmentPlanning:
+    """Test cases for plan_segments."""
+
+    def test_splits_into_fixed_segments(self):
+        """Test fixed-size segments covering the whole video."""
+        segments = plan_segments(600.0, segment_seconds=120.0)
+
+        assert len(segments) == 5
+        assert segments[0].start == 0.0
+        assert segments[-1].end == 600.0
+
+    def test_folds_short_tail_into_previous_segment(self):
+        """Test that a short trailing segment is merged into the previous one."""
+        segments = plan_segments(250.0, segment_seconds=120.0)
+
+        assert [(s.start, s.end) for s in segments] == [(0.0, 120.0), (120.0, 250.0)]
+
+    def test_media_fragment(self):
+        """Test the W3C media fragment for a segment."""
+        assert VideoSegment(index=1, start=120.0, end=240.0).media_fragment == "#t=120,240"
+
+
+class TestSegmentMerge:
+    """Test cases for merge_segment_results."""
+
+    def test_merges_by_duration_weight(self):
+        """Test mood voting, tag ranking, transcript order and recommendation dedup."""
+        segments = [
+            VideoSegment(index=0, start=0.0, end=120.0),
+            VideoSegment(index=1, start=120.0, end=150.0),
+            VideoSegment(index=2, start=150.0, end=270.0),
+        ]
+        results = [
+            _segment_result("Calm and Peaceful", ["Nature", "Lighting"], ["Birds"], "first", [_track("Shared", 0.7)]),
+            _segment_result("Dramatic and Intense", ["Motion"], ["Thunder"], "second", [_track("Storm", 0.99)]),
+            _segment_result("Calm and Peaceful", ["Nature"], ["Birds", "Wind"], "third", [_track("Shared", 0.9)]),
+        ]
+
+        merged = merge_segment_results(segments, results, processing_duration=1.5)
+
+        assert merged.scene_mood == "Calm and Peaceful"
+        assert merged.visual_elements[0] == "Nature"
+        assert merged.ambient_tags[0] == "Birds"
+        assert merged.transcription.splitlines()[0] == "[00:00-02:00] first"
+        assert merged.transcription.splitlines()[2].endswith("third")
+        titles = [rec.title for rec in merged.recommendations]
+        assert titles.count("Shared") == 1
+        assert (merged.recommendations[0].title, merged.recommendations[0].confidence_score) == ("Shared", 0.9)
+        assert [m.segment for m in merged.stage_metrics] == [0, 1, 2]
+        assert len(merged.segments) == 3
+
+    def test_process_video_segmented_in_parallel(self):
+        """Test the end-to-end segmented run on a thread pool."""
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            result = asyncio.run(process_video_segmented(
+                "request-1", "https://example.com/video.mp4", 480.0,
+                processor=fake_processor, executor=executor,
+            ))
+
+        assert len(result.segments) == 4
+        assert result.transcription.count("segment") == 4
+        assert result.processing_duration is not None
+
+    def test_default_processor_avoids_service_imports(self):
+        """Test that the default segment processor does not import the Supabase or Spotify services."""
+        code = (
+            "import sys\n"
+            "from app.services.segmented_processing import VideoSegment, analyze_segment\n"
+            "result = analyze_segment('request-1', 'https://example.com/v.mp4', VideoSegment(0, 0.0, 60.0))\n"
+            "assert result['scene_mood'] and result['stage_metrics']\n"
+            "loaded = [m for m in ('app.services.supabase_client', 'app.services.spotify_service', 'supabase')"
+            " if m in sys.modules]\n"
+            "assert not loaded, loaded\n"
+        )
+        completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+
+        assert completed.returncode == 0, completed.stderr
+
+
+class TestEdgeSegments:
+    """Test cases for segmenting the edge function analysis."""
+
+    def test_long_video_invokes_edge_function_per_segment(self):
+        """Test that each segment is sent to the edge function and the merged result is saved."""
+        service = SupabaseService()
+        service.client = MagicMock()
+
+        def invoke(name, invoke_options):
+            segment = invoke_options["body"]["segment"]
+            return {"success": True, "result": fake_processor("request-1", "", VideoSegment(**segment))}
+
+        service.client.functions.invoke.side_effect = invoke
+        update = AsyncMock(return_value=True)
+
+        with patch("app.services.supabase_client.settings.analysis_proxy_enabled", False), \
+             patch("app.services.supabase_client.settings.use_real_ai", True), \
+             patch("app.services.supabase_client.settings.use_edge_functions", True), \
+             patch("app.services.segmented_processing.settings.segmented_processing_enabled", True), \
+             patch("app.services.segmented_processing.settings.segment_duration_seconds", 120.0), \
+             patch.object(service, "update_request_status", update):
+            assert asyncio.run(service.enqueue_processing_job(
+                "request-1", "https://x/clip.mp4", video_duration=480.0
+            ))
+        asyncio.run(service.shutdown())
+
+        bodies = [call.kwargs["invoke_options"]["body"] for call in service.client.functions.invoke.call_args_list]
+        assert sorted(body["segment"]["start"] for body in bodies) == [0.0, 120.0, 240.0, 360.0]
+        saved = update.await_args.kwargs
+        assert saved["status"] == "completed"
+        assert len(saved["result"]["segments"]) == 4
+        assert saved["result"]["stage_metrics"][-1]["segment"] == 3
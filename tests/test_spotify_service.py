@@ -0,0 +1,355 @@
+"""Tests for the Spotify service."""
+
+import asyncio
+import time
+
+import httpx
+
+from app.services.spotify_service import SpotifyService
+from app.services.spotify_token import SpotifyTokenManager
+
+
+def _search_response(request: httpx.Request) -> httpx.Response:
+    if request.url.path.endswith("/api/token"):
+        return httpx.Response(200, json={"access_token": "token", "expires_in": 3600})
+    items = [
+        {
+            "id": f"track{i}",
+            "name": f"Happy Song {i}",
+            "artists": [{"name": "Artist"}],
+            "external_urls": {"spotify": f"https://open.spotify.com/track/track{i}"},
+            "popularity": 60,
+        }
+        for i in range(int(request.url.params["limit"]))
+    ]
+    return httpx.Response(200, json={"tracks": {"items": items}})
+
+
+def _service(handler) -> SpotifyService:
+    service = SpotifyService()
+    service.client_id = "client"
+    service.client_secret = "secret"
+    service._create_client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return service
+
+
+class TestSpotifyClient:
+    """Test cases for the pooled Spotify HTTP client."""
+
+    def test_client_is_shared_across_calls(self):
+        """Test that token and search calls reuse a single client."""
+        service = _service(_search_response)
+
+        async def run():
+            await service.startup()
+            client = service._client
+            first = await service.search_tracks_by_mood("Joyful and Energetic", [], limit=3)
+            second = await service.search_tracks_by_mood("Calm and Peaceful", [], limit=2)
+            assert service._client is client
+            await service.shutdown()
+            return first, second, client
+
+        first, second, client = asyncio.run(run())
+        assert len(first) == 3 and len(second) == 2
+        assert client.is_closed
+        assert service._client is None
+
+    def test_client_recreated_after_shutdown(self):
+        """Test lazy client creation when used outside the app lifespan."""
+        service = _service(_search_response)
+
+        async def run():
+            await service.shutdown()
+            return await service.search_tracks_by_mood("Romantic", [], limit=1)
+
+        assert len(asyncio.run(run())) == 1
+
+
+class TestSpotifyToken:
+    """Test cases for expiry-aware token management."""
+
+    def test_concurrent_callers_share_one_refresh(self):
+        """Test that simultaneous first calls trigger a single token fetch."""
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return f"token{len(calls)}", 3600
+
+        manager = SpotifyTokenManager(fetch)
+
+        async def run():
+            return await asyncio.gather(*[manager.get_token() for _ in range(20)])
+
+        assert asyncio.run(run()) == ["token1"] * 20
+        assert len(calls) == 1
+
+    def test_refreshes_before_expiry(self):
+        """Test expired tokens are refetched and near-expiry tokens refresh in the background."""
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            return f"token{len(calls)}", 30
+
+        manager = SpotifyTokenManager(fetch, refresh_margin=60)
+
+        async def run():
+            first = await manager.get_token()
+            # Within the refresh margin: current token is returned, refresh runs in the background
+            second = await manager.get_token()
+            await asyncio.sleep(0)
+            manager._expires_at = 0.0
+            third = await manager.get_token()
+            return first, second, third
+
+        first, second, third = asyncio.run(run())
+        assert (first, second) == ("token1", "token1")
+        assert third == "token3"
+        assert manager.refresh_count == 3
+
+    def test_retries_once_on_401(self):
+        """Test that a rejected token is refreshed and the request retried once."""
+        tokens = iter(["stale", "fresh"])
+        seen = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path.endswith("/api/token"):
+                return httpx.Response(200, json={"access_token": next(tokens), "expires_in": 3600})
+            seen.append(request.headers["Authorization"])
+            if request.headers["Authorization"] == "Bearer stale":
+                return httpx.Response(401)
+            return _search_response(request)
+
+        service = _service(handler)
+        results = asyncio.run(service.search_tracks_by_mood("Romantic", [], limit=2))
+
+        assert len(results) == 2
+        assert seen == ["Bearer stale", "Bearer fresh"]
+        assert service.access_token == "fresh"
+
+
+class TestSpotifySearchCache:
+    """Test cases for caching of Spotify search results."""
+
+    def test_repeated_searches_hit_cache(self):
+        """Test that identical queries are served without another API call."""
+        searches = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path.endswith("/search"):
+                searches.append(request.url.params["q"])
+            return _search_response(request)
+
+        service = _service(handler)
+
+        async def run():
+            await asyncio.gather(*[service.search_tracks_by_mood("Romantic", [], limit=3) for _ in range(5)])
+            # Extra visual elements fall outside the top three terms: same query, formatted per call
+            return await service.search_tracks_by_mood("Romantic", ["Dancing"], limit=3)
+
+        results = asyncio.run(run())
+
+        assert searches == ["love romantic sweet"]
+        assert results[0]["audio_features"]["danceability"] == 0.8
+        assert service.search_cache_stats()["misses"] == 1
+
+
+class TestSceneRecommendations:
+    """Test cases for concurrent multi-query scene recommendations."""
+
+    @staticmethod
+    def _handler(items_by_query, delays=None):
+        delays = delays or {}
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path.endswith("/api/token"):
+                return _search_response(request)
+            query = request.url.params["q"]
+            await asyncio.sleep(delays.get(query, 0))
+            items = [
+                {
+                    "id": track_id,
+                    "name": track_id,
+                    "artists": [{"name": "Artist"}],
+                    "external_urls": {"spotify": f"https://open.spotify.com/track/{track_id}"},
+                }
+                for track_id in items_by_query.get(query, [])
+            ]
+            return httpx.Response(200, json={"tracks": {"items": items}})
+
+        return handler
+
+    def test_merges_queries_in_priority_order(self):
+        """Test that thin primary results are topped up from other queries without repeats."""
+        service = _service(self._handler({
+            "calm peaceful chill": ["a"],
+            "beach sunset": ["a", "b"],
+            "happy upbeat energetic": ["c", "d"],
+        }))
+
+        results = asyncio.run(service.get_recommendations_by_scene(
+            "A quiet beach at sunset", "Calm and Peaceful", [], [], limit=3
+        ))
+
+        assert [r["spotify_id"] for r in results] == ["a", "b", "c"]
+
+    def test_searches_run_concurrently_and_return_early(self):
+        """Test that searches overlap and a full primary result does not wait for the others."""
+        service = _service(self._handler(
+            {"calm peaceful chill": ["a", "b", "c"], "happy upbeat energetic": ["d"]},
+            delays={"calm peaceful chill": 0.05, "happy upbeat energetic": 1.0},
+        ))
+
+        async def run():
+            await service._get_access_token()
+            start = time.perf_counter()
+            results = await service.get_recommendations_by_scene("", "Calm and Peaceful", [], [], limit=3)
+            return results, time.perf_counter() - start
+
+        results, elapsed = asyncio.run(run())
+
+        assert [r["spotify_id"] for r in results] == ["a", "b", "c"]
+        assert elapsed < 0.5
+
+    def test_year_range_filters_searches(self):
+        """Test that a music year range is passed to Spotify as a search filter."""
+        searches = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path.endswith("/search"):
+                searches.append(request.url.params["q"])
+            return _search_response(request)
+
+        service = _service(handler)
+        asyncio.run(service.get_recommendations_by_scene(
+            "", "Romantic", [], [], limit=3, music_year_start=1990, music_year_end=1999
+        ))
+
+        assert searches and all(query.endswith(" year:1990-1999") for query in searches)
+
+
+class TestBatchRecommendations:
+    """Test cases for multi-scene batch recommendations."""
+
+    def test_batch_dedupes_scenes_and_shares_queries(self):
+        """Test that identical scenes run once and shared queries hit Spotify once."""
+        searches = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path.endswith("/search"):
+                searches.append(request.url.params["q"])
+            return _search_response(request)
+
+        service = _service(handler)
+        calm = {"scene_description": "", "scene_mood": "Calm and Peaceful", "visual_elements": [], "ambient_tags": []}
+        romantic = {**calm, "scene_mood": "Romantic"}
+
+        scenes = [calm, romantic, dict(calm, scene_mood="calm and peaceful ")]
+
+        results, unique = asyncio.run(service.get_recommendations_batch(scenes))
+
+        assert len(results) == 3 and unique == 2
+        assert results[0] == results[2]
+        assert all(len(result) == 3 for result in results)
+        # Primary search per unique scene plus one shared fallback search
+        assert sorted(searches) == sorted(["calm peaceful chill", "love romantic sweet", "happy upbeat energetic"])
+
+    def test_scene_key_ignores_ambient_tag_order_and_case(self):
+        """Test that scenes differing only in ambient tag order, case or spacing are deduplicated."""
+        service = SpotifyService()
+        scene = {"scene_mood": "Romantic", "visual_elements": ["Beach"], "ambient_tags": ["Waves", "Wind"]}
+
+        assert service.scene_key(scene) == service.scene_key(dict(scene, ambient_tags=["wind ", "WAVES"]))
+        assert service.scene_key(scene) != service.scene_key(dict(scene, ambient_tags=["Waves"]))
+
+    def test_failed_scene_does_not_fail_batch(self):
+        """Test that a scene raising an error is reported in its own slot."""
+        service = _service(_search_response)
+        original = service.get_recommendations_by_scene
+
+        async def get_recommendations_by_scene(**scene):
+            if scene["scene_mood"] == "Broken":
+                raise RuntimeError("boom")
+            return await original(**scene)
+
+        service.get_recommendations_by_scene = get_recommendations_by_scene
+        scene = {"scene_description": "", "visual_elements": [], "ambient_tags": []}
+        scenes = [dict(scene, scene_mood="Broken"), dict(scene, scene_mood="Romantic")]
+
+        results, _ = asyncio.run(service.get_recommendations_batch(scenes))
+
+        assert isinstance(results[0], RuntimeError)
+        assert len(results[1]) == 3
+
+
+class TestSpotifyThrottling:
+    """Test cases for 429 handling and the local fallback."""
+
+    def test_short_retry_after_is_honored(self):
+        """Test that a 429 with a short Retry-After is waited out and retried."""
+        responses = iter([httpx.Response(429, headers={"Retry-After": "0.05"})])
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path.endswith("/search"):
+                return next(responses, None) or _search_response(request)
+            return _search_response(request)
+
+        service = _service(handler)
+        results = asyncio.run(service.search_tracks_by_mood("Romantic", [], limit=2))
+
+        assert len(results) == 2
+        assert service.circuit_breaker.state == "closed"
+
+    def test_long_retry_after_fails_fast_to_stale_results(self):
+        """Test that throttling beyond the wait bound opens the breaker and serves cached results."""
+        throttled = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path.endswith("/search") and throttled:
+                throttled.append(1)
+                return httpx.Response(429, headers={"Retry-After": "120"})
+            return _search_response(request)
+
+        service = _service(handler)
+        service._search_cache.ttl = 0
+
+        async def run():
+            await service.search_tracks_by_mood("Romantic", [], limit=2)
+            throttled.append(0)
+            first = await service.search_tracks_by_mood("Romantic", [], limit=2)
+            second = await service.search_tracks_by_mood("Romantic", [], limit=2)
+            return first, second
+
+        first, second = asyncio.run(run())
+
+        assert len(first) == len(second) == 2
+        assert len(throttled) == 2  # The second throttled call never reached Spotify
+        assert service.rate_limit_stats()["circuit_breaker"]["state"] == "open"
+        assert service.search_cache_stats()["stale_hits"] == 2
+
+    def test_unavailable_spotify_falls_back_to_catalog(self, monkeypatch):
+        """Test that throttled searches with nothing cached are filled from the configured catalog."""
+        from app.services import catalog as catalog_module
+        from app.services.catalog import TrackCatalog
+        from tests.test_catalog import TRACKS
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path.endswith("/search"):
+                return httpx.Response(429, headers={"Retry-After": "120"})
+            return _search_response(request)
+
+        monkeypatch.setattr(catalog_module.settings, "recommendation_source", "spotify")
+        monkeypatch.setattr(catalog_module, "_catalog_loaded", True)
+        monkeypatch.setattr(catalog_module, "_catalog", TrackCatalog.from_records(TRACKS))
+        service = _service(handler)
+        service.recommendation_cache = None
+
+        results = asyncio.run(service.get_recommendations_by_scene("", "Calm and Peaceful", [], [], limit=2))
+
+        assert [r["title"] for r in results] == ["Quiet Lake", "Slow Dance"]
+        assert service.rate_limit_stats()["circuit_breaker"]["state"] == "open"
+
+        monkeypatch.setattr(catalog_module, "_catalog", None)
+        assert asyncio.run(service.get_recommendations_by_scene("", "Calm and Peaceful", [], [], limit=2)) == []
@@ -0,0 +1,107 @@
+"""Tests for the Supabase service's offloading of blocking client calls."""
+
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+from app.services.supabase_client import SupabaseService
+
+
+def _service(execute):
+    service = SupabaseService()
+    service.client = MagicMock()
+    query = service.client.table.return_value.select.return_value.eq.return_value.limit.return_value
+    query.execute.side_effect = execute
+    return service
+
+
+class TestSupabaseOffload:
+    """Test cases for running supabase-py calls on the worker pool."""
+
+    def test_queries_run_off_the_event_loop(self):
+        """Test that blocking queries run on pool threads and overlap instead of queueing."""
+        threads = []
+
+        def execute():
+            threads.append(threading.current_thread().name)
+            time.sleep(0.05)
+            return MagicMock(data=[{"id": "request-1"}])
+
+        service = _service(execute)
+
+        async def run():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.005)
+                    ticks += 1
+
+            ticking = asyncio.ensure_future(ticker())
+            start = time.perf_counter()
+            results = await asyncio.gather(*(service.get_user_requests("user-1") for _ in range(8)))
+            elapsed = time.perf_counter() - start
+            ticking.cancel()
+            return results, elapsed, ticks
+
+        with patch("app.services.supabase_client.settings.supabase_max_workers", 8):
+            results, elapsed, ticks = asyncio.run(run())
+        asyncio.run(service.shutdown())
+
+        assert results == [[{"id": "request-1"}]] * 8
+        assert all(name.startswith("supabase") for name in threads)
+        assert elapsed < 8 * 0.05 / 2
+        assert ticks >= 3
+
+    def test_pool_is_bounded(self):
+        """Test that no more than supabase_max_workers calls run at once."""
+        running, peak = 0, 0
+        lock = threading.Lock()
+
+        def execute():
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.02)
+            with lock:
+                running -= 1
+            return MagicMock(data=[])
+
+        service = _service(execute)
+
+        async def run():
+            await asyncio.gather(*(service.get_user_requests("user-1") for _ in range(12)))
+
+        with patch("app.services.supabase_client.settings.supabase_max_workers", 3):
+            asyncio.run(run())
+        asyncio.run(service.shutdown())
+
+        assert peak == 3
+
+
+class TestUserRequestListing:
+    """Test cases for the PostgREST request listing query."""
+
+    def test_keyset_page_query(self):
+        """Test that pages select summaries in (created_at, id) order after the cursor position."""
+        service = SupabaseService()
+        queries = []
+
+        async def run(execute):
+            queries.append(execute.__self__.params)
+            return MagicMock(data=[])
+
+        service._run = run
+        asyncio.run(service.get_user_requests("user-1", limit=21, before=("2024-01-01T00:00:00+00:00", "request-1")))
+
+        params = queries[0]
+        assert "result->>scene_mood" in params["select"] and "result," not in params["select"]
+        assert params["limit"] == "21"
+        assert params["order"] == "created_at.desc,id.desc"
+        assert params["or"] == (
+            '(created_at.lt."2024-01-01T00:00:00+00:00",'
+            'and(created_at.eq."2024-01-01T00:00:00+00:00",id.lt.request-1))'
+        )
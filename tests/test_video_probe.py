@@ -0,0 +1,51 @@
+"""Tests for upload-time video probing and admission control."""
+
+import asyncio
+
+import pytest
+
+from app.models.requests import VideoMetadata
+from app.services.video_probe import (
+    VideoRejectedError,
+    check_admission,
+    estimate_processing_cost,
+    probe_video,
+)
+
+
+class TestVideoProbe:
+    """Test cases for probe_video."""
+
+    def test_probes_mp4_header(self, mp4_bytes):
+        """Test metadata extraction from the MP4 index."""
+        metadata = asyncio.run(probe_video(mp4_bytes))
+
+        assert metadata.container == "mp4"
+        assert metadata.duration_seconds == 60.0
+        assert (metadata.width, metadata.height) == (1920, 1080)
+        assert metadata.frame_rate == 10.0
+        assert (metadata.video_codec, metadata.audio_codec) == ("h264", "aac")
+        assert metadata.has_video and metadata.has_audio
+        assert metadata.size_bytes == len(mp4_bytes)
+
+
+class TestCostAndAdmission:
+    """Test cases for cost estimation and admission control."""
+
+    def test_cost_grows_with_resolution_and_size(self):
+        """Test that larger inputs get larger cost estimates."""
+        small = VideoMetadata(duration_seconds=30, width=640, height=360, has_video=True, has_audio=True, size_bytes=1_000_000)
+        large = VideoMetadata(duration_seconds=30, width=3840, height=2160, has_video=True, has_audio=True, size_bytes=90_000_000)
+
+        assert estimate_processing_cost(large) > estimate_processing_cost(small) > 0
+
+    def test_rejects_pathological_inputs(self):
+        """Test rejection of audio-only, overly long and oversized videos."""
+        with pytest.raises(VideoRejectedError):
+            check_admission(VideoMetadata(duration_seconds=10, has_audio=True), 1.0)
+        with pytest.raises(VideoRejectedError):
+            check_admission(VideoMetadata(duration_seconds=10 * 3600, has_video=True), 1.0)
+        with pytest.raises(VideoRejectedError):
+            check_admission(VideoMetadata(duration_seconds=10, width=15360, height=8640, has_video=True), 1.0)
+
+        check_admission(VideoMetadata(duration_seconds=60, width=1920, height=1080, has_video=True), 5.0)